@@ -0,0 +1,73 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from population.kernels import HAVE_NUMBA, fused_baseline_step
+from population.state import FIELDS, PopulationState
+from strategy.baseline_heuristics import BASELINE_UNIFORMS
+
+# ------------------------------------------------------------------------------
+# FUSED KERNEL PARITY AND THROUGHPUT
+# ------------------------------------------------------------------------------
+# Steps two copies of one population through the same random draws, one with the
+# NumPy path and one with the fused kernel, and checks that every state array,
+# action and outcome is identical after every batch. Reports user-steps/second
+# for both. Without Numba the fused kernel runs uncompiled ("python"), so keep
+# --num-users small in that case.
+# Usage: python -m benchmarks.bench_kernels --num-users 1000000 --batches 20
+# ------------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check fused-kernel parity and measure throughput")
+    parser.add_argument("--num-users", type=int, default=1_000_000 if HAVE_NUMBA else 5_000)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--backend", choices=("numba", "python"), default="numba" if HAVE_NUMBA else "python")
+    parser.add_argument("--max-fatigue", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    reference = PopulationState.sample(args.num_users, rng)
+    fused = reference.copy()
+    n = args.num_users
+    elapsed = {"numpy": 0.0, args.backend: 0.0}
+
+    if args.backend == "numba":  # Compile outside the timed loop
+        fused_baseline_step(fused.copy(), np.ones(n), np.zeros(n), np.ones((BASELINE_UNIFORMS, n)), 0,
+                            args.max_fatigue, backend="numba")
+
+    for batch in range(args.batches):
+        draws = (rng.random(n), rng.standard_normal(n), rng.random((BASELINE_UNIFORMS, n)))
+        results = {}
+        for name, state in (("numpy", reference), (args.backend, fused)):
+            start = time.perf_counter()
+            results[name] = fused_baseline_step(state, *draws, batch, args.max_fatigue, backend=name)
+            elapsed[name] += time.perf_counter() - start
+
+        (counts_a, actions_a, outcome_a), (counts_b, actions_b, outcome_b) = results.values()
+        mismatches = [name for name in list(FIELDS) + ["activity", "activity_sum"]
+                      if not np.array_equal(getattr(reference, name), getattr(fused, name))]
+        mismatches += [name for name, a, b in (("counts", counts_a, counts_b), ("actions", actions_a, actions_b))
+                       if not np.array_equal(a, b)]
+        mismatches += [name for name in outcome_a if not np.array_equal(outcome_a[name], outcome_b[name])]
+        if reference.cursor != fused.cursor:
+            mismatches.append("cursor")
+        if mismatches:
+            print(f"MISMATCH at batch {batch}: {', '.join(mismatches)}")
+            sys.exit(1)
+
+    print(f"users={n} batches={args.batches}: {args.backend} kernel matches the NumPy path exactly")
+    for name, seconds in elapsed.items():
+        print(f"{name:>6}: {seconds:.3f}s  user-steps/s={n * args.batches / seconds:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
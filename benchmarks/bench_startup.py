@@ -0,0 +1,74 @@
+import argparse
+import re
+import subprocess
+import sys
+
+# ------------------------------------------------------------------------------
+# STARTUP IMPORT-TIME BENCHMARK
+# ------------------------------------------------------------------------------
+# Imports an entry-point module in a fresh interpreter under `python -X importtime`
+# and reports the total import time, the slowest top-level packages, and whether
+# any heavy optional dependency was pulled in. Exits non-zero when the total
+# exceeds the budget, so it can gate CI or sweep images.
+# Usage: python -m benchmarks.bench_startup --module sim_engine --budget-ms 250
+# ------------------------------------------------------------------------------
+
+HEAVY_MODULES = ("pandas", "matplotlib", "tqdm", "torch", "sklearn", "scipy")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import(module, repeats=3):
+    """
+    Returns (total_us, children, heavy) for the fastest of `repeats` cold imports of `module`:
+    its cumulative import time in microseconds, the cumulative time of each module it imports
+    directly, and the heavy modules that were pulled in anywhere in the tree.
+    """
+    best = None
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True, check=True)
+        total, children, pending, seen = 0, {}, {}, set()
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            cumulative, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+            seen.add(name.split(".")[0])
+            if depth == 3:
+                pending[name] = cumulative
+            elif depth == 1:
+                # Direct imports are listed just before the top-level module that triggered them
+                if name == module:
+                    total, children = cumulative, pending
+                pending = {}
+        if best is None or total < best[0]:
+            best = (total, children, sorted(seen & set(HEAVY_MODULES)))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark entry-point import time")
+    parser.add_argument("--module", default="sim_engine")
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    total_us, children, heavy = measure_import(args.module, args.repeats)
+    print(f"module={args.module} import_ms={total_us / 1000:.1f} budget_ms={args.budget_ms:.0f}")
+    for name, us in sorted(children.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<32} {us / 1000:8.1f} ms")
+    print(f"heavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+
+    if total_us / 1000 > args.budget_ms:
+        print("FAIL: import time over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
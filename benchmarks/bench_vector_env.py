@@ -0,0 +1,45 @@
+import argparse
+import time
+
+import numpy as np
+
+from env.vector_env import VectorEnv
+
+# ------------------------------------------------------------------------------
+# VECTOR ENV THROUGHPUT BENCHMARK
+# ------------------------------------------------------------------------------
+# Steps a VectorEnv with uniformly random actions and reports user-steps/second.
+# Usage: python -m benchmarks.bench_vector_env --num-envs 16 --num-users 65536
+# ------------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VectorEnv step throughput")
+    parser.add_argument("--num-envs", type=int, default=16)
+    parser.add_argument("--num-users", type=int, default=65536)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    env = VectorEnv(num_envs=args.num_envs, num_users=args.num_users, seed=args.seed)
+    env.reset()
+    rng = np.random.default_rng(args.seed)
+    actions = rng.integers(0, env.num_actions, size=(args.steps,) + env.shape, dtype=np.int8)
+
+    start = time.perf_counter()
+    for t in range(args.steps):
+        env.step(actions[t])
+    elapsed = time.perf_counter() - start
+
+    user_steps = args.steps * args.num_envs * args.num_users
+    print(f"envs={args.num_envs} users/env={args.num_users} steps={args.steps}")
+    print(f"elapsed={elapsed:.3f}s  user-steps/s={user_steps / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
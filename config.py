@@ -1,5 +1,8 @@
 import numpy as np
 from collections import Counter
+from types import SimpleNamespace
+
+import utils.constants as _constants
 
 # ------------------------------------------------------------------------------
 # CONFIGURATION MODULE — ChurnLab OSS Simulation Parameters
@@ -46,11 +49,36 @@ CHURN_THRESHOLD = 0.9   # Health level below which users are removed from the po
 # ------------------------------------------------------------------------------
 FATIGUE_RECOVERY = 0.35      # Rate at which user fatigue recovers over time
 MAX_FATIGUE = 5              # Maximum fatigue level before user becomes unresponsive
+
+# ------------------------------------------------------------------------------
+# POPULATION MIX & HEALTH DECAY (defaults from utils.constants)
+# ------------------------------------------------------------------------------
+FLAT_USER_HEALTH_DECAY = _constants.FLAT_USER_HEALTH_DECAY  # Health lost by every alive user per batch
+TIER_PROBS = list(_constants.TIER_PROBS)  # Share of sampled users per value tier (VALUE_TIERS order)
+ARCHETYPE_PROBS = None       # Share per archetype (ARCHETYPE_NAMES order); None samples uniformly
 # ------------------------------------------------------------------------------
 # Additional parameters are defined elsewhere in component modules
 # ------------------------------------------------------------------------------
 
 
+# ------------------------------------------------------------------------------
+# RUNTIME CONFIG
+# ------------------------------------------------------------------------------
+def make_config(**overrides):
+    """
+    Builds an independent runtime configuration from the defaults above.
+
+    Only upper-case settings are copied, so the result is a plain, picklable namespace that
+    never aliases module state. TOTAL_BATCHES is derived from DAYS and BATCHES_PER_DAY unless
+    overridden explicitly.
+    """
+    values = {name: value for name, value in globals().items() if name.isupper()}
+    values.update(overrides)
+    if "TOTAL_BATCHES" not in overrides:
+        values["TOTAL_BATCHES"] = values["DAYS"] * values["BATCHES_PER_DAY"]
+    return SimpleNamespace(**values)
+
+
 # Copyright 2025 Divine Comedy Labs LLC
 # Released under the Polyform Noncommercial License 1.0.0
 # See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
\ No newline at end of file
@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import traceback
+from queue import Empty
+
+from population.storage import MemmapPopulationState
+
+POLL_SECONDS = 1.0  # How often the parent checks that running scenarios are still alive
+
+# ------------------------------------------------------------------------------
+# COUNTERFACTUAL FORKING — "what if we had switched strategy at batch t?"
+# ------------------------------------------------------------------------------
+# Takes a BatchLoop that has already simulated up to some batch, branches its full
+# state once per scenario and continues each scenario to the horizon in parallel.
+#
+# On platforms with os.fork every scenario runs in a forked child process: the warm
+# populations, metrics and RNG state are shared copy-on-write, so pages are only
+# duplicated as a scenario modifies them. Elsewhere scenarios run one at a time on
+# in-process deep copies (`BatchLoop.fork`).
+#
+# Because each fork inherits the parent's random streams, all scenarios replay the
+# same random numbers from the fork point onward.
+#
+# Like `BatchLoop.fork`, forked scenarios emit no telemetry and do not write to
+# the parent's churn archives. Memory-mapped populations (`population.storage`)
+# are shared files rather than copy-on-write pages, so each forked scenario first
+# copies them into its own scratch directory next to the originals and removes it
+# when done.
+# ------------------------------------------------------------------------------
+
+
+def apply_scenario(loop, scenario):
+    """
+    Applies a scenario to a forked loop.
+
+    A scenario is either a callable taking the loop, or a dict of branch name → model
+    (None switches that branch to the baseline heuristic).
+    """
+    if callable(scenario):
+        scenario(loop)
+        return
+    for name, model in scenario.items():
+        loop.branch(name).model = model
+
+
+def _continue_scenario(loop, scenario, num_batches):
+    apply_scenario(loop, scenario)
+    loop.run(num_batches=num_batches, progress=False)
+    return {branch.name: branch.metrics() for branch in loop.branches}
+
+
+def _private_storage(loop, name):
+    """
+    Gives every memory-mapped branch of a forked loop its own copy of the population files,
+    so the scenario never writes to the parent's. Returns the scratch directories created.
+    """
+    scratch = []
+    for branch in loop.branches:
+        if isinstance(branch.state, MemmapPopulationState):
+            parent = os.path.dirname(os.path.abspath(branch.state.directory))
+            directory = tempfile.mkdtemp(prefix=f".counterfactual-{name}-", dir=parent)
+            scratch.append(directory)
+            branch.state = branch.state.copy_to(os.path.join(directory, branch.name))
+    return scratch
+
+
+def _fork_worker(loop, name, scenario, num_batches, queue):
+    scratch = []
+    try:
+        # As in BatchLoop.fork: no telemetry, and compacted users are discarded, not archived
+        loop.telemetry = None
+        for branch in loop.branches:
+            branch.archive = None
+        scratch = _private_storage(loop, name)
+        queue.put((name, _continue_scenario(loop, scenario, num_batches), None))
+    except Exception:
+        queue.put((name, None, traceback.format_exc()))
+    finally:
+        for directory in scratch:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_counterfactuals(loop, scenarios, num_batches=None, processes=None):
+    """
+    Continues `loop` from its current batch once per scenario.
+
+    Parameters:
+        loop (BatchLoop): Warm simulation to branch from; it is left untouched.
+        scenarios (dict): Scenario name → scenario (see `apply_scenario`).
+        num_batches (int, optional): Batches to run per scenario (default: to TOTAL_BATCHES).
+        processes (int, optional): Max concurrent forked workers (default: CPU count).
+
+    Returns:
+        dict: Scenario name → {branch name → metric series}, including the shared history
+        up to the fork point.
+    """
+    if not hasattr(os, "fork"):
+        return {name: _continue_scenario(loop.fork(), scenario, num_batches)
+                for name, scenario in scenarios.items()}
+
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    pending = list(scenarios.items())
+    running = {}
+    results = {}
+    limit = processes or os.cpu_count() or 1
+
+    while pending or running:
+        while pending and len(running) < limit:
+            name, scenario = pending.pop(0)
+            proc = ctx.Process(target=_fork_worker, args=(loop, name, scenario, num_batches, queue))
+            proc.start()
+            running[name] = proc
+
+        # Drain the result before joining so large payloads cannot block the child
+        try:
+            name, metrics, error = queue.get(timeout=POLL_SECONDS)
+        except Empty:
+            # A child killed by a signal, the OOM killer or a crash never posts a result
+            dead = {name: proc.exitcode for name, proc in running.items() if proc.exitcode not in (None, 0)}
+            if dead:
+                for proc in running.values():
+                    proc.terminate()
+                name, code = next(iter(dead.items()))
+                raise RuntimeError(f"Counterfactual scenario '{name}' died with exit code {code} before "
+                                   f"returning a result")
+            continue
+        running.pop(name).join()
+        if error is not None:
+            for proc in running.values():
+                proc.terminate()
+            raise RuntimeError(f"Counterfactual scenario '{name}' failed:\n{error}")
+        results[name] = metrics
+
+    return {name: results[name] for name in scenarios}
+
+
+def compare_counterfactuals(results, fork_batch=None):
+    """
+    Summarizes `run_counterfactuals` output into one row per (scenario, branch):
+    final churn, final ARR, and total energy, penalties and comebacks after `fork_batch`.
+    """
+    import pandas as pd
+
+    rows = []
+    start = fork_batch or 0
+    for scenario, branches in results.items():
+        for branch, metrics in branches.items():
+            rows.append({
+                "scenario": scenario,
+                "branch": branch,
+                "final_churn": metrics["churn"][-1] if len(metrics["churn"]) else None,
+                "final_arr": metrics["arr"][-1] if len(metrics["arr"]) else None,
+                "energy": sum(metrics["energy"][start:]),
+                "penalties": sum(metrics["penalties"][start:]),
+                "comebacks": sum(metrics["comebacks"][start:]),
+            })
+    return pd.DataFrame(rows).set_index(["scenario", "branch"])
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,173 @@
+import numpy as np
+
+from config import NUM_USERS, TOTAL_BATCHES, MAX_FATIGUE
+from population.state import PopulationState
+from population.dynamics import sample_presence, sample_row_counts, apply_rules
+from utils.rule_tables import ACTIONS, TIER_ARR_TABLE
+
+# ------------------------------------------------------------------------------
+# VECTORIZED ENVIRONMENT — batched RL interface over the RULES dynamics
+# ------------------------------------------------------------------------------
+# VectorEnv steps `num_envs` independent populations of `num_users` users at once.
+# Each user is one agent slot: the policy picks an index into ACTIONS for every
+# (env, user) pair and receives per-user observations, rewards and done flags.
+# The step path is pure NumPy — no per-user Python and no DataFrames.
+#
+# Batch ordering mirrors `runner.run_batch_loop`: presence and activity for a
+# batch are sampled first (and are visible in the observation), then the chosen
+# actions are applied through the rulebook.
+# ------------------------------------------------------------------------------
+
+OBS_FEATURES = (
+    "user_health", "fatigue", "state", "rolling_activity",
+    "value", "archetype", "recovered", "active", "alive"
+)
+
+
+class VectorEnv:
+    """
+    Batched churn environment over `num_envs` x `num_users` user slots.
+
+    Parameters:
+        num_envs (int): Number of independent population copies.
+        num_users (int): Users per copy.
+        max_batches (int): Episode horizon in batches.
+        max_fatigue (float): Fatigue ceiling used by the rulebook update.
+        energy_weight (float): Reward cost per unit of STRATEGY_COSTS spent.
+        autoreset (bool): Re-draw a copy's population as soon as its episode ends.
+        initial_state (PopulationState, optional): 1-D population to clone into every copy
+            on reset instead of sampling fresh users (e.g. `branch.to_state()`).
+        seed (int, optional): Default seed for the first `reset()`.
+
+    Rewards are the ARR of each surviving user, normalized so the top tier earns 1.0,
+    minus `energy_weight` times the cost of the action taken.
+    """
+
+    num_actions = len(ACTIONS)
+    observation_features = OBS_FEATURES
+
+    def __init__(self, num_envs=1, num_users=NUM_USERS, max_batches=TOTAL_BATCHES,
+                 max_fatigue=MAX_FATIGUE, energy_weight=1.0, autoreset=True,
+                 initial_state=None, seed=None):
+        if initial_state is not None:
+            num_users = initial_state.shape[-1]
+        self.num_envs = num_envs
+        self.num_users = num_users
+        self.max_batches = max_batches
+        self.max_fatigue = max_fatigue
+        self.energy_weight = energy_weight
+        self.autoreset = autoreset
+        self.initial_state = initial_state
+        self.rng = np.random.default_rng(seed)
+        self.state = None
+        self.active = None
+        self.batch = np.zeros(num_envs, dtype=np.int64)
+        self._arr_reward = TIER_ARR_TABLE / TIER_ARR_TABLE.max()
+
+    @classmethod
+    def from_branch(cls, branch, num_envs=1, **kwargs):
+        """Builds an environment whose copies all start from a PopulationBranch's current users."""
+        return cls(num_envs=num_envs, initial_state=branch.to_state(), **kwargs)
+
+    @property
+    def shape(self):
+        return (self.num_envs, self.num_users)
+
+    # === Episode Control ===
+
+    def reset(self, seed=None):
+        """
+        Starts a new episode in every copy and returns the first observation [E, N, F].
+        Passing a seed re-seeds the environment RNG for reproducible rollouts.
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.state = self._fresh_state()
+        self.batch[:] = 0
+        self.active = self._sample_activity(np.ones(self.shape, dtype=bool))
+        return self._observe()
+
+    def step(self, actions):
+        """
+        Applies one batch of actions (int array [E, N] of ACTIONS indices).
+
+        Returns:
+            obs (np.ndarray [E, N, F]): Observation after the batch.
+            reward (np.ndarray [E, N]): Per-user reward for this batch.
+            done (np.ndarray [E, N]): True for users that churned this batch or whose
+                episode ended (horizon reached or no users left).
+            info (dict): "episode_done" [E], "churned" [E, N], "energy" [E], "arr" [E].
+        """
+        actions = np.asarray(actions)
+        if actions.shape != self.shape:
+            raise ValueError(f"Expected actions of shape {self.shape}, got {actions.shape}")
+
+        outcome = apply_rules(self.state, actions, self.max_fatigue)
+        survived_arr = np.where(outcome["survived"], self._arr_reward[self.state.value], 0.0)
+        reward = survived_arr - self.energy_weight * outcome["energy"]
+
+        self.batch += 1
+        episode_done = (self.batch >= self.max_batches) | ~self.state.alive.any(axis=1)
+        done = outcome["churned"] | episode_done[:, None]
+        info = {
+            "episode_done": episode_done,
+            "churned": outcome["churned"],
+            "energy": outcome["energy"].sum(axis=1),
+            "arr": outcome["arr"].sum(axis=1),
+        }
+
+        if self.autoreset and episode_done.any():
+            self._reset_envs(episode_done)
+
+        self.active = self._sample_activity(self.state.alive)
+        return self._observe(), reward, done, info
+
+    # === Internals ===
+
+    def _fresh_state(self):
+        if self.initial_state is None:
+            return PopulationState.sample(self.shape, self.rng)
+        template = self.initial_state
+        state = PopulationState(self.shape, window=template.window)
+        for name in state.__dict__:
+            value = getattr(template, name)
+            if isinstance(value, np.ndarray):
+                getattr(state, name)[...] = value
+        state.cursor = template.cursor
+        return state
+
+    def _reset_envs(self, which):
+        """Replaces the populations of the copies flagged in `which` with fresh ones."""
+        fresh = self._fresh_state()
+        for name, value in fresh.__dict__.items():
+            if isinstance(value, np.ndarray):
+                getattr(self.state, name)[which] = value[which]
+        # The ring cursor is shared; realign fresh histories so their newest entry precedes it
+        if fresh.cursor != self.state.cursor:
+            shift = self.state.cursor - fresh.cursor
+            self.state.activity[which] = np.roll(fresh.activity[which], shift, axis=-1)
+        self.batch[which] = 0
+
+    def _sample_activity(self, mask):
+        """Samples presence and row counts for the upcoming batch and records the activity bit."""
+        present = sample_presence(self.state, self.rng.random(self.shape))
+        counts = sample_row_counts(self.state, present, self.rng.standard_normal(self.shape))
+        active = (counts > 0) & mask
+        self.state.push_activity(active)
+        return active
+
+    def _observe(self):
+        s = self.state
+        obs = np.empty(self.shape + (len(OBS_FEATURES),), dtype=np.float32)
+        features = (
+            s.user_health, s.fatigue, s.state, s.rolling_activity(),
+            s.value, s.archetype, s.recovered, self.active, s.alive
+        )
+        for i, feature in enumerate(features):
+            obs[..., i] = feature
+        return obs
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
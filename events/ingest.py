@@ -0,0 +1,446 @@
+import hashlib
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+from config import BATCHES_PER_DAY
+from population.state import PopulationState
+from utils.constants import ROLLING_WINDOW
+from utils.rule_tables import (
+    ARCH_COOLDOWN, ARCH_HEALTH_MULT, ARCH_ROW_MEAN, ARCH_VOLATILITY, TIER_INDEX, TIER_PROB_TABLE
+)
+
+# ------------------------------------------------------------------------------
+# TRACE INGESTION — populations seeded from exported event logs
+# ------------------------------------------------------------------------------
+# Event logs (CSV, optionally gzipped, or Parquet) are streamed in row chunks and
+# reduced to one compact, mergeable aggregate per user:
+#
+#   events        total events          last_batch   latest active batch
+#   active        active batches        mask         64-bit activity mask ending at
+#   sumsq         sum of squared                     last_batch (bit k = batch
+#                 per-batch event counts             last_batch - k)
+#   first_batch,  earliest active batch and the events in it
+#   first_count
+#   last_count    events in last_batch
+#   last_ts, tier latest event time and the tier it reported
+#
+# Aggregates from chunks and files merge exactly when they overlap only at their
+# first/last batches, which is how a time-ordered log splits into chunks (a batch
+# cut at a chunk boundary is counted once, with its events added together) and
+# how files covering consecutive periods meet. Only logs whose chunks or files
+# interleave in time make active/sumsq approximate. Files are ingested in
+# parallel and each file's aggregate is cached as .npz keyed by path, size, mtime
+# and ingestion settings, so repeated runs skip the parse.
+#
+# From the merged aggregate, `TraceData` derives each user's activity window, value
+# tier, archetype (nearest archetype profile by activity rate, events per active
+# batch and burstiness) and starting health, and builds a PopulationState or
+# PopulationBranch directly from those arrays. With `replay_from`, events from that
+# time on are not used for seeding but kept as per-batch presence (`TracePresence`)
+# that can drive the simulation in place of sampled presence.
+# ------------------------------------------------------------------------------
+
+INGEST_FORMAT = 2
+MASK_BITS = 64
+NO_TIER = -1
+HEALTH_FLOOR = 0.4  # Starting health of a user with no activity in the window (1.0 = every batch)
+AGGREGATE_FIELDS = ("events", "active", "sumsq", "first_batch", "first_count", "last_batch", "last_count", "mask",
+                    "last_ts", "tier")
+
+
+def _batch_ns(batches_per_day):
+    return (24 * 60 // batches_per_day) * 60 * 10**9
+
+
+def _read_chunks(path, columns, chunk_rows):
+    """Yields DataFrames of at most `chunk_rows` rows with the requested columns."""
+    if path.endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Reading Parquet event logs requires pyarrow (pip install pyarrow)") from exc
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def _timestamps_ns(values, time_unit):
+    """Event times as int64 nanoseconds since the epoch (UTC)."""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(values):
+        ts = pd.to_datetime(values, unit=time_unit, utc=True)
+    else:
+        ts = pd.to_datetime(values, utc=True)
+    return ts.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _user_ids(values):
+    """Integer ids stay int64; anything else becomes a fixed-width string array."""
+    import pandas as pd
+
+    if pd.api.types.is_integer_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    return values.astype(str).to_numpy().astype(str)
+
+
+def _tier_codes(values):
+    """TIER_INDEX code of every tier name; unknown or missing names get NO_TIER (-1)."""
+    import pandas as pd
+
+    return pd.Index(list(TIER_INDEX)).get_indexer(values).astype(np.int8)
+
+
+def _unique_pairs(ids, batches):
+    """Distinct (id, batch) presence pairs, sorted by id then batch."""
+    order = np.lexsort((batches, ids))
+    ids, batches = ids[order], batches[order]
+    keep = np.r_[True, (ids[1:] != ids[:-1]) | (batches[1:] != batches[:-1])]
+    return ids[keep], batches[keep]
+
+
+def _merge(parts):
+    """Merges per-user aggregates (dicts of arrays keyed by `ids`) into one, sorted by id."""
+    parts = [p for p in parts if p is not None and len(p["ids"])]
+    if not parts:
+        return None
+    ids = [p["ids"] for p in parts]
+    if len({a.dtype.kind for a in ids}) > 1:
+        ids = [a.astype(str) for a in ids]
+    ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+    rows = {name: np.concatenate([p[name] for p in parts]) for name in AGGREGATE_FIELDS}
+    n = len(ids)
+
+    # A batch that is an edge (first or last batch) of several parts was split between them:
+    # count it as one active batch whose events are the sum of the parts'
+    users, batches, size, total, squares = _edge_batches(inverse, rows)
+    merged = {"ids": ids}
+    merged["events"] = np.bincount(inverse, weights=rows["events"], minlength=n).astype(np.int64)
+    merged["active"] = (np.bincount(inverse, weights=rows["active"], minlength=n)
+                        - np.bincount(users, weights=size - 1, minlength=n)).astype(np.int64)
+    merged["sumsq"] = (np.bincount(inverse, weights=rows["sumsq"], minlength=n)
+                       + np.bincount(users, weights=total ** 2 - squares, minlength=n))
+
+    first_batch = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(first_batch, inverse, rows["first_batch"])
+    last_batch = np.full(n, np.iinfo(np.int64).min)
+    np.maximum.at(last_batch, inverse, rows["last_batch"])
+    merged["first_batch"], merged["last_batch"] = first_batch, last_batch
+    for edge, edge_batch in (("first_count", first_batch), ("last_count", last_batch)):
+        counts = np.zeros(n, dtype=np.int64)
+        at_edge = batches == edge_batch[users]
+        counts[users[at_edge]] = total[at_edge]
+        merged[edge] = counts
+
+    # Re-anchor every mask at its user's latest batch, then OR them together
+    shift = last_batch[inverse] - rows["last_batch"]
+    shifted = np.where(shift < MASK_BITS,
+                       np.left_shift(rows["mask"], np.minimum(shift, MASK_BITS - 1).astype(np.uint64)),
+                       np.uint64(0))
+    mask = np.zeros(n, dtype=np.uint64)
+    np.bitwise_or.at(mask, inverse, shifted)
+    merged["mask"] = mask
+
+    last_ts = np.full(n, np.iinfo(np.int64).min)
+    np.maximum.at(last_ts, inverse, rows["last_ts"])
+    merged["last_ts"] = last_ts
+    tier = np.full(n, NO_TIER, dtype=np.int8)
+    latest = rows["last_ts"] == last_ts[inverse]
+    tier[inverse[latest]] = rows["tier"][latest]
+    merged["tier"] = tier
+    return merged
+
+
+def _edge_batches(inverse, rows):
+    """
+    Distinct (user, batch) edge batches of the rows being merged: the user, batch, number of
+    rows having it as an edge, and the sum and sum of squares of those rows' event counts in it.
+    """
+    span = rows["last_batch"] != rows["first_batch"]
+    users = np.concatenate([inverse, inverse[span]])
+    batches = np.concatenate([rows["first_batch"], rows["last_batch"][span]])
+    counts = np.concatenate([rows["first_count"], rows["last_count"][span]]).astype(float)
+    order = np.lexsort((batches, users))
+    users, batches, counts = users[order], batches[order], counts[order]
+    start = np.flatnonzero(np.r_[True, (users[1:] != users[:-1]) | (batches[1:] != batches[:-1])])
+    size = np.diff(np.r_[start, len(users)])
+    return users[start], batches[start], size, np.add.reduceat(counts, start), np.add.reduceat(counts ** 2, start)
+
+
+def _aggregate_chunk(ids, ts, tiers, batch_ns):
+    """Per-user aggregate of one chunk of events."""
+    import pandas as pd
+
+    frame = pd.DataFrame({"id": ids, "batch": ts // batch_ns, "ts": ts, "tier": tiers})
+    frame = frame.sort_values("ts", kind="stable")
+    groups = frame.groupby(["id", "batch"], sort=False).agg(
+        events=("ts", "size"), last_ts=("ts", "last"), tier=("tier", "last")).reset_index()
+    events = groups["events"].to_numpy(dtype=np.int64)
+    batches = groups["batch"].to_numpy(dtype=np.int64)
+    return _merge([{
+        "ids": groups["id"].to_numpy(),
+        "events": events,
+        "active": np.ones(len(groups), dtype=np.int64),
+        "sumsq": events.astype(float) ** 2,
+        "first_batch": batches,
+        "first_count": events,
+        "last_batch": batches,
+        "last_count": events,
+        "mask": np.ones(len(groups), dtype=np.uint64),
+        "last_ts": groups["last_ts"].to_numpy(dtype=np.int64),
+        "tier": groups["tier"].to_numpy(dtype=np.int8),
+    }])
+
+
+def _ingest_file(task):
+    """Streams one log file into its per-user aggregate and distinct replay presence pairs."""
+    path, settings = task
+    batch_ns = _batch_ns(settings["batches_per_day"])
+    replay_ns = settings["replay_from_ns"]
+    uid_col, time_col, tier_col = settings["uid_col"], settings["time_col"], settings["tier_col"]
+    columns = [uid_col, time_col] + ([tier_col] if tier_col else [])
+
+    aggregate = None
+    replay_ids, replay_batches = [], []
+    for chunk in _read_chunks(path, columns, settings["chunk_rows"]):
+        ids = _user_ids(chunk[uid_col])
+        ts = _timestamps_ns(chunk[time_col], settings["time_unit"])
+        tiers = _tier_codes(chunk[tier_col]) if tier_col else np.full(len(chunk), NO_TIER, dtype=np.int8)
+        if replay_ns is not None:
+            late = ts >= replay_ns
+            if late.any():
+                late_ids, late_batches = _unique_pairs(ids[late], ts[late] // batch_ns)
+                replay_ids.append(late_ids)
+                replay_batches.append(late_batches)
+            ids, ts, tiers = ids[~late], ts[~late], tiers[~late]
+        if len(ids):
+            aggregate = _merge([aggregate, _aggregate_chunk(ids, ts, tiers, batch_ns)])
+
+    if aggregate is None:
+        aggregate = {"ids": np.empty(0, dtype=np.int64)}
+        aggregate.update({name: np.empty(0, dtype=np.uint64 if name == "mask" else np.int64)
+                          for name in AGGREGATE_FIELDS})
+    if replay_ids:
+        aggregate["replay_ids"], aggregate["replay_batches"] = _unique_pairs(np.concatenate(replay_ids),
+                                                                             np.concatenate(replay_batches))
+    else:
+        aggregate["replay_ids"] = np.empty(0, dtype=aggregate["ids"].dtype)
+        aggregate["replay_batches"] = np.empty(0, dtype=np.int64)
+    return aggregate
+
+
+def _cached_ingest(task):
+    """`_ingest_file` through the on-disk intermediate cache."""
+    path, settings = task
+    cache_dir = settings["cache_dir"]
+    if cache_dir is None:
+        return _ingest_file(task)
+    stat = os.stat(path)
+    identity = {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "format": INGEST_FORMAT,
+                **{k: v for k, v in settings.items() if k != "cache_dir"}}
+    key = hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+    cached = os.path.join(cache_dir, f"{key}.npz")
+    if os.path.exists(cached):
+        with np.load(cached) as data:
+            return {name: data[name] for name in data.files}
+    aggregate = _ingest_file(task)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{cached}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **aggregate)
+    os.replace(tmp, cached)
+    return aggregate
+
+
+def ingest_logs(paths, uid_col="uid", time_col="timestamp", tier_col=None, batches_per_day=BATCHES_PER_DAY,
+                replay_from=None, time_unit="s", chunk_rows=1_000_000, processes=None, cache_dir=None):
+    """
+    Streams event logs into a TraceData.
+
+    Parameters:
+        paths (list[str]): CSV (optionally compressed) or Parquet files.
+        uid_col, time_col (str): User id and event time columns. Times may be strings or
+            numbers in `time_unit` since the epoch.
+        tier_col (str, optional): Column holding each user's value tier name (VALUE_TIERS);
+            users without a known tier are assigned one from TIER_PROBS.
+        batches_per_day (int): Batch length used to bucket events (match the run's config).
+        replay_from (str or datetime, optional): Events at or after this time are kept as
+            replay presence instead of seeding the population. Naive times are read as UTC.
+        chunk_rows (int): Rows read per chunk; bounds memory per worker.
+        processes (int, optional): Worker processes across files (default: CPU count; 1 runs
+            in-process).
+        cache_dir (str, optional): Directory for cached per-file aggregates.
+    """
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    replay_from_ns = None
+    if replay_from is not None:
+        import pandas as pd
+        replay_ts = pd.Timestamp(replay_from)
+        if replay_ts.tzinfo is not None:
+            replay_ts = replay_ts.tz_convert("UTC")  # Event times are compared in UTC
+        replay_from_ns = int(replay_ts.tz_localize(None).to_datetime64().astype("datetime64[ns]").view(np.int64))
+    settings = {"uid_col": uid_col, "time_col": time_col, "tier_col": tier_col, "batches_per_day": batches_per_day,
+                "replay_from_ns": replay_from_ns, "time_unit": time_unit, "chunk_rows": chunk_rows,
+                "cache_dir": cache_dir}
+    tasks = [(path, settings) for path in paths]
+
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes <= 1:
+        parts = [_cached_ingest(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            parts = pool.map(_cached_ingest, tasks)
+
+    aggregate = _merge(parts)
+    if aggregate is None:
+        raise ValueError("No seeding events found in the event logs")
+    replay = None
+    if replay_from_ns is not None:
+        replay_ids = [p["replay_ids"] for p in parts]
+        if len({a.dtype.kind for a in replay_ids} | {aggregate["ids"].dtype.kind}) > 1:
+            replay_ids = [a.astype(str) for a in replay_ids]
+        replay = (np.concatenate(replay_ids), np.concatenate([p["replay_batches"] for p in parts]))
+    start_batch = None if replay_from_ns is None else replay_from_ns // _batch_ns(batches_per_day)
+    return TraceData(aggregate, replay=replay, start_batch=start_batch)
+
+
+class TracePresence:
+    """
+    Observed presence per batch for replay: batch `b` of the simulation is the b-th batch
+    from the replay start. Batches beyond the trace fall back to sampled presence.
+    """
+
+    def __init__(self, uids, batches, num_batches):
+        order = np.lexsort((uids, batches))
+        self.uids = uids[order]
+        self.offsets = np.searchsorted(batches[order], np.arange(num_batches + 1))
+        self.num_batches = num_batches
+
+    def covers(self, batch):
+        return batch < self.num_batches
+
+    def present(self, batch, uids):
+        """Boolean presence of each uid in `uids` (sorted) during `batch`."""
+        active = self.uids[self.offsets[batch]:self.offsets[batch + 1]]
+        present = np.zeros(len(uids), dtype=bool)
+        if len(uids) == 0 or len(active) == 0:
+            return present
+        slots = np.minimum(np.searchsorted(uids, active), len(uids) - 1)
+        present[slots[uids[slots] == active]] = True
+        return present
+
+
+class TraceData:
+    """
+    Per-user aggregates of ingested event logs. User `i` (uid i of the built population)
+    is `ids[i]` in the logs.
+    """
+
+    def __init__(self, aggregate, replay=None, start_batch=None):
+        self.ids = aggregate["ids"]
+        self.aggregate = aggregate
+        # The activity window ends at the last batch before replay, or at the latest event
+        self.end_batch = int(aggregate["last_batch"].max()) if start_batch is None else int(start_batch) - 1
+        self._replay = replay
+        self._start_batch = start_batch
+
+    @property
+    def num_users(self):
+        return len(self.ids)
+
+    def activity_window(self, start, stop, window=ROLLING_WINDOW):
+        """Activity bits of users [start, stop) over the `window` batches ending at `end_batch`, oldest first."""
+        last = self.aggregate["last_batch"][start:stop, None]
+        mask = self.aggregate["mask"][start:stop, None]
+        age = last - (self.end_batch - window + 1 + np.arange(window))[None, :]
+        in_mask = (age >= 0) & (age < MASK_BITS)
+        bits = np.right_shift(mask, np.clip(age, 0, MASK_BITS - 1).astype(np.uint64)) & np.uint64(1)
+        return np.where(in_mask, bits, 0).astype(np.uint8)
+
+    def features(self):
+        """Per-user events per active batch and coefficient of variation of per-batch counts."""
+        agg = self.aggregate
+        active = np.maximum(agg["active"], 1)
+        intensity = agg["events"] / active
+        variance = np.maximum(agg["sumsq"] / active - intensity ** 2, 0.0)
+        return intensity, np.sqrt(variance) / np.maximum(intensity, 1e-9)
+
+    def assign_archetypes(self, activity_rate):
+        """
+        Nearest archetype profile after scaling each user feature so its median matches the
+        archetype mean: activity rate ~ user_health_mult, events per active batch ~ row_mean,
+        burstiness ~ volatility. Distances are measured in units of each profile's spread.
+        """
+        intensity, burstiness = self.features()
+        profiles = np.column_stack([ARCH_HEALTH_MULT, ARCH_ROW_MEAN, ARCH_VOLATILITY])
+        users = np.column_stack([activity_rate, intensity, burstiness])
+        median = np.median(users, axis=0)
+        users = users * (profiles.mean(axis=0) / np.where(median > 0, median, 1.0))
+        spread = np.maximum(profiles.std(axis=0), 1e-9)
+        distance = (((users[:, None, :] - profiles[None, :, :]) / spread) ** 2).sum(axis=2)
+        return distance.argmin(axis=1).astype(np.int8)
+
+    def to_state(self, rng, window=ROLLING_WINDOW, storage_dir=None, chunk_size=1 << 20):
+        """
+        Builds the starting PopulationState (memory-mapped under `storage_dir` if given).
+        `rng` only assigns tiers to users whose logs carry none.
+        """
+        n = self.num_users
+        if storage_dir is None:
+            state = PopulationState(n, window=window)
+        else:
+            from population.storage import MemmapPopulationState
+            state = MemmapPopulationState(storage_dir, n, window=window, chunk_size=chunk_size)
+
+        activity_rate = np.empty(n)
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            bits = self.activity_window(start, stop, window)
+            state.activity[start:stop] = bits
+            state.activity_sum[start:stop] = bits.sum(axis=1)
+            activity_rate[start:stop] = bits.mean(axis=1)
+
+        tier = self.aggregate["tier"].astype(np.int8)
+        unknown = tier == NO_TIER
+        tier[unknown] = rng.choice(len(TIER_PROB_TABLE), p=TIER_PROB_TABLE, size=int(unknown.sum()))
+        archetype = self.assign_archetypes(activity_rate)
+
+        state.archetype[...] = archetype
+        state.value[...] = tier
+        state.user_health[...] = HEALTH_FLOOR + (1.0 - HEALTH_FLOOR) * activity_rate
+        state.cooldown[...] = ARCH_COOLDOWN[archetype]
+        state.prev_user_health[...] = 1.0
+        state.alive[...] = True
+        state.last_action[...] = -3
+        return state
+
+    def presence(self):
+        """TracePresence of the replay period, or None without `replay_from`."""
+        if self._replay is None:
+            return None
+        ids, batches = self._replay
+        slots = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        known = self.ids[slots] == ids  # Users first seen during replay are not in the population
+        uids, rel = slots[known], batches[known] - self._start_batch
+        pairs = np.unique(np.column_stack([rel, uids]), axis=0) if len(uids) else np.empty((0, 2), dtype=np.int64)
+        num_batches = int(pairs[:, 0].max()) + 1 if len(pairs) else 0
+        return TracePresence(pairs[:, 1], pairs[:, 0], num_batches)
+
+    def to_branch(self, name, rng, model=None, replay=True, **state_kwargs):
+        """PopulationBranch seeded from the trace, replaying observed presence when available."""
+        from population.PopulationBranch import PopulationBranch
+
+        branch = PopulationBranch(name, model=model, initial_state=self.to_state(rng, **state_kwargs))
+        branch.presence_trace = self.presence() if replay else None
+        return branch
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
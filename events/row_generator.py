@@ -1,10 +1,11 @@
 import random
 import numpy as np
-import pandas as pd
 from datetime import timedelta
 from utils.constants import ARCHETYPES, EVENT_PROBS_BY_STATE, EVENT_TYPES, EVENT_TYPE_SCORES,  ROLLING_WINDOW
 from numpy.random import default_rng
 from config import rng
+from utils.constants import STATES, VALUE_TIERS
+from utils.rule_tables import EVENT_CUMPROBS, EVENT_SCORES
 
 
 
@@ -38,6 +39,8 @@ def generate_rows_for_user(uid, ts, user_info):
         - Customizable event types and severities
         """
     
+    import pandas as pd
+
     # Extract user attributes
     archetype = ARCHETYPES[user_info["archetype"]]
     state = user_info["state"]
@@ -102,6 +105,71 @@ def generate_rows_for_user(uid, ts, user_info):
         "recovered": [recovery] * noisy_count
     })
 
+
+# Timestamp spread (minutes) per health band; the top band emits one event per minute
+TIMESTAMP_EDGES = np.array([0.2, 0.5, 0.8])
+TIMESTAMP_SPREAD = np.array([180, 60, 30, 0])
+SEVERITY_LEVELS = np.array(["low", "medium", "high"], dtype=object)
+SEVERITY_CUMPROBS = np.cumsum([0.4, 0.4, 0.2])
+
+
+def generate_batch_rows(state, counts, ts, rng, uids=None, weights=None):
+    """
+        Builds the engagement-event frame for a whole population in one pass.
+
+        Vectorized counterpart of `generate_rows_for_user`: `counts[i]` rows are emitted for
+        user in slot i, with the same columns, health-banded timestamp spread and state-dependent
+        event type distribution. `uids` maps slots to uids (default: the slot is the uid).
+        With per-slot importance `weights` (from `events.sampling.EventSampler`), a `weight`
+        column is added.
+        """
+    import pandas as pd
+
+    slots = np.flatnonzero(counts)
+    per_user = counts[slots]
+    total = int(per_user.sum())
+    if total == 0:
+        return pd.DataFrame()
+
+    row_slot = np.repeat(slots, per_user)
+    starts = np.cumsum(per_user) - per_user
+    position = np.arange(total) - np.repeat(starts, per_user)
+
+    # Timestamp generation: sequential minutes for healthy users, sorted random spread otherwise
+    health = state.user_health[row_slot]
+    spread = TIMESTAMP_SPREAD[np.searchsorted(TIMESTAMP_EDGES, health, side="right")]
+    offsets = np.where(spread == 0, position, rng.integers(0, spread + 1))
+    offsets = offsets[np.lexsort((offsets, row_slot))]
+    timestamps = np.datetime64(ts, "us") + offsets.astype("timedelta64[m]")
+
+    # Event type and severity sampling — tied to state distributions
+    row_state = state.state[row_slot]
+    event_idx = (rng.random(total)[:, None] > EVENT_CUMPROBS[row_state]).sum(axis=1)
+    event_idx = np.minimum(event_idx, len(EVENT_TYPES) - 1)
+    severity_idx = np.minimum((rng.random(total)[:, None] > SEVERITY_CUMPROBS).sum(axis=1), 2)
+
+    active_uids = slots if uids is None else uids[slots]
+    session_ids = np.array([f"{uid}_{ts.date()}" for uid in active_uids], dtype=object)
+
+    return pd.DataFrame({
+        "uid": row_slot if uids is None else np.repeat(active_uids, per_user),
+        "timestamp": timestamps,
+        "event_type": np.asarray(EVENT_TYPES, dtype=object)[event_idx],
+        "event_severity": SEVERITY_LEVELS[severity_idx],
+        "session_id": np.repeat(session_ids, per_user),
+        "session_position": position,
+        "engagement_score": EVENT_SCORES[event_idx],
+        "user_health": health,
+        "fatigue": state.fatigue[row_slot],
+        "cooldown": state.cooldown[row_slot],
+        "value_tier": np.asarray(VALUE_TIERS, dtype=object)[state.value[row_slot]],
+        "state": np.asarray(STATES, dtype=object)[row_state],
+        "rolling_activity": state.rolling_activity()[row_slot],
+        "recovered": state.recovered[row_slot],
+        **({} if weights is None else {"weight": weights[row_slot]}),
+    })
+
+
 # Copyright 2025 Divine Comedy Labs LLC
 # Released under the Polyform Noncommercial License 1.0.0
 # See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
\ No newline at end of file
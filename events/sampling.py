@@ -0,0 +1,134 @@
+import math
+
+import numpy as np
+
+from utils.constants import STATES
+from utils.rule_tables import STATE_INDEX
+
+# ------------------------------------------------------------------------------
+# EVENT SAMPLING — thinned challenger feeds with importance weights
+# ------------------------------------------------------------------------------
+# Challengers receive one event row per generated event. Most rows come from
+# healthy, stable users and carry little signal, so a branch can thin its feed
+# before the DataFrame is built:
+#
+#   strata      users are grouped by engagement state or by health band, each
+#               with a keep rate in (0, 1]
+#   bernoulli   every row of a user is kept independently with the stratum rate;
+#               kept rows weigh 1 / rate
+#   reservoir   exactly ceil(rate * N) of the stratum's N rows are kept, drawn
+#               uniformly without replacement across the stratum's users;
+#               kept rows weigh N / kept (per chunk when the branch is stepped in
+#               chunks)
+#
+# Either way, a sum of `weight` over the sampled rows is an unbiased estimate of the
+# same sum over the full feed. At-risk users (low health or a protected state) are
+# never thinned and weigh 1. Thinning only shapes what the model sees: the engine
+# derives activity bits and dynamics from the unsampled counts.
+# ------------------------------------------------------------------------------
+
+SAMPLING_MODES = ("bernoulli", "reservoir")
+
+
+class EventSampler:
+    """
+    Thins a batch's per-user event counts for the challenger feed.
+
+    Parameters:
+        rates (dict or list): Keep rate per stratum. With by="state", engagement state name →
+            rate (states not listed are kept in full); with by="health", one rate per health
+            band defined by `edges` (len(edges) + 1 rates, lowest band first).
+        by (str): "state" or "health".
+        edges (list[float], optional): Ascending health band edges for by="health".
+        mode (str): "bernoulli" or "reservoir".
+        at_risk_health (float): Users below this health are kept in full.
+        protect_states (tuple): Engagement states whose users are kept in full.
+    """
+
+    def __init__(self, rates, by="state", edges=None, mode="bernoulli", at_risk_health=0.5,
+                 protect_states=("disrupted", "recovering")):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{mode}'; expected one of {SAMPLING_MODES}")
+        if by == "state":
+            unknown = set(rates) - set(STATES)
+            if unknown:
+                raise ValueError(f"Unknown states in sampling rates: {sorted(unknown)}")
+            table = np.array([rates.get(name, 1.0) for name in STATES], dtype=float)
+            edges = np.empty(0)
+        elif by == "health":
+            edges = np.asarray(edges if edges is not None else [], dtype=float)
+            table = np.asarray(rates, dtype=float)
+            if len(table) != len(edges) + 1:
+                raise ValueError(f"by='health' needs {len(edges) + 1} rates for {len(edges)} band edges")
+        else:
+            raise ValueError(f"Unknown sampling stratification '{by}'; expected 'state' or 'health'")
+        if np.any(table <= 0) or np.any(table > 1):
+            raise ValueError("Sampling rates must lie in (0, 1]")
+        self.by = by
+        self.edges = edges
+        self.table = table
+        self.mode = mode
+        self.at_risk_health = at_risk_health
+        self.protected = np.array([STATE_INDEX[name] for name in protect_states], dtype=np.int8)
+
+    def describe(self):
+        """JSON-serializable settings (used in result cache keys)."""
+        return {"by": self.by, "edges": self.edges.tolist(), "rates": self.table.tolist(), "mode": self.mode,
+                "at_risk_health": self.at_risk_health, "protected": self.protected.tolist()}
+
+    def strata(self, state):
+        """Stratum per user slot; -1 marks at-risk users, who are kept in full."""
+        if self.by == "state":
+            stratum = state.state.astype(np.int64)
+        else:
+            stratum = np.searchsorted(self.edges, state.user_health, side="right")
+        at_risk = (state.user_health < self.at_risk_health) | np.isin(state.state, self.protected)
+        return np.where(at_risk | (self.table[stratum] >= 1.0), -1, stratum)
+
+    def thin(self, state, counts, rng):
+        """
+        Samples the rows to emit per user.
+
+        Parameters:
+            state (PopulationState): The users' state (engagement state and health).
+            counts (np.ndarray): Unsampled event rows per user slot.
+            rng (np.random.Generator): Source of the sampling draws.
+
+        Returns:
+            (kept, weights): Rows to emit per slot, and the importance weight of each of a
+            slot's rows.
+        """
+        stratum = self.strata(state)
+        weights = np.ones(len(counts))
+        sampled = stratum >= 0
+        if self.mode == "bernoulli":
+            rate = self.table[stratum[sampled]]
+            kept = counts.copy()
+            kept[sampled] = rng.binomial(counts[sampled], rate)
+            weights[sampled] = 1.0 / rate
+            return kept, weights
+
+        kept = counts.copy()
+        for s in np.unique(stratum[sampled & (counts > 0)]):
+            members = np.flatnonzero((stratum == s) & (counts > 0))
+            total = int(counts[members].sum())
+            take = math.ceil(self.table[s] * total)
+            kept[members] = rng.multivariate_hypergeometric(counts[members].astype(np.int64), take)
+            weights[members] = total / take
+        return kept, weights
+
+
+def parse_sampling_rates(specs):
+    """Parses ["stable=0.1", "cycling=0.5"] into {"stable": 0.1, "cycling": 0.5}."""
+    rates = {}
+    for spec in specs or []:
+        name, _, rate = spec.partition("=")
+        if not rate:
+            raise ValueError(f"Sampling rate must look like STATE=RATE, got '{spec}'")
+        rates[name] = float(rate)
+    return rates
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
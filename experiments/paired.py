@@ -0,0 +1,110 @@
+import numpy as np
+
+from simulation import Simulation
+
+# ------------------------------------------------------------------------------
+# PAIRED REPLICATES — challenger-vs-baseline statistics under common random numbers
+# ------------------------------------------------------------------------------
+# `run_replicate` simulates one seed for a set of policies; `paired_difference`
+# turns per-seed outcomes of two policies into paired-difference statistics and
+# variance-reduction diagnostics. The variance reduction factor compares the
+# variance of the paired difference with what independent runs would give
+# (var_a + var_b); a factor of 4 means a quarter of the replicates reach the same
+# confidence-interval width.
+# ------------------------------------------------------------------------------
+
+
+def _t_critical(confidence, dof):
+    """Two-sided Student t critical value (normal approximation without scipy)."""
+    try:
+        from scipy import stats
+        return float(stats.t.ppf(0.5 + confidence / 2, dof))
+    except ImportError:
+        from statistics import NormalDist
+        return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def run_replicate(config, policies, seed, crn=True, enable_influx=False, cache=None):
+    """
+    Runs one seed of an N-way simulation from a shared starting population.
+
+    Parameters:
+        config: Runtime configuration namespace.
+        policies (dict): Branch name → zero-argument factory returning a model (or None
+            for the baseline heuristic). A fresh model is built per replicate.
+        seed (int): Replicate seed; drives both the starting population and the streams.
+        crn (bool): Use common random numbers across branches.
+        cache (ResultCache, optional): Serve and store replicates through a result cache.
+
+    Returns:
+        dict: Branch name → metric series (see `PopulationBranch.metrics`).
+    """
+    models = {name: factory() if factory else None for name, factory in policies.items()}
+    result = Simulation(config, seed=seed, policies=models, enable_influx=enable_influx, crn=crn).run(cache=cache)
+    return result.metrics
+
+
+def final_outcomes(replicates, metric="churn"):
+    """Stacks the final value of `metric` per replicate into branch name → array."""
+    names = replicates[0].keys()
+    return {name: np.array([rep[name][metric][-1] for rep in replicates]) for name in names}
+
+
+def paired_difference(a, b, confidence=0.95):
+    """
+    Paired-difference statistics for per-replicate outcomes `a` and `b` (same seeds, same order).
+
+    Returns:
+        dict with n, mean_diff, sd_diff, se_diff, ci_low, ci_high, correlation, var_a, var_b,
+        var_diff, variance_reduction ((var_a + var_b) / var_diff) and the equivalent number
+        of independent replicates the paired design is worth.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if a.shape != b.shape or a.size < 2:
+        raise ValueError("Paired statistics need two equal-length samples with at least 2 replicates")
+
+    n = a.size
+    diff = a - b
+    var_a, var_b, var_diff = a.var(ddof=1), b.var(ddof=1), diff.var(ddof=1)
+    se = np.sqrt(var_diff / n)
+    half_width = _t_critical(confidence, n - 1) * se
+    correlation = np.corrcoef(a, b)[0, 1] if var_a > 0 and var_b > 0 else float("nan")
+    reduction = (var_a + var_b) / var_diff if var_diff > 0 else float("inf")
+
+    return {
+        "n": n,
+        "mean_diff": diff.mean(),
+        "sd_diff": np.sqrt(var_diff),
+        "se_diff": se,
+        "ci_low": diff.mean() - half_width,
+        "ci_high": diff.mean() + half_width,
+        "correlation": correlation,
+        "var_a": var_a,
+        "var_b": var_b,
+        "var_diff": var_diff,
+        "variance_reduction": reduction,
+        "equivalent_independent_replicates": n * reduction,
+    }
+
+
+def compare_policies(config, policies, seeds, reference, metric="churn", crn=True,
+                     enable_influx=False, confidence=0.95, cache=None):
+    """
+    Runs `seeds` replicates and reports paired statistics of every policy against `reference`.
+
+    Returns:
+        dict: Policy name → `paired_difference` result for policy minus reference.
+    """
+    replicates = [run_replicate(config, policies, seed, crn=crn, enable_influx=enable_influx, cache=cache)
+                  for seed in seeds]
+    outcomes = final_outcomes(replicates, metric)
+    return {
+        name: paired_difference(values, outcomes[reference], confidence)
+        for name, values in outcomes.items() if name != reference
+    }
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,193 @@
+import math
+import multiprocessing
+import os
+import queue
+from types import SimpleNamespace
+
+from experiments.paired import run_replicate, _t_critical
+from metrics.cache import ResultCache
+
+# ------------------------------------------------------------------------------
+# SEQUENTIAL STOPPING — adaptive replicate sweeps
+# ------------------------------------------------------------------------------
+# Instead of a fixed number of seeds per configuration, replicates are launched in
+# waves and each configuration stops as soon as its outcome is settled:
+#
+#   - "significant": the CI of every tracked delta excludes zero, with the
+#     confidence level Bonferroni-adjusted for the number of interim looks;
+#   - "precise":     the CI half-width of every delta is below `ci_width`;
+#   - "exhausted":   `max_replicates` were run without either happening.
+#
+# Deltas are per-seed paired differences (treatment minus reference) of the final
+# churn and ARR, accumulated with Welford's algorithm. Workers that finish a
+# replicate are handed the next undecided configuration, so compute flows to the
+# configurations that still need it. Finished replicates enter the statistics in
+# seed order, so every look sees the same seeds whatever the number of workers.
+# ------------------------------------------------------------------------------
+
+DELTA_METRICS = ("churn", "arr")
+
+
+class Welford:
+    """Streaming mean/variance accumulator (Welford's online algorithm)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    def half_width(self, confidence):
+        """Half-width of the two-sided t confidence interval for the mean."""
+        if self.count < 2:
+            return float("inf")
+        return _t_critical(confidence, self.count - 1) * math.sqrt(self.variance / self.count)
+
+
+def _sweep_config(config):
+    """Keeps only the upper-case settings so configs pickle cleanly into worker processes."""
+    return SimpleNamespace(**{k: v for k, v in vars(config).items() if k.isupper()})
+
+
+def _run_task(task):
+    name, config, policies, seed, treatment, reference, crn, enable_influx, cache_dir = task
+    cache = ResultCache(cache_dir) if cache_dir else None
+    metrics = run_replicate(config, policies, seed, crn=crn, enable_influx=enable_influx, cache=cache)
+    deltas = {m: metrics[treatment][m][-1] - metrics[reference][m][-1] for m in DELTA_METRICS}
+    return name, seed, deltas
+
+
+class _ConfigState:
+    def __init__(self, name, config, base_seed):
+        self.name = name
+        self.config = config
+        self.stats = {m: Welford() for m in DELTA_METRICS}
+        self.launched = 0
+        self.in_flight = 0
+        self.status = None
+        self.next_seed = base_seed  # Replicates enter the statistics in seed order
+        self.finished = {}          # Seed → deltas of replicates that finished ahead of their turn
+
+    def summary(self, confidence):
+        row = {"replicates": self.stats[DELTA_METRICS[0]].count, "status": self.status}
+        for metric, acc in self.stats.items():
+            hw = acc.half_width(confidence)
+            row[f"{metric}_delta"] = acc.mean
+            row[f"{metric}_ci_low"] = acc.mean - hw
+            row[f"{metric}_ci_high"] = acc.mean + hw
+        return row
+
+
+def run_sequential_sweep(configs, policies, treatment, reference, ci_width=None, confidence=0.95,
+                         wave_size=4, min_replicates=4, max_replicates=64, base_seed=0,
+                         crn=True, enable_influx=False, processes=None, cache_dir=None):
+    """
+    Runs paired replicates for every configuration until each one is decided.
+
+    Parameters:
+        configs (dict): Configuration name → runtime config namespace.
+        policies (dict): Branch name → picklable zero-argument model factory (or None for
+            the baseline heuristic), as in `experiments.paired.run_replicate`.
+        treatment (str), reference (str): Branch names whose final churn/ARR are differenced.
+        ci_width (dict, optional): Metric → CI half-width target, e.g. {"churn": 0.005}.
+            Without it configurations stop only on significance or `max_replicates`.
+        confidence (float): Nominal confidence level of the reported intervals.
+        wave_size (int): Replicates kept in flight per undecided configuration.
+        min_replicates (int): Replicates required before any stopping rule applies.
+        max_replicates (int): Hard cap per configuration.
+        base_seed (int): Replicate k of every configuration uses seed base_seed + k.
+        processes (int, optional): Worker processes (default: CPU count; 1 runs in-process).
+        cache_dir (str, optional): Result cache shared by the workers, so replicates already run
+            by an overlapping sweep are not simulated again.
+
+    Returns:
+        dict: Configuration name → summary with replicate count, stopping status, and the mean
+        and CI bounds of each delta.
+    """
+    states = {name: _ConfigState(name, _sweep_config(cfg), base_seed) for name, cfg in configs.items()}
+    max_looks = max(1, math.ceil(max_replicates / wave_size))
+    look_confidence = 1 - (1 - confidence) / max_looks
+
+    def next_task():
+        # Favor the undecided configuration with the fewest replicates launched
+        open_states = [s for s in states.values()
+                       if s.status is None and s.launched < max_replicates and s.in_flight < wave_size]
+        if not open_states:
+            return None
+        state = min(open_states, key=lambda s: s.launched)
+        seed = base_seed + state.launched
+        state.launched += 1
+        state.in_flight += 1
+        return (state.name, state.config, policies, seed, treatment, reference, crn, enable_influx, cache_dir)
+
+    def record(name, seed, deltas):
+        # Completion order depends on run time, which can correlate with the outcome, so
+        # replicates are buffered and enter the statistics strictly in seed order
+        state = states[name]
+        state.in_flight -= 1
+        state.finished[seed] = deltas
+        while state.status is None and state.next_seed in state.finished:
+            accumulate(state, state.finished.pop(state.next_seed))
+            state.next_seed += 1
+
+    def accumulate(state, deltas):
+        for metric, value in deltas.items():
+            state.stats[metric].update(value)
+        n = state.stats[DELTA_METRICS[0]].count
+        if n < min_replicates:
+            return
+        if n % wave_size == 0 or n >= max_replicates:
+            significant = all(abs(acc.mean) > acc.half_width(look_confidence) for acc in state.stats.values())
+            precise = ci_width is not None and all(
+                state.stats[m].half_width(confidence) <= width for m, width in ci_width.items())
+            if significant:
+                state.status = "significant"
+            elif precise:
+                state.status = "precise"
+            elif n >= max_replicates:
+                state.status = "exhausted"
+
+    if processes == 1:
+        task = next_task()
+        while task is not None:
+            record(*_run_task(task))
+            task = next_task()
+    else:
+        processes = processes or os.cpu_count() or 1
+        completed = queue.Queue()
+        with multiprocessing.Pool(processes) as pool:
+            in_flight = 0
+            while True:
+                # Keep every worker busy with the next undecided configuration
+                while in_flight < 2 * processes:
+                    task = next_task()
+                    if task is None:
+                        break
+                    pool.apply_async(_run_task, (task,), callback=completed.put, error_callback=completed.put)
+                    in_flight += 1
+                if in_flight == 0:
+                    break
+                result = completed.get()
+                in_flight -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                record(*result)
+
+    for state in states.values():
+        if state.status is None:
+            state.status = "exhausted"
+    return {name: state.summary(confidence) for name, state in states.items()}
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,299 @@
+import json
+import os
+import pickle
+
+import numpy as np
+
+# ------------------------------------------------------------------------------
+# SURROGATE EMULATOR — instant what-if queries from accumulated sweep results
+# ------------------------------------------------------------------------------
+# Final outcomes (churn, ARR retained, energy) vary smoothly with the run
+# parameters, so a regression model trained on past runs can stand in for the
+# simulator across most of a sweep's parameter space:
+#
+#   records_from_cache(cache, ...)    training rows from every ResultCache entry
+#   records_from_results(results)     ... or from SimulationResult objects
+#   SurrogateModel.fit(params, Y)     one Gaussian process per outcome (small sets)
+#                                     or an extra-trees ensemble (large sets)
+#   SurrogateModel.predict / what_if  mean and standard deviation in milliseconds
+#   SurrogateModel.confident          where the emulator is precise enough to skip
+#                                     simulation
+#   SurrogateModel.suggest            the next configurations to simulate: the
+#                                     candidates with the largest predictive
+#                                     uncertainty, spread out across the space
+#
+# Parameters are named settings (config values such as MAX_FATIGUE,
+# FLAT_USER_HEALTH_DECAY, TIER_PROBS or ARCHETYPE_PROBS, or any value the sweep
+# driver records); sequence-valued parameters such as the tier or archetype mix
+# contribute one feature per entry.
+# ------------------------------------------------------------------------------
+
+OUTCOMES = ("final_churn", "final_arr", "energy")
+GP_MAX_ROWS = 1500  # Above this many training rows "auto" switches to the tree ensemble
+
+
+def _outcome_row(result, branch, outcomes):
+    summary = result.summary()[branch]
+    return [float(summary[name]) for name in outcomes]
+
+
+def records_from_results(results, branch, parameters, extra=None, outcomes=OUTCOMES):
+    """
+    Training rows from finished runs.
+
+    Parameters:
+        results (list[SimulationResult]): Runs to learn from.
+        branch (str): Branch whose outcomes are modeled.
+        parameters (list[str]): Config settings used as features.
+        extra (list[dict], optional): Per-result values of parameters that are not config
+            settings (e.g. a swept behavior constant).
+        outcomes (tuple): Summary fields to model (see `SimulationResult.summary`).
+
+    Returns:
+        (params, Y): List of parameter dicts and an array [runs, outcomes].
+    """
+    params, rows = [], []
+    for i, result in enumerate(results):
+        values = {name: getattr(result.config, name) for name in parameters if hasattr(result.config, name)}
+        values.update(extra[i] if extra else {})
+        params.append(values)
+        rows.append(_outcome_row(result, branch, outcomes))
+    return params, np.array(rows)
+
+
+def _json_form(value):
+    """`value` as it reads back from a result's JSON metadata."""
+    return json.loads(json.dumps(value, default=str))
+
+
+def records_from_cache(cache, branch, parameters, outcomes=OUTCOMES, policy=None, options=None):
+    """
+    Training rows from every ResultCache entry that ran `branch` and records `parameters`
+    in its config. Replicates of one configuration (different seeds) are separate rows,
+    so the model learns the seed noise as well.
+
+    Rows are only pooled across one policy version of `branch` and one set of run options
+    (influx, crn, scheduler, event sampler, ...): entries are filtered by `policy` and
+    `options` when given, and a ValueError lists the combinations if several remain.
+    Entries that do not record their policies and options are skipped.
+
+    Parameters:
+        policy (str, optional): Policy version of `branch` (`Simulation.policy_versions()`).
+        options (dict, optional): Run options the entries must match (`Simulation.options`).
+    """
+    from simulation import SimulationResult
+
+    options = None if options is None else _json_form(options)
+    groups = {}
+    for key, _, _ in cache.entries():
+        entry = cache.get(key)
+        if entry is None:
+            continue
+        metrics, header = entry
+        meta = header.get("meta", {})
+        config = meta.get("config", {})
+        if branch not in metrics or any(name not in config for name in parameters):
+            continue
+        if branch not in meta.get("policies", {}) or "options" not in meta:
+            continue
+        version = meta["policies"][branch]
+        if (policy is not None and version != policy) or (options is not None and meta["options"] != options):
+            continue
+        params, rows = groups.setdefault((version, json.dumps(meta["options"], sort_keys=True)), ([], []))
+        params.append({name: config[name] for name in parameters})
+        rows.append(_outcome_row(SimulationResult(config, None, metrics), branch, outcomes))
+
+    if len(groups) > 1:
+        found = "\n".join(f"  policy={version} options={opts} ({len(group[1])} runs)"
+                           for (version, opts), group in groups.items())
+        raise ValueError(f"Cache entries for '{branch}' mix policy versions or run options; "
+                         f"pass policy= and/or options= to pick one:\n{found}")
+    params, rows = next(iter(groups.values()), ([], []))
+    return params, np.array(rows).reshape(len(rows), len(outcomes))
+
+
+class SurrogateModel:
+    """
+    Regression emulator mapping run parameters to final outcomes with uncertainty.
+
+    Parameters:
+        outcomes (tuple): Names of the modeled outcomes (columns of the training targets).
+        kind (str): "gp" (Gaussian process per outcome), "forest" (extra-trees ensemble; the
+            spread of the trees is the uncertainty) or "auto" (gp up to GP_MAX_ROWS rows).
+        random_state (int): Seed of the regressors and of `suggest`.
+    """
+
+    def __init__(self, outcomes=OUTCOMES, kind="auto", random_state=0):
+        if kind not in ("auto", "gp", "forest"):
+            raise ValueError(f"Unknown surrogate kind '{kind}'")
+        self.outcomes = tuple(outcomes)
+        self.kind = kind
+        self.random_state = random_state
+        self.parameters = None   # Parameter name → number of features (1 for scalars)
+        self.features = None
+        self.models = None
+        self.fitted_kind = None
+        self._x_mean = self._x_scale = None
+        self._y_scale = None
+        self._train_x = None
+
+    # --- Features ---
+    def _vectorize(self, params):
+        rows = np.empty((len(params), len(self.features)))
+        for i, values in enumerate(params):
+            col = 0
+            for name, width in self.parameters.items():
+                value = np.ravel(np.asarray(values[name], dtype=float))
+                if value.size != width:
+                    raise ValueError(f"Parameter '{name}' has {value.size} values, expected {width}")
+                rows[i, col:col + width] = value
+                col += width
+        return rows
+
+    def _scaled(self, params):
+        return (self._vectorize(params) - self._x_mean) / self._x_scale
+
+    # --- Training ---
+    def fit(self, params, targets):
+        """
+        Trains the emulator.
+
+        Parameters:
+            params (list[dict]): Parameter values per run (same names in every run).
+            targets (np.ndarray): Outcomes per run, [runs, len(outcomes)].
+        """
+        targets = np.asarray(targets, dtype=float).reshape(len(params), len(self.outcomes))
+        if len(params) < 2:
+            raise ValueError("SurrogateModel needs at least two training runs")
+        self.parameters = {name: np.size(value) for name, value in sorted(params[0].items())}
+        self.features = [name if width == 1 else f"{name}[{i}]"
+                         for name, width in self.parameters.items() for i in range(width)]
+        x = self._vectorize(params)
+        self._x_mean = x.mean(axis=0)
+        self._x_scale = np.where(x.std(axis=0) > 0, x.std(axis=0), 1.0)
+        self._y_scale = np.where(targets.std(axis=0) > 0, targets.std(axis=0), 1.0)
+        self._train_x = (x - self._x_mean) / self._x_scale
+
+        kind = self.kind
+        if kind == "auto":
+            kind = "gp" if len(params) <= GP_MAX_ROWS else "forest"
+        self.fitted_kind = kind
+        if kind == "gp":
+            from sklearn.gaussian_process import GaussianProcessRegressor
+            from sklearn.gaussian_process.kernels import ConstantKernel, Matern, WhiteKernel
+
+            self.models = []
+            for j in range(len(self.outcomes)):
+                kernel = (ConstantKernel(1.0, (1e-3, 1e3))
+                          * Matern(length_scale=np.ones(x.shape[1]), length_scale_bounds=(1e-2, 1e3), nu=2.5)
+                          + WhiteKernel(1e-2, (1e-6, 1e1)))
+                gp = GaussianProcessRegressor(kernel, normalize_y=True, n_restarts_optimizer=2,
+                                              random_state=self.random_state)
+                self.models.append(gp.fit(self._train_x, targets[:, j]))
+        else:
+            from sklearn.ensemble import ExtraTreesRegressor
+
+            forest = ExtraTreesRegressor(n_estimators=200, min_samples_leaf=2, n_jobs=-1,
+                                         random_state=self.random_state)
+            self.models = [forest.fit(self._train_x, targets)]
+        return self
+
+    # --- Queries ---
+    def predict(self, params):
+        """
+        Predicted outcomes for a list of parameter dicts.
+
+        Returns:
+            (mean, std): Arrays [queries, len(outcomes)].
+        """
+        if self.models is None:
+            raise RuntimeError("SurrogateModel is not fitted")
+        x = self._scaled(params)
+        if self.fitted_kind == "gp":
+            mean, std = np.empty((len(x), len(self.outcomes))), np.empty((len(x), len(self.outcomes)))
+            for j, gp in enumerate(self.models):
+                mean[:, j], std[:, j] = gp.predict(x, return_std=True)
+            return mean, std
+        per_tree = np.stack([tree.predict(x) for tree in self.models[0].estimators_])
+        per_tree = per_tree.reshape(len(per_tree), len(x), len(self.outcomes))
+        return per_tree.mean(axis=0), per_tree.std(axis=0)
+
+    def what_if(self, **params):
+        """Outcome name → (mean, std) for one configuration."""
+        mean, std = self.predict([params])
+        return {name: (float(mean[0, j]), float(std[0, j])) for j, name in enumerate(self.outcomes)}
+
+    def confident(self, params, tolerance):
+        """
+        Boolean per query: True where every outcome's predictive std is within `tolerance`
+        (outcome name → absolute std), i.e. where simulation can be skipped.
+        """
+        _, std = self.predict(params)
+        limits = np.array([tolerance.get(name, np.inf) for name in self.outcomes])
+        return (std <= limits).all(axis=1)
+
+    def suggest(self, space, n=8, candidates=4096, rng=None):
+        """
+        Next configurations to simulate: from `candidates` random draws of `space`, greedily
+        picks the `n` with the largest uncertainty (std relative to each outcome's spread in
+        the training data), discounting candidates close to earlier picks and to existing
+        training runs so the batch spreads out.
+
+        Parameters:
+            space (dict): Parameter name → (low, high) (integers if both are ints), a list of
+                choices, or a callable drawing a value from a Generator (e.g. a mix via
+                `lambda rng: rng.dirichlet(np.ones(3))`).
+            n (int): Configurations to return.
+            candidates (int): Random candidates scored.
+            rng (np.random.Generator, optional): Source of the candidates.
+
+        Returns:
+            list[dict]: Parameter dicts, most informative first.
+        """
+        rng = np.random.default_rng(self.random_state) if rng is None else rng
+        pool = [{name: _draw(spec, rng) for name, spec in space.items()} for _ in range(candidates)]
+        _, std = self.predict(pool)
+        x = self._scaled(pool)
+        # Log scores, so discounts from many training runs do not underflow
+        score = np.log(np.maximum((std / self._y_scale).max(axis=1), 1e-300))
+
+        def log_discount(anchor, radius=0.5):
+            near = np.exp(-((x - anchor) ** 2).sum(axis=1) / (2 * radius ** 2))
+            return np.log(np.maximum(1.0 - near, 1e-12))
+
+        for row in self._train_x:
+            score += log_discount(row)
+        picks = []
+        for _ in range(min(n, candidates)):
+            best = int(np.argmax(score))
+            picks.append(pool[best])
+            score += log_discount(x[best])
+            score[best] = -np.inf
+        return picks
+
+    # --- Persistence ---
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def _draw(spec, rng):
+    if callable(spec):
+        return spec(rng)
+    if isinstance(spec, tuple) and len(spec) == 2:
+        low, high = spec
+        if isinstance(low, int) and isinstance(high, int):
+            return int(rng.integers(low, high + 1))
+        return float(rng.uniform(low, high))
+    return spec[int(rng.integers(len(spec)))]
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,250 @@
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+
+import numpy as np
+
+from metrics.store import save_run, load_run
+
+# ------------------------------------------------------------------------------
+# RESULT CACHE — content-addressed store of finished runs
+# ------------------------------------------------------------------------------
+# A run is identified by the SHA-256 of everything that determines its output:
+#
+#   - the resolved runtime config (every upper-case setting);
+#   - the resolved behavior tables: upper-case values of `utils.constants` and the
+#     lookup arrays of `utils.rule_tables`, as loaded in this process;
+#   - the seed and the run options (influx, common random numbers, start time,
+#     chunk size when a branch runs a model, ...);
+#   - the source of the engine modules (ENGINE_MODULES) and, per branch, of the
+#     policy's module plus its `cache_key`. Models without a `cache_key` are
+#     never cached, since their imported code, weights and data are not hashed.
+#
+# Entries are .npz files written with `metrics.store.save_run` (plus an optional
+# snapshot file), named by key. Reads refresh an entry's modification time and
+# writes evict the least recently used entries once the cache exceeds `max_bytes`.
+# ------------------------------------------------------------------------------
+
+DEFAULT_CACHE_DIR = os.path.join("output", "cache")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Modules whose code determines a run's dynamics or recorded metrics; a module that
+# joins the batch loop's import graph belongs here too
+ENGINE_MODULES = (
+    "runner", "simulation", "population.PopulationBranch", "population.dynamics", "population.state",
+    "population.storage", "population.archive", "population.influx", "population.user_generator",
+    "events.row_generator", "strategy.baseline_heuristics", "metrics.store",
+    "utils.random_streams", "utils.rule_tables", "utils.constants", "strategy.scheduler",
+    "events.sampling", "population.kernels", "metrics.sketches",
+)
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _canonical(value):
+    """JSON-ready form of nested tables with non-string keys (e.g. RULES' (state, action) keys)."""
+    if isinstance(value, dict):
+        return sorted((repr(k), _canonical(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source_digest(module_name):
+    spec = importlib.util.find_spec(module_name)
+    with open(spec.origin, "rb") as f:
+        return _digest(f.read())
+
+
+def engine_version():
+    """Digest of the source of every ENGINE_MODULES file."""
+    return _digest(*(f"{name}={_module_source_digest(name)}" for name in ENGINE_MODULES))
+
+
+def tables_digest():
+    """Digest of the behavior tables as currently loaded (constants and rule-table arrays)."""
+    import utils.constants as constants
+    import utils.rule_tables as rule_tables
+
+    parts = []
+    for module in (constants, rule_tables):
+        for name in sorted(vars(module)):
+            if not name.isupper():
+                continue
+            value = getattr(module, name)
+            if isinstance(value, np.ndarray):
+                parts.append(f"{module.__name__}.{name}:{value.dtype}:{value.shape}".encode() + value.tobytes())
+            else:
+                parts.append(f"{module.__name__}.{name}:{json.dumps(_canonical(value), default=repr)}")
+    return _digest(*parts)
+
+
+def array_digest(*arrays):
+    """Digest of array contents (e.g. a trace-seeded population), for use as a run option."""
+    return _digest(*(f"{a.dtype}:{a.shape}".encode() + np.ascontiguousarray(a).tobytes() for a in arrays))
+
+
+def policy_version(model):
+    """
+    Version string of one branch policy: "baseline" for None, otherwise the digest of the
+    model's module source (or class source) plus its `cache_key` attribute or method.
+
+    Only the file defining the model's class is hashed, so edits to helpers it imports or to
+    weights and data it loads are invisible here: a model is cacheable only when it declares a
+    `cache_key` that changes with them. Returns None (the run is not cached) when the model
+    has no `cache_key` or its code cannot be located.
+    """
+    if model is None:
+        return "baseline"
+    import inspect
+
+    extra = getattr(model, "cache_key", None)
+    if callable(extra):
+        extra = extra()
+    if extra is None:
+        return None
+    cls = type(model)
+    try:
+        path = inspect.getsourcefile(cls)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                source = f.read()
+        else:
+            source = inspect.getsource(cls).encode("utf-8")
+    except (OSError, TypeError):
+        return None
+    return _digest(cls.__module__, cls.__qualname__, source, repr(extra))
+
+
+def simulation_key(config, seed, policies, **options):
+    """
+    Cache key of a run, or None if any policy cannot be versioned.
+
+    Parameters:
+        config: Runtime configuration namespace.
+        seed (int): Run seed.
+        policies (dict): Branch name → model instance (or None for the baseline heuristic).
+        **options: Other settings that change results (enable_influx, crn, start_ts, ...).
+    """
+    versions = {name: policy_version(model) for name, model in policies.items()}
+    if any(version is None for version in versions.values()):
+        return None
+    settings = {k: v for k, v in vars(config).items() if k.isupper()}
+    payload = json.dumps(_canonical({
+        "config": settings,
+        "seed": int(seed),
+        "options": options,
+        "policies": versions,
+    }), default=repr)
+    return _digest(payload, tables_digest(), engine_version())
+
+
+class ResultCache:
+    """
+    On-disk, size-bounded LRU cache of run metrics keyed by `simulation_key`.
+
+    Parameters:
+        directory (str): Cache directory (created on first write).
+        max_bytes (int): Total size above which least recently used entries are evicted.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key, kind="metrics"):
+        return os.path.join(self.directory, f"{key}.{kind}.npz")
+
+    def __contains__(self, key):
+        return key is not None and os.path.exists(self._path(key))
+
+    def get(self, key):
+        """Returns (metrics, header) as from `load_run`, or None on a miss."""
+        if key not in self:
+            return None
+        path = self._path(key)
+        try:
+            entry = load_run(path)
+        except (OSError, ValueError, KeyError):
+            return None  # Truncated or foreign file: treat as a miss
+        os.utime(path)
+        return entry
+
+    def snapshots(self, key):
+        """Snapshot arrays stored with the entry (name → array), or None."""
+        path = self._path(key, "snapshots")
+        if key is None or not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def put(self, key, metrics, meta=None, snapshots=None):
+        """
+        Stores the metric series of a run (branch name → metric name → array) under `key`,
+        with optional snapshot arrays, then evicts old entries beyond `max_bytes`.
+        """
+        if key is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if snapshots:
+            self._write(key, "snapshots", lambda f: np.savez_compressed(f, **snapshots))
+        self._write(key, "metrics", lambda f: save_run(f, metrics, meta))
+        self.evict()
+
+    def _write(self, key, kind, writer):
+        # Write then rename, so concurrent readers never see a partial entry
+        final = self._path(key, kind)
+        tmp = f"{final}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            writer(f)
+        os.replace(tmp, final)
+
+    def entries(self):
+        """Cached entries as (key, total bytes, last use time), least recently used first."""
+        if not os.path.isdir(self.directory):
+            return []
+        sizes, used = {}, {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            key = name.split(".", 1)[0]
+            stat = os.stat(os.path.join(self.directory, name))
+            sizes[key] = sizes.get(key, 0) + stat.st_size
+            if name.endswith(".metrics.npz"):
+                used[key] = stat.st_mtime
+        return sorted(((key, sizes[key], used.get(key, 0.0)) for key in sizes), key=lambda e: e[2])
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in `max_bytes`."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            for kind in ("metrics", "snapshots"):
+                try:
+                    os.remove(self._path(key, kind))
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def clear(self):
+        """Removes every entry."""
+        for key, _, _ in self.entries():
+            for kind in ("metrics", "snapshots"):
+                if os.path.exists(self._path(key, kind)):
+                    os.remove(self._path(key, kind))
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
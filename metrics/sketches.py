@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+
+# ------------------------------------------------------------------------------
+# DISTRIBUTION SKETCHES — fixed-memory per-batch state distributions
+# ------------------------------------------------------------------------------
+# For every batch, branch and archetype, the alive population's user_health,
+# fatigue and rolling_activity are summarized two ways, both in memory that does
+# not grow with the population:
+#
+#   histograms   HIST_BINS fixed bins over SKETCH_RANGES (values outside the range
+#                land in the edge bins), built with one np.bincount
+#   quantiles    QUANTILES read from a merging t-digest: values are sorted and
+#                grouped into at most COMPRESSION / 2 centroids per archetype, with
+#                the k1 scale function keeping centroids small in the tails
+#
+# Digests merge by re-compressing their concatenated centroids, so a population
+# stepped in chunks folds each chunk into the batch's digest and keeps at most
+# archetypes × COMPRESSION / 2 centroids between chunks.
+# ------------------------------------------------------------------------------
+
+SKETCH_FIELDS = ("user_health", "fatigue", "rolling_activity")
+SKETCH_RANGES = {"user_health": (0.0, 1.0), "fatigue": (0.0, 5.0), "rolling_activity": (0.0, 1.0)}
+HIST_BINS = 32
+QUANTILES = np.array([0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99])
+COMPRESSION = 100
+
+
+def field_values(state, field):
+    """Per-user values of one sketched field."""
+    return state.rolling_activity() if field == "rolling_activity" else getattr(state, field)
+
+
+def histogram(values, groups, num_groups, field, bins=HIST_BINS):
+    """Counts per (group, bin) over the field's fixed range, shape [num_groups, bins]."""
+    low, high = SKETCH_RANGES[field]
+    idx = np.clip(((values - low) * (bins / (high - low))).astype(np.int64), 0, bins - 1)
+    return np.bincount(groups.astype(np.int64) * bins + idx, minlength=num_groups * bins).reshape(num_groups, bins)
+
+
+class Digest:
+    """
+    Merging t-digest for several groups at once: centroid means and weights, sorted by
+    (group, mean).
+    """
+
+    def __init__(self, num_groups, compression=COMPRESSION):
+        self.num_groups = num_groups
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.groups = np.empty(0, dtype=np.int64)
+
+    def add(self, values, groups, weights=None):
+        """Folds new points (or centroids, with `weights`) into the digest."""
+        weights = np.ones(len(values)) if weights is None else weights
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, weights])
+        groups = np.concatenate([self.groups, groups.astype(np.int64)])
+        if len(means) == 0:
+            return self
+        order = np.lexsort((means, groups))
+        means, weights, groups = means[order], weights[order], groups[order]
+
+        # Quantile of each point's midpoint within its group
+        totals = np.bincount(groups, weights=weights, minlength=self.num_groups)
+        before = np.cumsum(weights) - weights
+        group_start = np.concatenate([[0.0], np.cumsum(totals)[:-1]])
+        q = (before - group_start[groups] + weights / 2) / totals[groups]
+
+        # k1 scale function: unit steps of k = δ/(2π)·asin(2q - 1) keep centroids small near q = 0 and 1
+        half = self.compression / 2
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1)) + half / 2)
+        bucket = groups * (int(half) + 1) + np.clip(k, 0, half).astype(np.int64)
+        merged_w = np.bincount(bucket, weights=weights)
+        merged_m = np.bincount(bucket, weights=weights * means)
+        used = merged_w > 0
+        self.weights = merged_w[used]
+        self.means = merged_m[used] / self.weights
+        self.groups = np.flatnonzero(used) // (int(half) + 1)
+        return self
+
+    def quantiles(self, probs=QUANTILES):
+        """Interpolated quantiles per group, shape [num_groups, len(probs)] (NaN for empty groups)."""
+        out = np.full((self.num_groups, len(probs)), np.nan)
+        bounds = np.searchsorted(self.groups, np.arange(self.num_groups + 1))
+        for g in range(self.num_groups):
+            means = self.means[bounds[g]:bounds[g + 1]]
+            weights = self.weights[bounds[g]:bounds[g + 1]]
+            if len(means) == 0:
+                continue
+            centers = np.cumsum(weights) - weights / 2
+            out[g] = np.interp(np.asarray(probs) * weights.sum(), centers, means)
+        return out
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
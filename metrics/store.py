@@ -0,0 +1,203 @@
+import json
+
+import numpy as np
+
+from metrics.sketches import (
+    COMPRESSION, HIST_BINS, QUANTILES, SKETCH_FIELDS, SKETCH_RANGES, Digest, field_values, histogram
+)
+from utils.constants import STATES, VALUE_TIERS
+from utils.rule_tables import ACTIONS, ARCHETYPE_NAMES
+
+# ------------------------------------------------------------------------------
+# METRICS STORE — preallocated per-batch series and breakdowns
+# ------------------------------------------------------------------------------
+# Each branch records one row per batch into NumPy arrays sized for the whole run:
+#
+#   scalar series      [batches]             churn, energy, arr, penalties, comebacks, alive,
+#                                            and budget_spent / budget_utilization / deferred
+#                                            when a BudgetScheduler caps interventions
+#   breakdowns         [batches, groups]     per archetype / value tier / engagement state /
+#                                            action, built with np.bincount in the same pass
+#                                            that applies the batch update
+#
+#   distributions      [batches, archetype,  <field>_hist and <field>_quantiles of the alive
+#                       bins | quantiles]    population (metrics.sketches); opt-in with
+#                                            `enable_sketches`
+#
+# A whole run (all branches) persists to a single compressed .npz file with
+# `save_run`; group labels are stored alongside so files are self-describing.
+# ------------------------------------------------------------------------------
+
+SERIES = ("churn", "energy", "arr", "penalties", "comebacks", "alive",
+          "budget_spent", "budget_utilization", "deferred")
+
+GROUP_LABELS = {
+    "archetype": ARCHETYPE_NAMES,
+    "tier": VALUE_TIERS,
+    "state": STATES,
+    "action": ACTIONS,
+}
+
+# Breakdown name → group axis
+BREAKDOWNS = {
+    "alive_by_archetype": "archetype",
+    "churned_by_archetype": "archetype",
+    "arr_by_archetype": "archetype",
+    "energy_by_archetype": "archetype",
+    "alive_by_tier": "tier",
+    "churned_by_tier": "tier",
+    "arr_by_tier": "tier",
+    "alive_by_state": "state",
+    "deferred_by_tier": "tier",
+    "actions_taken": "action",
+}
+
+
+class MetricsStore:
+    """
+    Preallocated metric arrays for one branch. Rows are appended batch by batch; the
+    arrays double in size if a run outlives the initial capacity.
+    """
+
+    def __init__(self, capacity=0):
+        self.length = 0
+        self.capacity = 0
+        self.arrays = {}
+        self.sketches = False
+        self._digests = None  # (row, field → Digest) of the row being recorded
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity):
+        for name in SERIES:
+            self._resize(name, (capacity,))
+        for name, group in BREAKDOWNS.items():
+            self._resize(name, (capacity, len(GROUP_LABELS[group])))
+        if self.sketches:
+            for field in SKETCH_FIELDS:
+                self._resize(f"{field}_hist", (capacity, len(ARCHETYPE_NAMES), HIST_BINS))
+                self._resize(f"{field}_quantiles", (capacity, len(ARCHETYPE_NAMES), len(QUANTILES)), fill=np.nan)
+        self.capacity = capacity
+
+    def _resize(self, name, shape, fill=0.0):
+        grown = np.full(shape, fill)
+        if name in self.arrays:
+            grown[:self.length] = self.arrays[name][:self.length]
+        self.arrays[name] = grown
+
+    def enable_sketches(self):
+        """Also records per-batch distribution histograms and quantiles (see `record_distributions`)."""
+        if not self.sketches:
+            self.sketches = True
+            self._allocate(self.capacity)
+
+    def reserve(self, capacity):
+        """Ensures room for at least `capacity` batches without reallocation."""
+        if capacity > self.capacity:
+            self._allocate(capacity)
+
+    def append(self, **values):
+        """Starts a new batch row with the given scalar series values; returns its index."""
+        if self.length == self.capacity:
+            self._allocate(2 * self.capacity)
+        row = self.length
+        self.length += 1
+        self.update(row, **values)
+        return row
+
+    def update(self, row, **values):
+        """Sets scalar series values of an existing row."""
+        for name, value in values.items():
+            self.arrays[name][row] = value
+
+    def record_breakdowns(self, row, state, actions, outcome):
+        """
+        Adds the post-update counts of `state` to the breakdown arrays of `row`, so a
+        population processed in chunks records one call per chunk.
+        `outcome` is the dict returned by `population.dynamics.apply_rules`.
+        """
+        a = self.arrays
+        alive = state.alive
+        archetype = state.archetype
+        tier = state.value
+        n_arch, n_tier = len(ARCHETYPE_NAMES), len(VALUE_TIERS)
+
+        a["alive_by_archetype"][row] += np.bincount(archetype, weights=alive, minlength=n_arch)
+        a["churned_by_archetype"][row] += np.bincount(archetype, weights=outcome["churned"], minlength=n_arch)
+        a["arr_by_archetype"][row] += np.bincount(archetype, weights=outcome["arr"], minlength=n_arch)
+        a["energy_by_archetype"][row] += np.bincount(archetype, weights=outcome["energy"], minlength=n_arch)
+        a["alive_by_tier"][row] += np.bincount(tier, weights=alive, minlength=n_tier)
+        a["churned_by_tier"][row] += np.bincount(tier, weights=outcome["churned"], minlength=n_tier)
+        a["arr_by_tier"][row] += np.bincount(tier, weights=outcome["arr"], minlength=n_tier)
+        a["alive_by_state"][row] += np.bincount(state.state, weights=alive, minlength=len(STATES))
+        a["actions_taken"][row] += np.bincount(actions, weights=outcome["survived"] | outcome["churned"],
+                                              minlength=len(ACTIONS))
+
+    def record_deferred(self, row, state, deferred):
+        """Adds the users whose proposals a BudgetScheduler deferred to `row`, per tier."""
+        self.arrays["deferred_by_tier"][row] += np.bincount(state.value, weights=deferred,
+                                                            minlength=len(VALUE_TIERS))
+
+    def record_distributions(self, row, state):
+        """
+        Adds the alive users of `state` to the distribution histograms of `row` and folds them
+        into the row's quantile digests, so chunked populations record one call per chunk.
+        """
+        if self._digests is None or self._digests[0] != row:
+            self._digests = (row, {field: Digest(len(ARCHETYPE_NAMES), COMPRESSION) for field in SKETCH_FIELDS})
+        alive = state.alive
+        archetype = state.archetype[alive]
+        for field, digest in self._digests[1].items():
+            values = field_values(state, field)[alive]
+            self.arrays[f"{field}_hist"][row] += histogram(values, archetype, len(ARCHETYPE_NAMES), field)
+            self.arrays[f"{field}_quantiles"][row] = digest.add(values, archetype).quantiles()
+
+    def view(self, name):
+        """Filled part of one metric array (a view, not a copy)."""
+        return self.arrays[name][:self.length]
+
+    def to_dict(self):
+        """Copies of every filled metric array."""
+        return {name: values[:self.length].copy() for name, values in self.arrays.items()}
+
+
+def save_run(path, stores, meta=None):
+    """
+    Writes the metrics of a whole run to one compressed .npz file.
+
+    Parameters:
+        path (str): Output file path.
+        stores (dict): Branch name → MetricsStore (or dict of metric arrays).
+        meta (dict, optional): JSON-serializable run metadata (seed, config values, ...).
+    """
+    payload = {}
+    for branch, store in stores.items():
+        arrays = store.to_dict() if isinstance(store, MetricsStore) else store
+        for name, values in arrays.items():
+            payload[f"{branch}/{name}"] = np.asarray(values)
+    header = {"branches": list(stores), "groups": GROUP_LABELS, "breakdowns": BREAKDOWNS, "meta": meta or {},
+              "sketches": {"ranges": SKETCH_RANGES, "bins": HIST_BINS, "quantiles": QUANTILES.tolist()}}
+    payload["__header__"] = np.array(json.dumps(header, default=str))
+    np.savez_compressed(path, **payload)
+
+
+def load_run(path):
+    """
+    Reads a file written by `save_run`.
+
+    Returns:
+        (metrics, header): Branch name → metric name → array, and the decoded header.
+    """
+    with np.load(path) as data:
+        header = json.loads(str(data["__header__"]))
+        metrics = {branch: {} for branch in header["branches"]}
+        for key in data.files:
+            if key == "__header__":
+                continue
+            branch, name = key.split("/", 1)
+            metrics[branch][name] = data[key]
+    return metrics, header
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
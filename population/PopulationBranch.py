@@ -1,65 +1,260 @@
-from config import NUM_USERS
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+import config
+from metrics.store import MetricsStore
 from population.user_generator import generate_single_user
+from population.state import PopulationState, sample_options
+from population.storage import MemmapPopulationState
+from utils.constants import STATES, VALUE_TIERS
+from utils.rule_tables import ARCHETYPE_NAMES, ARCHETYPE_INDEX, STATE_INDEX, TIER_INDEX
+
+# Dict keys whose values are stored as integer codes in PopulationState
+_DECODERS = {"state": STATES, "archetype": ARCHETYPE_NAMES, "value": VALUE_TIERS}
+_ENCODERS = {"state": STATE_INDEX, "archetype": ARCHETYPE_INDEX, "value": TIER_INDEX}
+
+
+class UserView(MutableMapping):
+    """
+    Dict-style, write-through view of one user's slot in a PopulationState.
+    Lets per-user code keep using `user["user_health"] = ...` on array-backed branches.
+    """
+
+    KEYS = ("state", "user_health", "fatigue", "activity", "value",
+            "recovered", "archetype", "cooldown", "prev_user_health")
+
+    def __init__(self, state, slot):
+        self._state = state
+        self._slot = slot
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        if key == "activity":
+            return list(self._state.recent_activity(self._state.window)[self._slot])
+        value = getattr(self._state, key)[self._slot]
+        if key in _DECODERS:
+            return _DECODERS[key][value]
+        return value.item()
+
+    def __setitem__(self, key, value):
+        if key not in self.KEYS or key == "activity":
+            raise KeyError(f"{key} is not writable through a UserView")
+        if key in _ENCODERS:
+            value = _ENCODERS[key][value]
+        getattr(self._state, key)[self._slot] = value
+
+    def __delitem__(self, key):
+        raise TypeError("UserView fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+
+class _UserStates(Mapping):
+    """Read-only uid → UserView mapping over every resident (not yet compacted) user."""
+
+    def __init__(self, branch):
+        self._branch = branch
+
+    def __getitem__(self, uid):
+        return self._branch.user(uid)
+
+    def __iter__(self):
+        return iter(self._branch.uids.tolist())
+
+    def __len__(self):
+        return len(self._branch.state)
+
 
 class PopulationBranch:
     """
     Represents an isolated population in the simulation, either baseline or challenger.
     Each branch maintains its own user states, metrics, and model (if any).
+
+    User state lives in an array-backed PopulationState; `uids[i]` is the uid of slot `i`.
+    Slots start out equal to uids. `compact()` moves churned users to the branch's
+    `archive` (a ChurnArchive, if set) and releases their slots, so the live arrays track
+    alive users; uids never change and `uids` stays sorted, so the uid → slot index is a
+    binary search (`slot_of`).
+
+    Branches without a model are driven by the baseline heuristic. Without an explicit
+    `initial_state`, `num_users` users (default: config.NUM_USERS at construction time)
+    are sampled from `rng` (default: the shared config.rng).
     """
 
-    def __init__(self, name, model=None):
+    def __init__(self, name, model=None, initial_state=None, num_users=None, rng=None):
         self.name = name
         self.model = model  # Optional injected strategy or model controlling this branch
-        # Initialize a population of synthetic users
-        self.user_states = {uid: generate_single_user(uid) for uid in range(NUM_USERS)}
-        self.alive_users = set(self.user_states.keys())     # Track active user IDs
-        self.churned_users = set()                          # Track users who have exited
-        # Time-series tracking of key simulation metrics
-        self.energy_usage = []         # kWh or cost per batch
-        self.arr_retention = []        # Retained ARR over time
-        self.last_actions = {}         # Last strategy applied per user
-        self.penalty_history = []      # Policy penalty tracking (optional)
-        self.comeback_history = []     # Tracks recovered users if logic allows
-
-    def add_user(self, uid):
+        # Initialize a population of synthetic users (or adopt a shared starting population)
+        if initial_state is None:
+            num_users = config.NUM_USERS if num_users is None else num_users
+            initial_state = PopulationState.sample(num_users, config.rng if rng is None else rng,
+                                                   **sample_options(config))
+        self.state = initial_state
+        self._uids = None              # Slot → uid, materialized once compaction breaks slot == uid
+        self.next_uid = len(initial_state)
+        self.archive = None            # Optional ChurnArchive receiving compacted users
+        self.presence_trace = None     # Optional TracePresence replacing sampled presence
+        self.scheduler = None          # Optional BudgetScheduler capping interventions per batch
+        self.event_sampler = None      # Optional EventSampler thinning the model's event feed
+        # Time-series tracking of key simulation metrics (preallocated per-batch arrays)
+        self.metrics_store = MetricsStore()
+        self.last_actions = {}         # Last strategy applied per user (dict-based heuristic only)
+
+    @property
+    def churn_history(self):
+        """Churn ratio per batch."""
+        return self.metrics_store.view("churn")
+
+    @property
+    def energy_usage(self):
+        """kWh or cost per batch."""
+        return self.metrics_store.view("energy")
+
+    @property
+    def arr_retention(self):
+        """Retained ARR over time."""
+        return self.metrics_store.view("arr")
+
+    @property
+    def penalty_history(self):
+        """Policy penalty tracking."""
+        return self.metrics_store.view("penalties")
+
+    @property
+    def comeback_history(self):
+        """Recovered users per batch."""
+        return self.metrics_store.view("comebacks")
+
+    @property
+    def user_states(self):
+        """Mapping of uid → UserView for every resident user, alive or not yet compacted."""
+        return _UserStates(self)
+
+    @property
+    def alive_users(self):
+        """Set of currently active user IDs."""
+        return set(self.uids[self.state.alive].tolist())
+
+    @property
+    def churned_users(self):
+        """Set of user IDs that have exited (resident and archived)."""
+        churned = set(self.uids[~self.state.alive].tolist())
+        if self.archive is not None:
+            churned.update(self.archive.uids().tolist())
+        return churned
+
+    @property
+    def uids(self):
+        """Uid of every resident slot, in increasing order."""
+        return np.arange(self.next_uid, dtype=np.int64) if self._uids is None else self._uids
+
+    @property
+    def is_dense(self):
+        """True while no user has been compacted away, i.e. every slot equals its uid."""
+        return self._uids is None
+
+    def slot_of(self, uid):
+        """Slot of a resident user; raises KeyError for unknown or compacted uids."""
+        if self.is_dense:
+            if not 0 <= uid < self.next_uid:
+                raise KeyError(uid)
+            return int(uid)
+        slot = int(np.searchsorted(self.uids, uid))
+        if slot == len(self.uids) or self.uids[slot] != uid:
+            raise KeyError(uid)
+        return slot
+
+    def add_user(self, uid=None, rng=None):
         """Add a new user to the population dynamically (e.g. influx)."""
-        self.user_states[uid] = generate_single_user(uid)
-        self.alive_users.add(uid)
+        uid = self.next_uid if uid is None else uid
+        if uid != self.next_uid:
+            raise ValueError(f"Next uid for branch '{self.name}' is {self.next_uid}, got {uid}")
+        user = generate_single_user(uid, config.rng if rng is None else rng)
+        self.add_users(PopulationState.from_user_dicts([user]))
+
+    def add_users(self, new_state):
+        """Append a block of new users (a 1-D PopulationState) with consecutive uids."""
+        self.state.append(new_state)
+        if not self.is_dense:
+            new_uids = np.arange(self.next_uid, self.next_uid + len(new_state), dtype=np.int64)
+            self._uids = np.concatenate([self._uids, new_uids])
+        self.next_uid += len(new_state)
 
     def remove_user(self, uid):
         """Mark a user as churned and remove them from active set."""
-        self.churned_users.add(uid)
-        self.alive_users.discard(uid)
-        
+        self.state.alive[self.slot_of(uid)] = False
+
     def user(self, uid):
         """Retrieve the full user state object for a given uid."""
-        return self.user_states[uid]
+        return UserView(self.state, self.slot_of(uid))
 
     def is_alive(self, uid):
         """Check if a user is currently active."""
-        return uid in self.alive_users
+        try:
+            return bool(self.state.alive[self.slot_of(uid)])
+        except KeyError:
+            return False
 
     def alive_uids(self):
         """Return a list of all currently active user IDs."""
-        return list(self.alive_users)
+        return self.uids[self.state.alive].tolist()
+
+    def compact(self, batch=-1):
+        """
+        Moves churned users out of the live arrays: their final state is appended to
+        `archive` (if set, tagged with `batch`) and their slots are released.
 
-    def update_metrics(self, energy, arr, penalties, comebacks):
+        Returns the number of users compacted.
+        """
+        dead = ~self.state.alive
+        num_dead = int(np.count_nonzero(dead))
+        if num_dead == 0:
+            return 0
+        if self.archive is not None:
+            self.archive.append(self.uids[dead], self.state.select(dead), batch)
+        alive = ~dead
+        self._uids = self.uids[alive]
+        if isinstance(self.state, MemmapPopulationState):
+            self.state.compress(alive)  # In place, chunk by chunk, so the population never leaves disk
+        else:
+            self.state = self.state.select(alive)
+        return num_dead
+
+    def num_alive(self):
+        """Count of currently active users."""
+        return int(np.count_nonzero(self.state.alive))
+
+    def to_state(self):
+        """Export the currently alive users as an array-backed PopulationState."""
+        return self.state.select(self.state.alive)
+
+    def metrics(self):
+        """Snapshot of this branch's metric series and breakdowns as a dict of arrays."""
+        return self.metrics_store.to_dict()
+
+    def update_metrics(self, energy, arr, penalties, comebacks, churn=0.0, alive=None):
         """
         Store key performance metrics for this batch:
         - energy (float): Energy or cost incurred
         - arr (float): ARR retained
         - penalties (int): Costly or penalized interventions
         - comebacks (int): Previously churned users reactivated
-        """
+        - churn (float): Churn ratio after this batch
+        - alive (int, optional): Active users after this batch (default: counted now)
 
-        self.energy_usage.append(energy)
-        self.arr_retention.append(arr)
-        self.penalty_history.append(penalties)
-        self.comeback_history.append(comebacks)
-    
+        Returns the row index of the batch in `metrics_store`.
+        """
+        alive = self.num_alive() if alive is None else alive
+        return self.metrics_store.append(energy=energy, arr=arr, penalties=penalties,
+                                         comebacks=comebacks, churn=churn, alive=alive)
 
-    
 
 # Copyright 2025 Divine Comedy Labs LLC
 # Released under the Polyform Noncommercial License 1.0.0
-# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
\ No newline at end of file
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+from population.state import FIELDS
+from utils.constants import ROLLING_WINDOW
+
+# ------------------------------------------------------------------------------
+# CHURN ARCHIVE — append-only storage for compacted users
+# ------------------------------------------------------------------------------
+# When a branch compacts, the final state of every churned user is appended to a
+# flat binary file of fixed-size records (see `archive_dtype`) and their slots are
+# released from the live PopulationState. Records hold the uid, the batch at which
+# the user was compacted, every FIELDS value and the activity window (oldest
+# first), so the archive can be reloaded with `np.fromfile` for post-run analysis.
+# ------------------------------------------------------------------------------
+
+
+def archive_dtype(window=ROLLING_WINDOW):
+    """Structured record dtype of an archive written with the given activity window."""
+    return np.dtype(
+        [("uid", np.int64), ("compacted_at", np.int64)]
+        + [(name, dtype) for name, dtype in FIELDS.items()]
+        + [("activity", np.uint8, (window,))]
+    )
+
+
+class ChurnArchive:
+    """
+    Append-only file of churned users' final states. Creating an archive starts an empty
+    file at `path`, replacing any previous one.
+    """
+
+    def __init__(self, path, window=ROLLING_WINDOW):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.window = window
+        self.dtype = archive_dtype(window)
+        open(path, "wb").close()
+
+    def append(self, uids, state, batch):
+        """Appends one record per user of the 1-D `state`, whose uids are `uids`."""
+        records = np.zeros(len(uids), dtype=self.dtype)
+        records["uid"] = uids
+        records["compacted_at"] = batch
+        for name in FIELDS:
+            records[name] = getattr(state, name)
+        records["activity"] = state.recent_activity(state.window)
+        with open(self.path, "ab") as f:
+            f.write(records.tobytes())
+
+    def load(self):
+        """Every archived record, in append order."""
+        return np.fromfile(self.path, dtype=self.dtype)
+
+    def uids(self):
+        """Uids of every archived user."""
+        return self.load()["uid"]
+
+    def __len__(self):
+        return os.path.getsize(self.path) // self.dtype.itemsize
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
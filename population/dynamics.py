@@ -0,0 +1,112 @@
+import numpy as np
+
+from utils.constants import FLAT_USER_HEALTH_DECAY
+from utils.rule_tables import (
+    NEXT_STATE, D_HEALTH, PENALTY, ACTION_COST, TIER_ARR_TABLE,
+    ARCH_HEALTH_MULT, ARCH_FATIGUE_MULT, ARCH_ROW_MEAN, ARCH_VOLATILITY, ARCH_STATE_ROW_MULT
+)
+
+# ------------------------------------------------------------------------------
+# VECTORIZED DYNAMICS
+# ------------------------------------------------------------------------------
+# Whole-population versions of the per-user logic in `events.row_generator` and
+# the update step of `runner.run_batch_loop`. Every function operates on a
+# PopulationState (any leading shape) and takes its random draws as arguments,
+# so callers decide how randomness is shared between branches or environments.
+# ------------------------------------------------------------------------------
+
+CHURN_HEALTH_FLOOR = 0.01     # Users whose health falls below this are removed
+COMEBACK_LOW = 0.4            # Health a user must have dipped below ...
+COMEBACK_HIGH = 0.6           # ... before climbing above this counts as a comeback
+
+# Health bands used by `simulate_absence_pressure`: lower edges and presence probability
+PRESENCE_EDGES = np.array([0.2, 0.5, 0.8])
+PRESENCE_PROBS = np.array([0.4, 0.8, 0.95, 1.0])
+
+
+def presence_probability(user_health):
+    """Probability that a user appears in a batch given their health band."""
+    return PRESENCE_PROBS[np.searchsorted(PRESENCE_EDGES, user_health, side="right")]
+
+
+def sample_presence(state, uniforms):
+    """Health-gated presence for every user, driven by U(0, 1) draws of the state's shape."""
+    return uniforms < presence_probability(state.user_health)
+
+
+def expected_row_counts(state):
+    """
+    Pre-noise event count per user: archetype row mean damped by health, fatigue,
+    rolling activity, engagement state and archetype cooldown.
+    """
+    archetype = state.archetype
+    fatigue_damp = np.maximum(0.0, 1 - state.fatigue)
+    cooldown_factor = 1 - np.minimum(1.0, 1 / (state.cooldown + 1))
+    return (ARCH_ROW_MEAN[archetype] * state.user_health * fatigue_damp * state.rolling_activity()
+            * ARCH_STATE_ROW_MULT[archetype, state.state] * cooldown_factor)
+
+
+def sample_row_counts(state, present, normals):
+    """
+    Noisy per-user event counts from standard-normal draws, zeroed for absent users.
+    Equivalent to `int(np.clip(np.random.normal(base, base * volatility), 0, None))`.
+    """
+    base = expected_row_counts(state)
+    noisy = base + base * ARCH_VOLATILITY[state.archetype] * normals
+    counts = np.floor(np.clip(noisy, 0, None)).astype(np.int32)
+    counts[~present] = 0
+    return counts
+
+
+def apply_rules(state, actions, max_fatigue, mask=None, decay=FLAT_USER_HEALTH_DECAY):
+    """
+    Applies one RULES transition to every user selected by `mask` (default: alive users).
+
+    Health moves by the rule's d_health scaled by archetype multiplier and log1p(1 - health),
+    then decays by `decay` (a run's config.FLAT_USER_HEALTH_DECAY); fatigue grows by the rule penalty. Users falling
+    below CHURN_HEALTH_FLOOR are marked not alive.
+
+    Returns:
+        dict of per-user arrays: "penalty", "energy", "arr" (zero outside survivors),
+        and "survived", "churned", "comeback" boolean masks.
+    """
+    if mask is None:
+        mask = state.alive
+    actions = np.asarray(actions)
+    current = state.state
+    archetype = state.archetype
+    health = state.user_health
+
+    # Flat (state, action) index so each table lookup is a single gather
+    rule = current.astype(np.intp) * D_HEALTH.shape[1] + actions
+    d_health = D_HEALTH.take(rule)
+    penalty = PENALTY.take(rule)
+
+    new_health = np.maximum(0.0, health + d_health * ARCH_HEALTH_MULT[archetype] * np.log1p(1 - health))
+    new_health = np.maximum(0.0, new_health - decay)
+    new_fatigue = np.minimum(max_fatigue, state.fatigue + penalty * ARCH_FATIGUE_MULT[archetype])
+
+    comeback = mask & ~state.recovered & (state.prev_user_health < COMEBACK_LOW) & (new_health > COMEBACK_HIGH)
+    churned = mask & (new_health < CHURN_HEALTH_FLOOR)
+    survived = mask & ~churned
+
+    np.copyto(state.user_health, new_health, where=mask)
+    np.copyto(state.fatigue, new_fatigue, where=mask)
+    np.copyto(state.state, NEXT_STATE.take(rule), where=mask)
+    np.copyto(state.prev_user_health, new_health, where=mask)
+    state.recovered |= comeback
+    state.alive &= ~churned
+
+    return {
+        "penalty": np.where(survived, penalty, 0.0),
+        "energy": np.where(survived, ACTION_COST.take(actions), 0.0),
+        "arr": np.where(survived, TIER_ARR_TABLE.take(state.value), 0.0),
+        "survived": survived,
+        "churned": churned,
+        "comeback": comeback,
+    }
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -1,5 +1,6 @@
 import numpy as np
 from utils.constants import ARCHETYPES
+from utils.rule_tables import ARCH_FATIGUE_MULT
 
 def compute_user_influx_rate(user_states: dict) -> float:
     """
@@ -48,6 +49,41 @@ def compute_user_influx_rate(user_states: dict) -> float:
     return influx_rate
 
 
+def compute_influx_rate(state, chunk_size=None) -> float:
+    """
+    Array-backed equivalent of `compute_user_influx_rate` for a 1-D PopulationState,
+    computed over the alive users only: churned users (whether still resident or already
+    compacted away) neither dilute the health estimate nor count toward the size cap.
+
+    Args:
+        state (PopulationState): The branch's live user store.
+        chunk_size (int, optional): Accumulate over slot chunks of this size (bounded memory).
+
+    Returns:
+        float: Proportion of new users to introduce in the next batch.
+    """
+    num_users = len(state)
+    chunk_size = chunk_size or max(num_users, 1)
+    num_alive, engagement, fatigue = 0, 0.0, 0.0
+    for start in range(0, num_users, chunk_size):
+        part = state.view(start, start + chunk_size)
+        alive = part.alive
+        num_alive += int(np.count_nonzero(alive))
+        engagement += np.sum(part.rolling_activity()[alive])
+        fatigue_mult = ARCH_FATIGUE_MULT[part.archetype[alive]]
+        fatigue += np.sum(part.fatigue[alive] / np.maximum(0.01, fatigue_mult))
+    if num_alive == 0:
+        return 0
+
+    mean_engagement = engagement / num_alive
+    mean_fatigue = fatigue / num_alive
+
+    health = np.clip((mean_engagement * 1.25) - (mean_fatigue * 0.75), 0.0, 1.0)
+    base_growth_rate = 0.002
+    size_penalty = np.clip(num_alive / 10000, 0.0, 1.0)
+    return base_growth_rate * health * (1.0 - size_penalty)
+
+
 # Copyright 2025 Divine Comedy Labs LLC
 # Released under the Polyform Noncommercial License 1.0.0
 # See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
\ No newline at end of file
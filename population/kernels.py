@@ -0,0 +1,247 @@
+import importlib.util
+import math
+import os
+
+import numpy as np
+
+from population.dynamics import (
+    CHURN_HEALTH_FLOOR, COMEBACK_HIGH, COMEBACK_LOW, PRESENCE_EDGES, PRESENCE_PROBS,
+    apply_rules, sample_presence, sample_row_counts,
+)
+from strategy.baseline_heuristics import CHAOS_ACTIONS, compute_baseline_actions_vectorized
+from utils.constants import FLAT_USER_HEALTH_DECAY
+from utils.rule_tables import (
+    ACTION_COST, ACTION_INDEX, ARCH_FATIGUE_MULT, ARCH_HEALTH_MULT, ARCH_ROW_MEAN, ARCH_STATE_ROW_MULT,
+    ARCH_VOLATILITY, D_HEALTH, NEXT_STATE, PENALTY, TIER_ARR_TABLE, TIER_INDEX,
+)
+
+# ------------------------------------------------------------------------------
+# FUSED KERNELS — optional Numba path for model-free branches
+# ------------------------------------------------------------------------------
+# One batch of a baseline branch is presence sampling → row counts → activity push
+# → baseline policy → RULES update. The NumPy path runs these as separate
+# whole-population passes with a temporary array per step. With Numba installed,
+# `fused_baseline_step` runs them as one multithreaded pass (`prange`) over the
+# state arrays, one user at a time, with the same random draws and the same
+# floating-point operations in the same order (log1p, whose vectorized NumPy
+# version can differ from libm in the last bit, is precomputed with NumPy).
+# Results are identical to the NumPy path: `tests/test_kernels.py` checks every
+# state array and outcome against it for each backend, and
+# `python -m benchmarks.bench_kernels` repeats the check at scale. Activity bits are
+# uint8, so they are widened to a signed type before any subtraction.
+#
+# Without Numba the NumPy path is used. `backend="python"` runs the fused kernel
+# uncompiled, which is slow but lets the parity check exercise the kernel logic
+# anywhere.
+# ------------------------------------------------------------------------------
+
+# Numba is optional and slow to import, so it is only loaded when the kernel is compiled
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+prange = range  # Replaced by numba.prange before compilation
+
+BACKENDS = ("auto", "numpy", "numba", "python")
+POLICY_COOLDOWN = 3
+CHAOS_PROB = 0.03
+
+# Action codes used by the baseline rules, in the order the kernel expects them
+_CODES = np.array([ACTION_INDEX[a] for a in ("observe", "reinforce", "boost", "suppress", "delay", "escalate")],
+                  dtype=np.int8)
+
+
+def _fused_step(health, fatigue, state, archetype, value, cooldown, recovered, prev_health, alive,
+                last_action, activity, activity_sum, cursor,
+                presence_u, row_normals, lapse_u, rule_u, chaos_u, pick_u, log_headroom,
+                batch, max_fatigue, policy_cooldown, chaos_prob, pro, enterprise, codes,
+                presence_edges, presence_probs, row_mean, volatility, state_row_mult,
+                health_mult, fatigue_mult, d_health, penalty_table, next_state, action_cost, tier_arr,
+                chaos_actions, decay, churn_floor, comeback_low, comeback_high,
+                counts, actions, penalty_out, energy_out, arr_out, survived, churned, comeback):
+    """Per-user body of one baseline batch; see `numpy_baseline_step` for the reference."""
+    n = health.shape[0]
+    window = activity.shape[1]
+    observe, reinforce, boost, suppress, delay, escalate = codes[0], codes[1], codes[2], codes[3], codes[4], codes[5]
+    for i in prange(n):
+        h = health[i]
+        f = fatigue[i]
+        s = state[i]
+        a = archetype[i]
+
+        # --- Presence and row count (pre-push rolling activity) ---
+        band = 0
+        for edge in presence_edges:
+            if h >= edge:
+                band += 1
+        present = presence_u[i] < presence_probs[band]
+        fatigue_damp = max(0.0, 1 - f)
+        cooldown_factor = 1 - min(1.0, 1 / (cooldown[i] + 1))
+        rolling = activity_sum[i] / window
+        base = row_mean[a] * h * fatigue_damp * rolling * state_row_mult[a, s] * cooldown_factor
+        noisy = base + base * volatility[a] * row_normals[i]
+        count = math.floor(max(noisy, 0.0))
+        if not present or not alive[i]:
+            count = 0
+        counts[i] = count
+
+        # --- Activity push ---
+        bit = 1 if count > 0 else 0
+        activity_sum[i] += bit - np.int64(activity[i, cursor])  # Signed: uint8 would wrap under Numba
+        activity[i, cursor] = bit
+
+        # --- Baseline policy (post-push activity; cursor has moved one slot) ---
+        trend = 0
+        for k in range(6):
+            b = np.int64(activity[i, (cursor + 1 - 6 + k) % window])
+            trend += b if k >= 3 else -b
+        blocked = not (lapse_u[i] < 0.1) and (batch - last_action[i]) < policy_cooldown
+        premium = value[i] >= pro
+        is_enterprise = value[i] == enterprise
+        u = rule_u[i]
+        if f >= 4:
+            if u < 0.15 and premium:
+                act = boost
+            elif u < 0.15:
+                act = reinforce
+            else:
+                act = suppress
+        elif h >= 0.85:
+            if f < 3:
+                act = observe
+            elif u > 0.1:
+                act = delay
+            else:
+                act = boost
+        elif h >= 0.5:
+            if trend >= 0:
+                act = reinforce
+            elif premium:
+                act = boost
+            else:
+                act = reinforce
+        elif is_enterprise and f < 3:
+            act = escalate
+        elif is_enterprise:
+            act = delay
+        elif f < 4:
+            act = boost
+        else:
+            act = observe
+        if chaos_u[i] < chaos_prob:
+            act = chaos_actions[min(int(pick_u[i] * len(chaos_actions)), len(chaos_actions) - 1)]
+        if blocked:
+            act = delay
+        actions[i] = act
+        if alive[i] and not blocked:
+            last_action[i] = batch
+
+        # --- RULES update (alive users only) ---
+        penalty_out[i] = 0.0
+        energy_out[i] = 0.0
+        arr_out[i] = 0.0
+        survived[i] = False
+        churned[i] = False
+        comeback[i] = False
+        if not alive[i]:
+            continue
+        p = penalty_table[s, act]
+        new_health = max(0.0, h + d_health[s, act] * health_mult[a] * log_headroom[i])
+        new_health = max(0.0, new_health - decay)
+        new_fatigue = min(max_fatigue, f + p * fatigue_mult[a])
+        comeback[i] = not recovered[i] and prev_health[i] < comeback_low and new_health > comeback_high
+        churned[i] = new_health < churn_floor
+        survived[i] = not churned[i]
+        health[i] = new_health
+        fatigue[i] = new_fatigue
+        state[i] = next_state[s, act]
+        prev_health[i] = new_health
+        recovered[i] = recovered[i] or comeback[i]
+        alive[i] = not churned[i]
+        if survived[i]:
+            penalty_out[i] = p
+            energy_out[i] = action_cost[act]
+            arr_out[i] = tier_arr[value[i]]
+
+
+_compiled = None
+
+
+def _kernel(backend):
+    """The fused kernel, compiled on first use unless `backend` is "python"."""
+    global _compiled, prange
+    if backend == "python":
+        return _fused_step
+    if _compiled is None:
+        import numba
+
+        if "NUMBA_THREADING_LAYER" not in os.environ:
+            # Counterfactuals and sweeps fork workers: after a fork the TBB layer hangs the
+            # parent at exit and GNU OpenMP aborts the child, while workqueue is fork-safe
+            numba.config.THREADING_LAYER = "workqueue"
+        prange = numba.prange  # Resolved as a global when Numba compiles the kernel
+        _compiled = numba.njit(parallel=True, cache=True)(_fused_step)
+    return _compiled
+
+
+def numpy_baseline_step(state, presence_u, row_normals, policy_uniforms, batch, max_fatigue,
+                        decay=FLAT_USER_HEALTH_DECAY):
+    """
+    Reference (NumPy) batch of a model-free branch on a 1-D state, as the runner composes it.
+
+    Returns:
+        (counts, actions, outcome): Event rows per user, ACTIONS index per user and the
+        `apply_rules` outcome dict.
+    """
+    counts = sample_row_counts(state, sample_presence(state, presence_u), row_normals)
+    counts[~state.alive] = 0
+    state.push_activity(counts > 0)
+    actions = compute_baseline_actions_vectorized(batch, state, policy_uniforms)
+    return counts, actions, apply_rules(state, actions, max_fatigue, decay=decay)
+
+
+def fused_baseline_step(state, presence_u, row_normals, policy_uniforms, batch, max_fatigue,
+                        decay=FLAT_USER_HEALTH_DECAY, backend="auto"):
+    """
+    One batch of a model-free branch: presence, row counts, activity push, baseline policy
+    and RULES update. Same arguments and results as `numpy_baseline_step`.
+
+    Parameters:
+        backend (str): "auto" (Numba when installed, else NumPy), "numpy", "numba" or
+            "python" (the fused kernel uncompiled; for parity checks on small populations).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{backend}'; expected one of {BACKENDS}")
+    if backend == "auto":
+        backend = "numba" if HAVE_NUMBA else "numpy"
+    if backend == "numba" and not HAVE_NUMBA:
+        raise ImportError("The numba kernel backend requires numba (pip install numba)")
+    if backend == "numpy":
+        return numpy_baseline_step(state, presence_u, row_normals, policy_uniforms, batch, max_fatigue, decay)
+
+    n = len(state)
+    counts = np.empty(n, dtype=np.int32)
+    actions = np.empty(n, dtype=np.int8)
+    outcome = {name: np.empty(n) for name in ("penalty", "energy", "arr")}
+    outcome.update({name: np.empty(n, dtype=bool) for name in ("survived", "churned", "comeback")})
+    lapse_u, rule_u, chaos_u, pick_u = (np.ascontiguousarray(u) for u in policy_uniforms)
+    # NumPy's vectorized log1p may differ from libm's in the last bit, so it is taken here
+    log_headroom = np.log1p(1 - state.user_health)
+    # Plain ndarray views, so memory-mapped populations are updated in place as well
+    arrays = [np.asarray(getattr(state, name)) for name in (
+        "user_health", "fatigue", "state", "archetype", "value", "cooldown", "recovered",
+        "prev_user_health", "alive", "last_action", "activity", "activity_sum")]
+    _kernel(backend)(
+        *arrays, state.cursor,
+        presence_u, row_normals, lapse_u, rule_u, chaos_u, pick_u, log_headroom,
+        batch, float(max_fatigue), POLICY_COOLDOWN, CHAOS_PROB, TIER_INDEX["pro"], TIER_INDEX["enterprise"], _CODES,
+        PRESENCE_EDGES, PRESENCE_PROBS, ARCH_ROW_MEAN, ARCH_VOLATILITY, ARCH_STATE_ROW_MULT,
+        ARCH_HEALTH_MULT, ARCH_FATIGUE_MULT, D_HEALTH, PENALTY, NEXT_STATE, ACTION_COST, TIER_ARR_TABLE,
+        CHAOS_ACTIONS, float(decay), CHURN_HEALTH_FLOOR, COMEBACK_LOW, COMEBACK_HIGH,
+        counts, actions, outcome["penalty"], outcome["energy"], outcome["arr"],
+        outcome["survived"], outcome["churned"], outcome["comeback"],
+    )
+    state.advance_cursor()
+    return counts, actions, outcome
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
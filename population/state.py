@@ -0,0 +1,175 @@
+import numpy as np
+
+from utils.constants import ROLLING_WINDOW
+from utils.rule_tables import (
+    ARCHETYPE_NAMES, ARCHETYPE_INDEX, STATE_INDEX, TIER_INDEX, ARCH_COOLDOWN, TIER_PROB_TABLE
+)
+
+# ------------------------------------------------------------------------------
+# POPULATION STATE — struct-of-arrays user storage
+# ------------------------------------------------------------------------------
+# PopulationState holds the same per-user fields as the dicts built by
+# `generate_single_user`, but as one NumPy array per field. Arrays may carry any
+# leading shape: (num_users,) for a single population, or (num_envs, num_users)
+# when many independent copies are stepped together.
+#
+# Activity history is a ring buffer shared by every user in the state: all users
+# advance one slot per batch, so a single cursor locates the newest entry.
+# ------------------------------------------------------------------------------
+
+# Field name → dtype for every per-user array (activity is handled separately)
+FIELDS = {
+    "user_health": np.float64,
+    "fatigue": np.float64,
+    "state": np.int8,
+    "archetype": np.int8,
+    "value": np.int8,
+    "cooldown": np.int16,
+    "recovered": np.bool_,
+    "prev_user_health": np.float64,
+    "alive": np.bool_,
+    "last_action": np.int32,
+}
+
+
+def sample_options(config):
+    """`PopulationState.sample` mix overrides (TIER_PROBS, ARCHETYPE_PROBS) of a runtime config."""
+    return {"tier_probs": getattr(config, "TIER_PROBS", None),
+            "archetype_probs": getattr(config, "ARCHETYPE_PROBS", None)}
+
+
+class PopulationState:
+    """
+    Array-backed user population. Each entry of FIELDS is an attribute of the given shape;
+    `activity` has an extra trailing ROLLING_WINDOW axis and `activity_sum` caches its row sums.
+    """
+
+    def __init__(self, shape, window=ROLLING_WINDOW):
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        self.shape = shape
+        self.window = window
+        for name, dtype in FIELDS.items():
+            setattr(self, name, np.zeros(shape, dtype=dtype))
+        self.activity = np.ones(shape + (window,), dtype=np.uint8)
+        self.activity_sum = np.full(shape, window, dtype=np.int16)
+        self.cursor = 0  # Index of the slot that the next push will overwrite
+
+    @classmethod
+    def sample(cls, shape, rng, window=ROLLING_WINDOW, tier_probs=None, archetype_probs=None):
+        """
+        Draws a fresh population from the same priors as `generate_single_user`:
+        uniform archetype, health ~ U(0.6, 1.0) and value tier from TIER_PROBS.
+        `tier_probs` and `archetype_probs` (ARCHETYPE_NAMES order) override the mixes; see
+        `sample_options` for taking them from a runtime config.
+        """
+        state = cls(shape, window=window)
+        if archetype_probs is None:
+            state.archetype[...] = rng.integers(0, len(ARCHETYPE_NAMES), size=state.shape)
+        else:
+            state.archetype[...] = rng.choice(len(ARCHETYPE_NAMES), p=archetype_probs, size=state.shape)
+        state.user_health[...] = rng.uniform(0.6, 1.0, size=state.shape)
+        tier_probs = TIER_PROB_TABLE if tier_probs is None else tier_probs
+        state.value[...] = rng.choice(len(TIER_PROB_TABLE), p=tier_probs, size=state.shape)
+        state.cooldown[...] = ARCH_COOLDOWN[state.archetype]
+        state.prev_user_health[...] = 1.0
+        state.alive[...] = True
+        state.last_action[...] = -3  # Matches the heuristic's default "long ago" cooldown
+        return state
+
+    @classmethod
+    def from_user_dicts(cls, users, window=ROLLING_WINDOW):
+        """Builds a 1-D state from an iterable of user dicts as produced by `generate_single_user`."""
+        users = list(users)
+        state = cls(len(users), window=window)
+        for i, user in enumerate(users):
+            state.user_health[i] = user["user_health"]
+            state.fatigue[i] = user["fatigue"]
+            state.state[i] = STATE_INDEX[user["state"]]
+            state.archetype[i] = ARCHETYPE_INDEX[user["archetype"]]
+            state.value[i] = TIER_INDEX[user["value"]]
+            state.cooldown[i] = user["cooldown"]
+            state.recovered[i] = user["recovered"]
+            state.prev_user_health[i] = user.get("prev_user_health", 1.0)
+            # Oldest entry goes in slot 0 so the cursor (0) points just past the newest
+            history = list(user["activity"])[-window:]
+            state.activity[i, :] = 1
+            state.activity[i, window - len(history):] = history
+            state.activity_sum[i] = state.activity[i].sum()
+        state.alive[...] = True
+        state.last_action[...] = -3
+        return state
+
+    def rolling_activity(self):
+        """Mean of the activity window per user (the `np.mean(user["activity"])` of the dict path)."""
+        return self.activity_sum / self.window
+
+    def recent_activity(self, k):
+        """Returns the last k activity bits per user, oldest first, shape [..., k]."""
+        idx = (self.cursor - k + np.arange(k)) % self.window
+        return self.activity[..., idx]
+
+    def push_activity(self, bits):
+        """Appends one activity bit per user, evicting the oldest entry of the window."""
+        bits = np.asarray(bits, dtype=np.uint8)
+        slot = self.activity[..., self.cursor]
+        self.activity_sum += bits.astype(np.int16) - slot
+        self.activity[..., self.cursor] = bits
+        self.advance_cursor()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def append(self, other):
+        """
+        Appends the users of another 1-D state in place (e.g. influx).
+        The incoming activity histories are rotated to line up with this state's cursor.
+        """
+        shift = self.cursor - other.cursor
+        for name in FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name), getattr(other, name)]))
+        self.activity = np.concatenate([self.activity, np.roll(other.activity, shift, axis=-1)])
+        self.activity_sum = np.concatenate([self.activity_sum, other.activity_sum])
+        self.shape = (self.shape[0] + other.shape[0],) + self.shape[1:]
+
+    def view(self, start, stop):
+        """
+        1-D state over slots [start, stop) that shares this state's arrays, so in-place
+        updates write through. The view has its own cursor copy: after pushing activity into
+        every view of a batch, advance this state's cursor once with `advance_cursor`.
+        """
+        part = PopulationState.__new__(PopulationState)
+        part.window = self.window
+        part.cursor = self.cursor
+        for name in list(FIELDS) + ["activity", "activity_sum"]:
+            setattr(part, name, getattr(self, name)[start:stop])
+        part.shape = (len(part.alive),)
+        return part
+
+    def advance_cursor(self):
+        """Moves the ring cursor one slot, as `push_activity` does."""
+        self.cursor = (self.cursor + 1) % self.window
+
+    def select(self, mask):
+        """New 1-D state holding the users where `mask` is true (ring cursor unchanged)."""
+        clone = PopulationState.__new__(PopulationState)
+        clone.window = self.window
+        clone.cursor = self.cursor
+        for name in list(FIELDS) + ["activity", "activity_sum"]:
+            setattr(clone, name, getattr(self, name)[mask])
+        clone.shape = (len(clone.alive),)
+        return clone
+
+    def copy(self):
+        """Deep copy of every array in the state."""
+        clone = PopulationState.__new__(PopulationState)
+        clone.shape = self.shape
+        clone.window = self.window
+        clone.cursor = self.cursor
+        for name in list(FIELDS) + ["activity", "activity_sum"]:
+            setattr(clone, name, getattr(self, name).copy())
+        return clone
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
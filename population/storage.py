@@ -0,0 +1,182 @@
+import json
+import mmap
+import os
+
+import numpy as np
+
+from population.state import FIELDS, PopulationState
+from utils.constants import ROLLING_WINDOW
+
+# ------------------------------------------------------------------------------
+# OUT-OF-CORE STORAGE — memory-mapped population state
+# ------------------------------------------------------------------------------
+# MemmapPopulationState keeps every per-user array of a PopulationState in its
+# own file under one directory, mapped with np.memmap. Only the pages being
+# worked on are resident, so populations far larger than RAM can be simulated:
+# BatchLoop(chunk_size=...) walks the slots in contiguous chunks and `prefetch`
+# pages the next chunk in on a background thread while the current one computes.
+#
+#     <directory>/user_health.dat, fatigue.dat, ..., activity.dat, activity_sum.dat
+#     <directory>/state.json      length, capacity, window and ring cursor
+#
+# Files are allocated with spare capacity; influx appends grow them geometrically
+# and compaction rewrites the kept users toward the front, freeing slots for reuse.
+# ------------------------------------------------------------------------------
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def _array_specs(window):
+    """Array name → (dtype, trailing shape) for every per-user array of a state."""
+    specs = {name: (dtype, ()) for name, dtype in FIELDS.items()}
+    specs["activity"] = (np.uint8, (window,))
+    specs["activity_sum"] = (np.int16, ())
+    return specs
+
+
+def chunk_ranges(num_users, chunk_size):
+    """Yields (start, stop) slot ranges of at most `chunk_size` users."""
+    for start in range(0, num_users, chunk_size):
+        yield start, min(start + chunk_size, num_users)
+
+
+def prefetch(state, start, stop):
+    """
+    Pages in slots [start, stop) of every memory-mapped array of `state` by touching one
+    byte per page, so the reads overlap with computation on the previous chunk.
+    In-memory arrays are skipped.
+    """
+    for name in _array_specs(state.window):
+        values = getattr(state, name)
+        if isinstance(values, np.memmap):
+            raw = values[start:stop].reshape(-1).view(np.uint8)
+            raw[::PAGE_SIZE].sum()
+
+
+class MemmapPopulationState(PopulationState):
+    """
+    PopulationState whose arrays live in memory-mapped files under `directory`.
+
+    A new state starts with `num_users` default users (as `PopulationState(num_users)`),
+    replacing any files already in the directory; use `load` to reopen an existing one.
+    Slicing, views and in-place updates behave as for the in-memory state and write
+    through to the files. `select` and `copy` return in-memory states.
+    """
+
+    def __init__(self, directory, num_users=0, window=ROLLING_WINDOW, chunk_size=DEFAULT_CHUNK_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.window = window
+        self.cursor = 0
+        self.chunk_size = chunk_size
+        self.capacity = 0
+        self._maps = {}
+        self._map(max(1, num_users), fresh=True)
+        self._set_length(num_users)
+        for start, stop in chunk_ranges(num_users, chunk_size):
+            self.activity[start:stop] = 1
+            self.activity_sum[start:stop] = window
+
+    @classmethod
+    def sample(cls, directory, num_users, rng, window=ROLLING_WINDOW, chunk_size=DEFAULT_CHUNK_SIZE, **mix):
+        """
+        Draws a fresh population straight into `directory`, one chunk at a time. Populations
+        no larger than `chunk_size` match `PopulationState.sample(num_users, rng, **mix)` exactly.
+        """
+        state = cls(directory, num_users, window=window, chunk_size=chunk_size)
+        for start, stop in chunk_ranges(num_users, chunk_size):
+            part = PopulationState.sample(stop - start, rng, window=window, **mix)
+            for name in _array_specs(window):
+                getattr(state, name)[start:stop] = getattr(part, name)
+        return state
+
+    @classmethod
+    def load(cls, directory, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Reopens a state saved with `flush`."""
+        with open(os.path.join(directory, "state.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        state = cls.__new__(cls)
+        state.directory = directory
+        state.window = meta["window"]
+        state.cursor = meta["cursor"]
+        state.chunk_size = chunk_size
+        state.capacity = 0
+        state._maps = {}
+        state._map(meta["capacity"], fresh=False)
+        state._set_length(meta["length"])
+        return state
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.dat")
+
+    def _map(self, capacity, fresh):
+        """(Re)maps every array file with room for `capacity` users, growing files as needed."""
+        for name, (dtype, trailing) in _array_specs(self.window).items():
+            path = self._path(name)
+            if name in self._maps:
+                self._maps[name].flush()
+            if fresh:
+                open(path, "wb").close()
+            row_bytes = np.dtype(dtype).itemsize * int(np.prod(trailing, dtype=np.int64))
+            if os.path.getsize(path) < capacity * row_bytes:
+                os.truncate(path, capacity * row_bytes)
+            self._maps[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,) + trailing)
+        self.capacity = capacity
+
+    def _set_length(self, num_users):
+        self.shape = (num_users,)
+        for name, values in self._maps.items():
+            setattr(self, name, values[:num_users])
+
+    def append(self, other):
+        """Appends the users of a 1-D state, growing the files geometrically when full."""
+        start = len(self)
+        stop = start + len(other)
+        if stop > self.capacity:
+            self._map(max(stop, 2 * self.capacity), fresh=False)
+        self._set_length(stop)
+        for name in FIELDS:
+            getattr(self, name)[start:stop] = getattr(other, name)
+        self.activity[start:stop] = np.roll(other.activity, self.cursor - other.cursor, axis=-1)
+        self.activity_sum[start:stop] = other.activity_sum
+
+    def compress(self, mask):
+        """
+        Keeps only the users where `mask` is true, moving them toward the front of the files
+        chunk by chunk; the freed slots are reused by later appends. Returns self.
+        """
+        write = 0
+        for start, stop in chunk_ranges(len(self), self.chunk_size):
+            keep = np.asarray(mask[start:stop])
+            kept = int(np.count_nonzero(keep))
+            for values in self._maps.values():
+                values[write:write + kept] = values[start:stop][keep]
+            write += kept
+        self._set_length(write)
+        return self
+
+    def copy_to(self, directory):
+        """Copies this state into a new memory-mapped state under `directory`."""
+        clone = MemmapPopulationState(directory, len(self), window=self.window, chunk_size=self.chunk_size)
+        clone.cursor = self.cursor
+        for start, stop in chunk_ranges(len(self), self.chunk_size):
+            for name in self._maps:
+                getattr(clone, name)[start:stop] = getattr(self, name)[start:stop]
+        return clone
+
+    def flush(self):
+        """Writes dirty pages and the metadata needed by `load` to disk."""
+        for values in self._maps.values():
+            values.flush()
+        meta = {"length": len(self), "capacity": self.capacity, "window": self.window, "cursor": self.cursor}
+        with open(os.path.join(self.directory, "state.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def __deepcopy__(self, memo):
+        raise TypeError("Memory-mapped populations cannot be deep-copied; use copy_to(directory)")
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
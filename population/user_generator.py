@@ -13,12 +13,13 @@ from numpy.random import default_rng
 # Archetypes, value tiers, and fatigue modeling are derived from parameterized priors.
 # ------------------------------------------------------------------------------
 
-def generate_single_user(uid):
+def generate_single_user(uid, rng=rng):
     """
     Initializes a single synthetic user profile with randomized attributes.
 
     Parameters:
     - uid (int): Unique identifier for the user.
+    - rng (np.random.Generator): Source of randomness (default: the shared config.rng).
 
     Returns:
     - dict: A dictionary representing the initialized state of the user.
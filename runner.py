@@ -1,169 +1,396 @@
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import pandas as pd
-import math
-from tqdm import tqdm
-
-from utils.constants import ARCHETYPES, RULES, STRATEGY_COSTS, TIER_ARR, FLAT_USER_HEALTH_DECAY, ROLLING_WINDOW
-from config import rng
-from strategy.baseline_heuristics import compute_baseline_actions
-from strategy.challenger import Challenger
-from events.row_generator import generate_rows_for_user
-from population.influx import compute_user_influx_rate
-from population.user_generator import generate_single_user
-from viz.viz_tools import generate_summary_charts
-
-
-def run_batch_loop(challenger, baseline, config, enable_influx=False):
-    # Determine the duration of a simulation batch in minutes
-    batch_duration_minutes = 24 * 60 // config.BATCHES_PER_DAY
-    start_ts = datetime.now()
-
-    # Tracking performance across the simulation horizon
-    real_churn, base_churn = [], []
-    real_energy, base_energy = [], []
-    arr_retained_real, arr_retained_base = [], []
-    penalty_tracker, comeback_tracker = [], []
-    annotations = []
-
-    # === Main Batch Loop ===
-    for batch in tqdm(range(config.TOTAL_BATCHES)):
-        ts = start_ts + timedelta(minutes=batch * batch_duration_minutes)
-        batch_rows = []
-        energy_real, energy_base = 0, 0
-        arr_real, arr_base = 0, 0
-        penalties, comebacks = 0, 0
-
-        # --- Generate synthetic user behavior (Challenger) ---
-        for uid in challenger.alive_uids():
-            user = challenger.user(uid)
-            row_df = generate_rows_for_user(uid, ts, user)
-            if not row_df.empty:
-                batch_rows.append(row_df)
-            user["activity"].append(1 if not row_df.empty else 0)
-
-        if batch_rows:
-            user_df = pd.concat(batch_rows, ignore_index=True)
-        else:
-            user_df = pd.DataFrame()
-        # If no user events occurred, skip this batch
-        if user_df.empty or "uid" not in user_df.columns:
-            continue
-
-        # === Determine actions for both systems ===
-
-        # --- Challenger strategy selection ---
-        result = challenger.model.run(df=user_df, uid_col="uid", time_col="timestamp") # insert your model call here
-        actions_challenger = {uid: val["strategy"] for uid, val in result.items()}
-
-        # --- Baseline heuristic actions ---
-        activity_window = {
-            uid: list(challenger.user(uid)["activity"])[-ROLLING_WINDOW:]
-            for uid in challenger.alive_uids()
-        }
-
-        actions_base = compute_baseline_actions(
-            batch_num=batch,
-            alive_users=challenger.alive_uids(),
-            user_health={uid: challenger.user(uid)["user_health"] for uid in challenger.alive_uids()},
-            value={uid: challenger.user(uid)["value"] for uid in challenger.alive_uids()},
-            fatigue={uid: challenger.user(uid)["fatigue"] for uid in challenger.alive_uids()},
-            last_actions=challenger.last_actions,
-            activity_window=activity_window
-        )
-
-        # === Apply actions and update both populations ===
-        for uid in list(challenger.alive_uids()):
-            
-            # --- Challenger user update ---
-            user = challenger.user(uid)
-            action = actions_challenger.get(uid, "observe")
-            rule = RULES.get((user["state"], action), {"next": user["state"], "d_health": 0, "penalty": 0})
-            archetype = ARCHETYPES[user["archetype"]]
-
-            # Apply health change and penalty based on rulebook
-            log_mod = math.log1p(1 - user["user_health"])
-            user["user_health"] = max(0.0, user["user_health"] + rule["d_health"] * archetype["user_health_mult"] * log_mod)
-            user["user_health"] = max(0.0, user["user_health"] - FLAT_USER_HEALTH_DECAY)
-            user["fatigue"] = min(config.MAX_FATIGUE, user["fatigue"] + rule["penalty"] * archetype["fatigue_mult"])
-            user["state"] = rule["next"]
-
-            # Track comeback events
-            if not user["recovered"] and user.get("prev_user_health", 1.0) < 0.4 and user["user_health"] > 0.6:
-                comebacks += 1
-                user["recovered"] = True
-            user["prev_user_health"] = user["user_health"]
-
-            if user["user_health"] < 0.01:
-                challenger.remove_user(uid)
-                continue
-
-            # Track energy and ARR     
-            energy_real += STRATEGY_COSTS.get(action, 0.0)
-            arr_real += TIER_ARR[user["value"]]
-            penalties += rule["penalty"]
-
-            # --- Baseline user update ---
-            user_b = baseline.user(uid)
-            action_b = actions_base.get(uid, "observe")
-            rule_b = RULES.get((user_b["state"], action_b), {"next": user_b["state"], "d_health": 0, "penalty": 0})
-            arch_b = ARCHETYPES[user_b["archetype"]]
-
-            log_mod_b = math.log1p(1 - user_b["user_health"])
-            user_b["user_health"] = max(0.0, user_b["user_health"] + rule_b["d_health"] * arch_b["user_health_mult"] * log_mod_b)
-            user_b["user_health"] = max(0.0, user_b["user_health"] - FLAT_USER_HEALTH_DECAY)
-            user_b["fatigue"] = min(config.MAX_FATIGUE, user_b["fatigue"] + rule_b["penalty"] * arch_b["fatigue_mult"])
-            user_b["state"] = rule_b["next"]
-
-            penalties += rule_b["penalty"]
-
-            if user_b["user_health"] < 0.01:
-                baseline.remove_user(uid)
-                continue
-
-            energy_base += STRATEGY_COSTS.get(action, 0.0)
-            if user_b["user_health"] >= 0.2:
-                arr_base += TIER_ARR[user_b["value"]]
-
-        # === Aggregate metrics for visualization ===
-        real_churn.append(1 - len(challenger.alive_users) / config.NUM_USERS)
-        base_churn.append(1 - len(baseline.alive_users) / config.NUM_USERS)
-        real_energy.append(energy_real)
-        base_energy.append(energy_base)
-        arr_retained_real.append(arr_real)
-        arr_retained_base.append(arr_base)
-        penalty_tracker.append(penalties)
-        comeback_tracker.append(comebacks)
+import numpy as np
+
+from config import rng as default_rng
+from strategy.baseline_heuristics import compute_baseline_actions_vectorized, BASELINE_UNIFORMS
+from strategy.scheduler import default_priority
+from events.row_generator import generate_batch_rows
+from population.dynamics import sample_presence, sample_row_counts, apply_rules
+from population.archive import ChurnArchive
+from population.influx import compute_influx_rate
+from population.kernels import fused_baseline_step
+from population.state import PopulationState, sample_options
+from population.storage import chunk_ranges, prefetch
+from utils.random_streams import RandomStreams
+from utils.rule_tables import ACTION_INDEX, encode_actions
+
+# pandas, tqdm and the charting stack are imported only on the code paths that use them,
+# so worker processes that never build a DataFrame or draw a chart skip their import cost.
+
+
+def _model_slots(result, uids, column):
+    """(slots, values) of one column of a model's output, dropping uids that are not resident."""
+    if hasattr(result, "columns"):  # DataFrame-like output
+        targets = result["uid"].to_numpy(dtype=np.int64)
+        values = result[column].tolist()
+    else:
+        targets = np.fromiter(result.keys(), dtype=np.int64, count=len(result))
+        values = [val[column] if isinstance(val, dict) else val for val in result.values()]
+    if uids is not None:
+        # uid → slot through the sorted uid index; drop uids that are no longer resident
+        slots = np.minimum(np.searchsorted(uids, targets), len(uids) - 1)
+        resident = uids[slots] == targets
+        return slots[resident], [v for v, keep in zip(values, resident) if keep]
+    return targets, values
+
+
+def decode_model_priorities(result, num_users, uids=None):
+    """
+    Priority per user slot from a model's output (a `priority` column, or a "priority" key
+    per uid), for a BudgetScheduler. Returns None when the model does not provide them;
+    users without an entry get priority 0.
+    """
+    if result is None or num_users == 0:
+        return None
+    if hasattr(result, "columns"):
+        if "priority" not in result.columns or result.empty:
+            return None
+    elif not any(isinstance(val, dict) and "priority" in val for val in result.values()):
+        return None
+    else:
+        result = {uid: val for uid, val in result.items() if isinstance(val, dict) and "priority" in val}
+    priority = np.zeros(num_users)
+    slots, values = _model_slots(result, uids, "priority")
+    priority[slots] = np.asarray(values, dtype=float)
+    return priority
+
+
+def decode_model_actions(result, num_users, uids=None):
+    """
+    Converts a model's `run()` output into an ACTIONS index per user slot.
+
+    Accepts either a dict of uid → {"strategy": name} (or uid → name), or a DataFrame with
+    `uid` and `action`/`strategy` columns. Users without an entry default to "observe".
+    `uids` is the sorted uid of each slot (default: the slot is the uid); entries for uids
+    that are not resident are ignored.
+    """
+    actions = np.full(num_users, ACTION_INDEX["observe"], dtype=np.int8)
+    if result is None or num_users == 0:
+        return actions
+    if hasattr(result, "columns"):  # DataFrame-like output
+        if result.empty:
+            return actions
+        column = "action" if "action" in result.columns else "strategy"
+    else:
+        column = "strategy"
+    slots, names = _model_slots(result, uids, column)
+    actions[slots] = encode_actions(names)
+    return actions
+
+
+class BatchLoop:
+    """
+    Steps any number of PopulationBranch objects through the simulation in lockstep.
+
+    Random draws come from RandomStreams keyed by batch and user slot. In common-random-numbers
+    mode (crn=True, the default) every branch consumes identical per-user streams for presence,
+    row counts and policy noise, and turns them into activity using its own user state. With
+    crn=False each branch draws independently. Only branches with a model build an event
+    DataFrame; branches without a model run the baseline heuristic directly on their state
+    arrays. Each branch keeps its own metric series (see `PopulationBranch.metrics_store`).
+    An optional `telemetry` emitter (see `telemetry.emitter.TelemetryEmitter`) receives every
+    batch's latest metrics and wall-clock latency as the loop runs.
+
+    With `compact_every`, churned users are compacted out of every branch at that batch
+    interval (see `PopulationBranch.compact`), archived under `archive_dir` when given.
+    Draws are indexed by uid rather than slot, so compaction never changes a run's results.
+
+    With `chunk_size`, branches are stepped in contiguous slot chunks so the temporaries of a
+    batch stay bounded; combined with a memory-mapped population
+    (`population.storage.MemmapPopulationState`) only the chunks in flight are resident.
+    Model-free branches produce the same results chunked or whole. Model branches build one
+    event frame (and call the model once) per chunk, with event draws seeded per chunk, so
+    their results depend on `chunk_size`. Branches with a BudgetScheduler are always stepped
+    whole, because the budget is allocated across the entire population.
+
+    `kernels` selects how model-free branches are stepped (see `population.kernels`):
+    "auto" runs the fused Numba kernel when Numba is installed and the NumPy path otherwise.
+    """
+
+    def __init__(self, branches, config, enable_influx=False, rng=None, start_ts=None, crn=True, seed=None,
+                 telemetry=None, compact_every=None, archive_dir=None, chunk_size=None, kernels="auto"):
+        if not branches:
+            raise ValueError("BatchLoop needs at least one branch")
+        sizes = {len(branch.state) for branch in branches}
+        if len(sizes) != 1:
+            raise ValueError(f"Branches must start with the same number of users, got {sorted(sizes)}")
+        self.branches = list(branches)
+        for branch in self.branches:
+            branch.metrics_store.reserve(config.TOTAL_BATCHES)
+        self.config = config
+        self.enable_influx = enable_influx
+        if seed is None:
+            seed = (default_rng if rng is None else rng).integers(2**63)
+        self.streams = RandomStreams(seed, crn=crn)
+        self.start_ts = datetime.now() if start_ts is None else start_ts
+        self.batch_duration_minutes = 24 * 60 // config.BATCHES_PER_DAY
+        self.batch = 0
+        self.telemetry = telemetry
+        self.compact_every = compact_every
+        self.chunk_size = chunk_size
+        self.kernels = kernels
+        if archive_dir is not None:
+            for branch in self.branches:
+                branch.archive = ChurnArchive(os.path.join(archive_dir, f"{branch.name}_churned.bin"),
+                                              window=branch.state.window)
+
+    def step(self):
+        """Simulates one batch for every branch."""
+        started = time.perf_counter()
+        batch = self.batch
+        ts = self.start_ts + timedelta(minutes=batch * self.batch_duration_minutes)
+
+        for key, branch in enumerate(self.branches):
+            self._step_branch(key, branch, batch, ts)
 
         # === Optional user influx support ===
-        if enable_influx and batch % config.BATCHES_PER_DAY == 0:
-            influx_rate = compute_user_influx_rate(challenger.user_states)
-            num_influx = int(influx_rate * len(challenger.user_states))
-            for _ in range(num_influx):
-                new_uid = max(challenger.user_states) + 1
-                challenger.add_user(new_uid)
-                baseline.user_states[new_uid] = generate_single_user(new_uid)
-                baseline.alive_users.add(new_uid)
-
-     # === Print diagnostic stats at end of sim ===
-    print("Final Real Churn (Challenger):", real_churn[-10:])
-    print("Final Baseline Churn:", base_churn[-10:])
+        if self.enable_influx and batch % self.config.BATCHES_PER_DAY == 0:
+            self._apply_influx()
+
+        # === Optional compaction of churned users ===
+        if self.compact_every and (batch + 1) % self.compact_every == 0:
+            for branch in self.branches:
+                branch.compact(batch)
+
+        self.batch += 1
+        if self.telemetry is not None:
+            self.telemetry.record_batch(batch, self.branches, time.perf_counter() - started)
+
+    def _step_branch(self, key, branch, batch, ts):
+        """
+        Simulates one batch for one branch, in chunks of `chunk_size` slots with the next chunk
+        prefetched on a background thread. Branches with a scheduler see their whole population
+        at once.
+        """
+        state = branch.state
+        num_users = len(state)
+        whole = branch.scheduler is not None or not self.chunk_size
+        chunk_size = num_users if whole else self.chunk_size
+        row = branch.metrics_store.append()
+        totals = {"energy": 0.0, "arr": 0.0, "penalties": 0.0, "comebacks": 0, "alive": 0,
+                  "budget_spent": 0.0, "deferred": 0}
+
+        if chunk_size >= num_users:
+            self._step_slots(key, branch, state, 0, num_users, batch, ts, row, totals)
+        else:
+            with ThreadPoolExecutor(max_workers=1) as io:
+                pending = io.submit(prefetch, state, 0, chunk_size)
+                for start, stop in chunk_ranges(num_users, chunk_size):
+                    pending.result()
+                    if stop < num_users:
+                        pending = io.submit(prefetch, state, stop, min(stop + chunk_size, num_users))
+                    self._step_slots(key, branch, state.view(start, stop), start, stop, batch, ts, row, totals)
+            state.advance_cursor()  # Every chunk view pushed one activity bit
+
+        if branch.scheduler is not None and branch.scheduler.budget:
+            totals["budget_utilization"] = totals["budget_spent"] / branch.scheduler.budget
+        branch.metrics_store.update(row, churn=1 - totals["alive"] / self.config.NUM_USERS, **totals)
+
+    def _step_slots(self, key, branch, part, start, stop, batch, ts, row, totals):
+        """Simulates one batch for slots [start, stop) of a branch (`part` is their state)."""
+        streams = self.streams
+
+        # --- Model-free branches: one fused pass (Numba kernel when available) ---
+        trace = branch.presence_trace
+        replay = trace is not None and trace.covers(batch)
+        if branch.model is None and branch.scheduler is None and not replay:
+            _, actions, outcome = fused_baseline_step(
+                part, _slot_draws(streams.uniforms, branch, start, stop, "presence", batch, key),
+                _slot_draws(streams.normals, branch, start, stop, "row_counts", batch, key),
+                _slot_draws(streams.uniforms, branch, start, stop, "policy", batch, key, width=(BASELINE_UNIFORMS,)).T,
+                batch, self.config.MAX_FATIGUE, decay=self.config.FLAT_USER_HEALTH_DECAY, backend=self.kernels)
+            self._record_outcome(branch, part, row, actions, outcome, totals)
+            return
+
+        # --- Generate synthetic user behavior from this branch's state (or replay a trace) ---
+        if replay:
+            slot_uids = np.arange(start, stop) if branch.is_dense else branch.uids[start:stop]
+            present = trace.present(batch, slot_uids)
+        else:
+            present = sample_presence(part, _slot_draws(streams.uniforms, branch, start, stop, "presence", batch, key))
+        row_noise = _slot_draws(streams.normals, branch, start, stop, "row_counts", batch, key)
+        counts = sample_row_counts(part, present, row_noise)
+        counts[~part.alive] = 0
+
+        # === Determine actions ===
+        last_action = part.last_action.copy() if branch.scheduler is not None else None
+        if branch.model is not None:
+            if branch.is_dense:
+                uids = None if stop - start == len(branch.state) else np.arange(start, stop)
+            else:
+                uids = branch.uids[start:stop]
+            feed, weights = counts, None
+            if branch.event_sampler is not None:
+                # Only the model's feed is thinned; activity below uses the unsampled counts
+                feed, weights = branch.event_sampler.thin(part, counts,
+                                                          streams.generator("sampling", batch, key, block=start))
+            user_df = generate_batch_rows(part, feed, ts, streams.generator("events", batch, key, block=start),
+                                          uids=uids, weights=weights)
+            result = branch.model.run(df=user_df, uid_col="uid", time_col="timestamp") if not user_df.empty else None
+            part.push_activity(counts > 0)
+            actions = decode_model_actions(result, len(part), uids)
+            priority = decode_model_priorities(result, len(part), uids) if branch.scheduler is not None else None
+        else:
+            part.push_activity(counts > 0)
+            uniforms = _slot_draws(streams.uniforms, branch, start, stop, "policy", batch, key,
+                                   width=(BASELINE_UNIFORMS,)).T
+            actions = compute_baseline_actions_vectorized(batch, part, uniforms)
+            priority = None
+
+        # === Enforce the intervention budget ===
+        if branch.scheduler is not None:
+            plan = branch.scheduler.schedule(actions, default_priority(part) if priority is None else priority, part)
+            part.last_action[plan["deferred"]] = last_action[plan["deferred"]]
+            totals["budget_spent"] += plan["spent"]
+            totals["deferred"] += int(np.count_nonzero(plan["deferred"]))
+            branch.metrics_store.record_deferred(row, part, plan["deferred"])
+
+        # === Apply actions and update the population ===
+        outcome = apply_rules(part, actions, self.config.MAX_FATIGUE, decay=self.config.FLAT_USER_HEALTH_DECAY)
+        self._record_outcome(branch, part, row, actions, outcome, totals)
+
+    @staticmethod
+    def _record_outcome(branch, part, row, actions, outcome, totals):
+        """Adds one chunk's batch outcome to the running totals and breakdowns of `row`."""
+        totals["energy"] += outcome["energy"].sum()
+        totals["arr"] += outcome["arr"].sum()
+        totals["penalties"] += outcome["penalty"].sum()
+        totals["comebacks"] += int(outcome["comeback"].sum())
+        totals["alive"] += int(np.count_nonzero(part.alive))
+        branch.metrics_store.record_breakdowns(row, part, actions, outcome)
+        if branch.metrics_store.sketches:
+            branch.metrics_store.record_distributions(row, part)
+
+    def run(self, num_batches=None, progress=True):
+        """Runs until TOTAL_BATCHES (or `num_batches` more batches) have been simulated."""
+        end = self.config.TOTAL_BATCHES if num_batches is None else self.batch + num_batches
+        batches = range(self.batch, end)
+        if progress:
+            from tqdm import tqdm
+            batches = tqdm(batches)
+        for _ in batches:
+            self.step()
+        return self.branches
+
+    def branch(self, name):
+        """Looks up a branch by name."""
+        for branch in self.branches:
+            if branch.name == name:
+                return branch
+        raise KeyError(f"No branch named '{name}'")
+
+    def fork(self):
+        """
+        Returns an independent copy of the loop at the current batch: user states, metric
+        series, models and random streams. The fork replays exactly what this loop would
+        draw next, so forks differ only through the changes made to them. The telemetry
+        emitter and churn archives are not shared: forks start without them and discard the
+        users they compact.
+        """
+        telemetry, self.telemetry = self.telemetry, None
+        try:
+            clone = copy.deepcopy(self)
+        finally:
+            self.telemetry = telemetry
+        for branch in clone.branches:
+            branch.archive = None
+        return clone
+
+    def _apply_influx(self):
+        """Adds the same block of new users to every branch, sized from the first branch's alive users."""
+        primary = self.branches[0].state
+        num_alive = int(np.count_nonzero(primary.alive))
+        influx_rate = compute_influx_rate(primary, chunk_size=self.chunk_size)
+        num_influx = int(influx_rate * num_alive)
+        num_influx = max(0, min(num_influx, self.config.MAX_USERS - num_alive))
+        if num_influx == 0:
+            return
+        newcomers = PopulationState.sample(num_influx, self.streams.generator("influx", self.batch),
+                                           **sample_options(self.config))
+        for branch in self.branches:
+            branch.add_users(newcomers.copy())
+
+
+def _slot_draws(draw, branch, start, stop, purpose, batch, key, width=()):
+    """
+    Per-user draws for slots [start, stop) of `branch`, taken from the uid-indexed stream
+    (`draw` is RandomStreams.uniforms or .normals).
+    """
+    if branch.is_dense:
+        return draw(purpose, batch, (stop - start,) + width, key, start=start)
+    uids = branch.uids[start:stop]
+    if len(uids) == 0:
+        return np.empty((0,) + width)
+    first = int(uids[0])
+    return draw(purpose, batch, (int(uids[-1]) - first + 1,) + width, key, start=first)[uids - first]
+
+
+def run_branches(branches, config, enable_influx=False, charts=True, rng=None, crn=True):
+    """
+    Runs an N-way simulation over `branches` and prints their final churn.
+    Summary charts compare the first two branches and render in a background process
+    (`loop.chart_process`); pass charts=False to skip them.
+    """
+    loop = BatchLoop(branches, config, enable_influx=enable_influx, rng=rng, crn=crn)
+    loop.run()
+    report_branches(branches)
+    loop.chart_process = render_branch_charts(branches) if charts else None
+    return loop
+
+
+def report_branches(branches):
+    """Prints the last churn values of every branch."""
+    report_metrics({branch.name: {"churn": branch.churn_history} for branch in branches})
+
+
+def report_metrics(metrics):
+    """Prints the last churn values of every branch in a branch name → metric series mapping."""
+    # === Print diagnostic stats at end of sim ===
+    for name, series in metrics.items():
+        print(f"Final Churn ({name}):", series["churn"][-10:])
+
+
+def render_branch_charts(branches):
+    """
+    Starts background rendering of the summary charts for the first two branches and
+    returns the rendering process (None if rendered inline).
+    """
+    return render_metric_charts({
+        branch.name: {"energy": branch.energy_usage, "arr": branch.arr_retention,
+                      "churn": branch.churn_history, "penalties": branch.penalty_history}
+        for branch in branches
+    })
+
+
+def render_metric_charts(metrics):
+    """`render_branch_charts` for a branch name → metric series mapping (e.g. a cached result)."""
+    from viz.viz_tools import generate_summary_charts_async
 
     # === Generate pitch-ready visualization charts ===
-    generate_summary_charts(
-        real_energy=real_energy,
-        base_energy=base_energy,
-        arr_retained_real=arr_retained_real,
-        arr_retained_base=arr_retained_base,
-        real_churn=real_churn,
-        base_churn=base_churn,
-        penalty_tracker=penalty_tracker,
-        churned_users=challenger.churned_users,
-        user_states=challenger.user_states,
+    series = list(metrics.values())
+    primary = series[0]
+    reference = series[1] if len(series) > 1 else primary
+    return generate_summary_charts_async(
+        real_energy=primary["energy"],
+        base_energy=reference["energy"],
+        arr_retained_real=primary["arr"],
+        arr_retained_base=reference["arr"],
+        real_churn=primary["churn"],
+        base_churn=reference["churn"],
+        penalty_tracker=primary["penalties"],
         save=True
     )
 
 
+def run_batch_loop(challenger, baseline, config, enable_influx=False, rng=None, crn=True, charts=True):
+    """Two-branch entry point kept for existing callers: challenger vs baseline."""
+    return run_branches([challenger, baseline], config, enable_influx=enable_influx, charts=charts, rng=rng, crn=crn)
+
 
 # Copyright 2025 Divine Comedy Labs LLC
 # Released under the Polyform Noncommercial License 1.0.0
-# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
\ No newline at end of file
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -1,12 +1,12 @@
 import argparse
+import os
 import sys
-from types import SimpleNamespace
 
 from config import *
-from strategy.challenger import Challenger
-from population.PopulationBranch import PopulationBranch
-from runner import run_batch_loop
-from config import rng
+from config import make_config
+from metrics.cache import ResultCache, DEFAULT_CACHE_DIR
+from runner import report_metrics, render_metric_charts
+from simulation import Simulation
 
 
 def parse_args():
@@ -33,29 +33,78 @@ def parse_args():
                         help="Maximum user cap during influx (default from config)")
     parser.add_argument("--batches-per-day", type=int, default=BATCHES_PER_DAY,
                         help="How many intervention windows per day (default from config)")
+    parser.add_argument("--no-crn", action="store_false", dest="crn",
+                        help="Give each branch independent random streams instead of common random numbers")
+    parser.set_defaults(crn=True)
+    parser.add_argument("--no-charts", action="store_false", dest="charts",
+                        help="Skip rendering the summary charts and dashboard")
+    parser.set_defaults(charts=True)
+    parser.add_argument("--metrics-out", default="output/metrics.npz",
+                        help="File for the run's metric series and breakdowns (default: output/metrics.npz)")
+    parser.add_argument("--compact-every", type=int, default=0,
+                        help="Archive and drop churned users every N batches to bound memory (default: off)")
+    parser.add_argument("--archive-dir", default="output/archive",
+                        help="Directory for archived churned users (default: output/archive)")
+    parser.add_argument("--storage-dir", default=None,
+                        help="Keep populations in memory-mapped files under this directory (out-of-core runs)")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Step branches in chunks of this many users (bounds resident memory; "
+                             "branches with --budget/--tier-quota are stepped whole)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Serve identical runs from the result cache and store new ones (default: off)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Result cache directory for --cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-max-gb", type=float, default=2.0,
+                        help="Evict least recently used cache entries beyond this size (default: 2)")
+    parser.add_argument("--telemetry", metavar="TARGET",
+                        help="Stream live per-batch metrics to jsonl:PATH, unix:PATH or prom:PATH "
+                             "(watch with `python -m telemetry.watch`)")
+    parser.add_argument("--telemetry-every", type=int, default=1,
+                        help="Emit telemetry every N batches (default: 1)")
+    parser.add_argument("--run-id", default=None,
+                        help="Label for this run in telemetry records (default: derived from pid and time)")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Hard per-batch intervention energy budget per branch (default: unlimited)")
+    parser.add_argument("--tier-quota", action="append", metavar="TIER=COUNT",
+                        help="Maximum costly interventions per batch for a value tier (repeatable)")
+    parser.add_argument("--event-sample-rate", action="append", metavar="STATE=RATE",
+                        help="Thin the challenger's event feed for users in STATE to RATE, adding a weight "
+                             "column (repeatable; at-risk users are always kept)")
+    parser.add_argument("--event-sample-mode", choices=("bernoulli", "reservoir"), default="bernoulli",
+                        help="Per-row Bernoulli thinning or fixed-size reservoir per state (default: bernoulli)")
+    parser.add_argument("--kernels", choices=("auto", "numpy", "numba"), default="auto",
+                        help="Step baseline branches with the fused Numba kernel (auto: when installed) "
+                             "or the NumPy path; results are identical")
+    parser.add_argument("--sketches", action="store_true",
+                        help="Record per-batch histograms and quantiles of health, fatigue and rolling "
+                             "activity per archetype (drawn as heatmaps with the charts)")
+    parser.add_argument("--trace", nargs="+", metavar="FILE",
+                        help="Seed the population from event logs (CSV or Parquet) instead of sampling it")
+    parser.add_argument("--trace-uid-col", default="uid",
+                        help="User id column of the event logs (default: uid)")
+    parser.add_argument("--trace-time-col", default="timestamp",
+                        help="Event time column of the event logs (default: timestamp)")
+    parser.add_argument("--trace-tier-col", default=None,
+                        help="Optional value tier column of the event logs")
+    parser.add_argument("--trace-replay-from", default=None,
+                        help="Seed from events before this time and replay observed presence from it on")
+    parser.add_argument("--trace-cache", default="output/trace_cache",
+                        help="Directory for parsed event log aggregates (default: output/trace_cache)")
 
     return parser.parse_args()
 
 
 def update_config_from_args(args):
     """
-    Creates a runtime configuration by merging global defaults with CLI overrides.
-    Also re-seeds the global RNG to ensure run-level determinism.
+    Creates a runtime configuration by merging config.py defaults with CLI overrides.
+    The seed is not part of the config: each Simulation owns its own random streams.
     """
-    runtime_config = SimpleNamespace(**globals())
-
-    runtime_config.DAYS = args.days
-    runtime_config.NUM_USERS = args.num_users
-    runtime_config.MAX_USERS = args.max_users
-    runtime_config.BATCHES_PER_DAY = args.batches_per_day
-    runtime_config.TOTAL_BATCHES = args.days * args.batches_per_day
-
-    # Reinitialize shared RNG to preserve deterministic behavior across modules
-    global rng
-    from numpy.random import default_rng
-    rng = default_rng(args.seed)
-
-    return runtime_config
+    return make_config(
+        DAYS=args.days,
+        NUM_USERS=args.num_users,
+        MAX_USERS=args.max_users,
+        BATCHES_PER_DAY=args.batches_per_day,
+    )
 
 
 def run_sim():
@@ -65,6 +114,13 @@ def run_sim():
     and launches the batch-level simulation process.
     """
     args = parse_args()
+    trace = None
+    if args.trace:
+        from events.ingest import ingest_logs
+        trace = ingest_logs(args.trace, uid_col=args.trace_uid_col, time_col=args.trace_time_col,
+                            tier_col=args.trace_tier_col, batches_per_day=args.batches_per_day,
+                            replay_from=args.trace_replay_from, cache_dir=args.trace_cache)
+        args.num_users = trace.num_users
     config = update_config_from_args(args)
 
     print(f"Launching ChurnLab simulation...")
@@ -72,16 +128,69 @@ def run_sim():
     print(f"• Batches per day: {config.BATCHES_PER_DAY}")
     print(f"• Influx enabled: {args.enable_influx}")
     print(f"• Seed: {args.seed}")
-    print(f"• Initial Users: {config.NUM_USERS}")
+    print(f"• Common random numbers: {args.crn}")
+    print(f"• Initial Users: {config.NUM_USERS}" + (f" (from {len(args.trace)} event log(s))" if trace else ""))
     print(f"• Max Users: {config.MAX_USERS}")
     print(f"{'-'*40}")
 
-     # Initialize both challenger and baseline branches for tracking
-    challenger = PopulationBranch(name="challenger", model=Challenger())
-    baseline = PopulationBranch(name="baseline")
-
-    # Core loop: executes per-batch simulation behavior
-    run_batch_loop(challenger, baseline, config=config, enable_influx=args.enable_influx)
+    # Imported here so challengers that load heavy frameworks only pay for it when a run starts
+    from strategy.challenger import Challenger
+
+    telemetry = None
+    if args.telemetry:
+        from telemetry.emitter import TelemetryEmitter
+        telemetry = TelemetryEmitter(args.telemetry, every=args.telemetry_every, run_id=args.run_id)
+
+    scheduler = None
+    if args.budget is not None or args.tier_quota:
+        from strategy.scheduler import BudgetScheduler, parse_tier_quotas
+        scheduler = BudgetScheduler(args.budget, parse_tier_quotas(args.tier_quota))
+
+    event_sampler = None
+    if args.event_sample_rate:
+        from events.sampling import EventSampler, parse_sampling_rates
+        event_sampler = EventSampler(parse_sampling_rates(args.event_sample_rate), mode=args.event_sample_mode)
+
+    if scheduler is not None and (args.chunk_size or args.storage_dir):
+        print("• Warning: --budget/--tier-quota allocate across the whole population, so every branch is "
+              "stepped unchunked and its batch temporaries scale with the number of users")
+
+    trace_options = {}
+    if trace is not None:
+        import numpy as np
+        trace_options = {"initial_state": trace.to_state(np.random.default_rng(args.seed)),
+                         "presence": trace.presence()}
+        if args.trace_replay_from:
+            from datetime import datetime
+            trace_options["start_ts"] = datetime.fromisoformat(args.trace_replay_from)
+
+     # Initialize both challenger and baseline branches from the same starting users
+    sim = Simulation(config, seed=args.seed, policies={"challenger": Challenger(), "baseline": None},
+                     enable_influx=args.enable_influx, crn=args.crn, telemetry=telemetry,
+                     compact_every=args.compact_every or None,
+                     archive_dir=args.archive_dir if args.compact_every else None,
+                     storage_dir=args.storage_dir, chunk_size=args.chunk_size, scheduler=scheduler,
+                     event_sampler=event_sampler, kernels=args.kernels, sketches=args.sketches,
+                     **trace_options)
+
+    # Core loop: executes per-batch simulation behavior (or replays a cached identical run)
+    cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_max_gb * 1024 ** 3)) if args.cache else None
+    try:
+        result = sim.run(progress=True, cache=cache)
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+    if result.cached:
+        print(f"• Served from result cache: {args.cache_dir}")
+    report_metrics(result.metrics)
+    os.makedirs(os.path.dirname(args.metrics_out) or ".", exist_ok=True)
+    result.save(args.metrics_out)
+    if args.charts:
+        render_metric_charts(result.metrics)
+        if args.sketches:
+            from viz.viz_tools import generate_distribution_heatmaps_async
+
+            generate_distribution_heatmaps_async(result.metrics)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,265 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+from config import make_config
+from metrics.cache import array_digest, policy_version, simulation_key
+from metrics.store import save_run
+from population.PopulationBranch import PopulationBranch
+from population.state import FIELDS, PopulationState, sample_options
+from population.storage import MemmapPopulationState
+from runner import BatchLoop
+
+# ------------------------------------------------------------------------------
+# SIMULATION API — reentrant, in-process runs
+# ------------------------------------------------------------------------------
+# A Simulation owns everything a run touches: its configuration, starting
+# population, random streams, branches and metrics. Nothing is read from or
+# written to module globals after construction, so any number of simulations can
+# be built and run back to back (or side by side) in one long-lived process.
+#
+#     sim = Simulation(make_config(DAYS=90, NUM_USERS=2000), seed=7,
+#                      policies={"challenger": MyModel(), "baseline": None})
+#     result = sim.run()
+#     result.final("churn")    # {"challenger": 0.12, "baseline": 0.31}
+# ------------------------------------------------------------------------------
+
+
+class SimulationResult:
+    """
+    Outcome of one simulation run.
+
+    Attributes:
+        config: The runtime configuration the run used.
+        seed (int): The run seed.
+        metrics (dict): Branch name → metric name → np.ndarray (one row per batch), including
+            the per-archetype/tier/state breakdowns of `metrics.store`.
+        cached (bool): True when the result was served from a ResultCache.
+        policies (dict): Branch name → policy version (`metrics.cache.policy_version`).
+        options (dict): Run options that change results (influx, crn, scheduler, ...).
+    """
+
+    def __init__(self, config, seed, metrics, cached=False, policies=None, options=None):
+        self.config = config
+        self.seed = seed
+        self.metrics = metrics
+        self.cached = cached
+        self.policies = policies or {}
+        self.options = options or {}
+
+    @property
+    def branch_names(self):
+        return list(self.metrics)
+
+    def series(self, branch, metric):
+        """Per-batch series of `metric` for one branch."""
+        return self.metrics[branch][metric]
+
+    def final(self, metric):
+        """Last value of `metric` per branch."""
+        return {name: (series[metric][-1] if len(series[metric]) else float("nan"))
+                for name, series in self.metrics.items()}
+
+    def meta(self):
+        """JSON-serializable run metadata stored alongside the metrics."""
+        config_values = {k: v for k, v in vars(self.config).items() if k.isupper()}
+        return {"seed": self.seed, "config": config_values, "policies": self.policies, "options": self.options}
+
+    def save(self, path):
+        """Persists all branch metrics of this run to one compressed .npz file."""
+        save_run(path, self.metrics, meta=self.meta())
+
+    def summary(self):
+        """Final churn and ARR plus total energy, penalties and comebacks per branch."""
+        return {
+            name: {
+                "final_churn": series["churn"][-1] if len(series["churn"]) else float("nan"),
+                "final_arr": series["arr"][-1] if len(series["arr"]) else float("nan"),
+                "energy": float(np.sum(series["energy"])),
+                "penalties": float(np.sum(series["penalties"])),
+                "comebacks": int(np.sum(series["comebacks"])),
+            }
+            for name, series in self.metrics.items()
+        }
+
+
+class Simulation:
+    """
+    Self-contained simulation of one or more policy branches.
+
+    Parameters:
+        config (SimpleNamespace, optional): Runtime configuration (default: `make_config()`).
+        seed (int): Seeds the starting population and every random stream of the run.
+        policies (dict, optional): Branch name → model instance, or None for the baseline
+            heuristic. Defaults to a single baseline branch.
+        enable_influx (bool): Add new users over time.
+        crn (bool): Share random streams across branches (common random numbers).
+        start_ts (datetime, optional): Timestamp of batch 0 in generated events (default: now).
+            Model runs are keyed by it, so pass a fixed one to make them cacheable.
+        telemetry (TelemetryEmitter, optional): Receives live per-batch metrics (not closed
+            by the simulation).
+        compact_every (int, optional): Compact churned users out of the live arrays every
+            this many batches; results are unchanged, memory tracks the alive population.
+        archive_dir (str, optional): Directory for the per-branch archives of compacted users.
+        storage_dir (str, optional): Keep each branch's population in memory-mapped files under
+            this directory (`population.storage`) instead of RAM.
+        chunk_size (int, optional): Step branches in chunks of this many users. Part of the
+            cache key when any branch runs a model, whose results depend on it (`runner.BatchLoop`).
+        initial_state (PopulationState, optional): Starting population shared by every branch
+            instead of a sampled one, e.g. `events.ingest.TraceData.to_state`. Its length must
+            equal config.NUM_USERS.
+        presence (TracePresence, optional): Observed per-batch presence replayed in place of
+            sampled presence for the batches it covers.
+        scheduler (BudgetScheduler, optional): Per-batch intervention budget and tier quotas
+            applied to every branch's proposed actions (`strategy.scheduler`).
+        event_sampler (EventSampler, optional): Thins the event frames handed to model branches
+            and adds importance weights (`events.sampling`).
+        kernels (str): Stepping backend for model-free branches: "auto" (fused Numba kernel
+            when installed), "numpy" or "numba" (`population.kernels`). Results do not depend on it.
+        sketches (bool): Also record per-batch histograms and quantiles of health, fatigue and
+            rolling activity per archetype (`metrics.sketches`).
+
+    `run(cache=ResultCache(...))` returns a stored result when the same configuration, seed,
+    options, behavior tables and policy code were run before (see `metrics.cache`). Runs with
+    a model are cached only when every model declares a `cache_key`.
+    """
+
+    def __init__(self, config=None, seed=0, policies=None, enable_influx=False, crn=True, start_ts=None,
+                 telemetry=None, compact_every=None, archive_dir=None, storage_dir=None, chunk_size=None,
+                 initial_state=None, presence=None, scheduler=None,
+                 event_sampler=None, kernels="auto", sketches=False):
+        self.config = make_config() if config is None else config
+        self.seed = int(seed)
+        self.policies = {"baseline": None} if policies is None else dict(policies)
+        if not self.policies:
+            raise ValueError("Simulation needs at least one policy")
+        if start_ts is None and any(model is not None for model in self.policies.values()):
+            # Resolved here so the cache key records the timestamps models are fed
+            start_ts = datetime.now()
+        self.options = {"enable_influx": enable_influx, "crn": crn,
+                        "start_ts": None if start_ts is None else str(start_ts)}
+        if chunk_size and any(model is not None for model in self.policies.values()):
+            # Model branches see one event frame per chunk, so their results depend on it
+            self.options["chunk_size"] = int(chunk_size)
+
+        rng = np.random.default_rng(self.seed)
+        if initial_state is not None:
+            if len(initial_state) != self.config.NUM_USERS:
+                raise ValueError(f"initial_state has {len(initial_state)} users, config.NUM_USERS is "
+                                 f"{self.config.NUM_USERS}")
+            self.options["initial_state"] = array_digest(*(getattr(initial_state, name)
+                                                           for name in ("activity", *FIELDS)))
+            if storage_dir is None:
+                states = {name: initial_state.copy() for name in self.policies}
+            else:
+                states = {}
+                for name in self.policies:
+                    states[name] = MemmapPopulationState(os.path.join(storage_dir, name), window=initial_state.window)
+                    states[name].append(initial_state)
+        elif storage_dir is None:
+            initial_state = PopulationState.sample(self.config.NUM_USERS, rng, **sample_options(self.config))
+            states = {name: initial_state.copy() for name in self.policies}
+        else:
+            # Sampled in fixed-size chunks so the population does not depend on `chunk_size`
+            initial_state = MemmapPopulationState.sample(os.path.join(storage_dir, "initial"),
+                                                         self.config.NUM_USERS, rng, **sample_options(self.config))
+            states = {name: initial_state.copy_to(os.path.join(storage_dir, name)) for name in self.policies}
+        self.branches = [
+            PopulationBranch(name=name, model=model, initial_state=states[name])
+            for name, model in self.policies.items()
+        ]
+        if scheduler is not None:
+            self.options["scheduler"] = scheduler.describe()
+            for branch in self.branches:
+                branch.scheduler = scheduler
+        if sketches:
+            self.options["sketches"] = True
+            for branch in self.branches:
+                branch.metrics_store.enable_sketches()
+        if event_sampler is not None:
+            self.options["event_sampler"] = event_sampler.describe()
+            for branch in self.branches:
+                branch.event_sampler = event_sampler
+        if presence is not None:
+            self.options["presence"] = array_digest(presence.uids, presence.offsets)
+            for branch in self.branches:
+                branch.presence_trace = presence
+        self.loop = BatchLoop(self.branches, self.config, enable_influx=enable_influx,
+                              crn=crn, seed=self.seed, start_ts=start_ts, telemetry=telemetry,
+                              compact_every=compact_every, archive_dir=archive_dir, chunk_size=chunk_size,
+                              kernels=kernels)
+
+    @property
+    def batch(self):
+        """Number of batches simulated so far."""
+        return self.loop.batch
+
+    def step(self, num_batches=1):
+        """Advances every branch by `num_batches` batches."""
+        self.loop.run(num_batches=num_batches, progress=False)
+        return self
+
+    def cache_key(self):
+        """Content hash identifying this run's output, or None if a policy cannot be versioned."""
+        return simulation_key(self.config, self.seed, self.policies, **self.options)
+
+    def run(self, progress=False, cache=None, snapshots=False):
+        """
+        Runs to TOTAL_BATCHES and returns the SimulationResult.
+
+        With a ResultCache, a fresh simulation whose key is already cached returns the stored
+        result at once (`result.cached` is True; the branches are not advanced). Otherwise the
+        finished run is stored, with the final alive population of every branch when
+        `snapshots` is set (read back with `cache.snapshots(sim.cache_key())`).
+        """
+        key = self.cache_key() if cache is not None and self.batch == 0 else None
+        if key is not None:
+            entry = cache.get(key)
+            if entry is not None:
+                metrics, _ = entry
+                return SimulationResult(self.config, self.seed, metrics, cached=True,
+                                        policies=self.policy_versions(), options=self.options)
+        self.loop.run(progress=progress)
+        result = self.result()
+        if key is not None:
+            cache.put(key, result.metrics, meta=result.meta(),
+                      snapshots=self.snapshots() if snapshots else None)
+        return result
+
+    def snapshots(self):
+        """Final alive population of every branch as "branch/field" → array."""
+        arrays = {}
+        for branch in self.branches:
+            state = branch.to_state()
+            for name, value in vars(state).items():
+                if isinstance(value, np.ndarray):
+                    arrays[f"{branch.name}/{name}"] = value
+            arrays[f"{branch.name}/uid"] = np.asarray(branch.alive_uids(), dtype=np.int64)
+        return arrays
+
+    def result(self):
+        """SimulationResult for the batches simulated so far."""
+        metrics = {branch.name: branch.metrics() for branch in self.branches}
+        return SimulationResult(self.config, self.seed, metrics, policies=self.policy_versions(),
+                                options=self.options)
+
+    def policy_versions(self):
+        """Branch name → policy version, as recorded in result metadata."""
+        return {name: policy_version(model) for name, model in self.policies.items()}
+
+    def fork(self):
+        """Independent copy of this simulation at its current batch (see `BatchLoop.fork`)."""
+        clone = Simulation.__new__(Simulation)
+        clone.config = self.config
+        clone.seed = self.seed
+        clone.options = self.options
+        clone.loop = self.loop.fork()
+        clone.branches = clone.loop.branches
+        clone.policies = {branch.name: branch.model for branch in clone.branches}
+        return clone
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -1,5 +1,14 @@
 import random
 
+import numpy as np
+
+from utils.rule_tables import ACTION_INDEX, TIER_INDEX
+
+# Number of U(0, 1) draws per user consumed by `compute_baseline_actions_vectorized`
+BASELINE_UNIFORMS = 4
+CHAOS_ACTIONS = np.array([ACTION_INDEX[a] for a in ["observe", "boost", "reinforce", "delay", "suppress", "escalate"]],
+                         dtype=np.int8)
+
 def compute_baseline_actions(batch_num, alive_users, user_health, value, fatigue, last_actions,
                              activity_window, cooldown=3, chaos_prob=0.03):
     """
@@ -78,6 +87,70 @@ def compute_baseline_actions(batch_num, alive_users, user_health, value, fatigue
     return actions
 
 
+def compute_baseline_actions_vectorized(batch_num, state, uniforms, cooldown=3, chaos_prob=0.03):
+    """
+    Whole-population version of `compute_baseline_actions` over a PopulationState.
+
+    The same rules apply, including the cooldown lapses and chaos overrides. Randomness comes
+    from `uniforms`, a [BASELINE_UNIFORMS, num_users] array of U(0, 1) draws, so callers control
+    how draws are shared. Only alive users act; `state.last_action` is updated in place.
+
+    Returns:
+        np.ndarray: ACTIONS index per user (int8).
+    """
+    lapse_u, rule_u, chaos_u, pick_u = uniforms
+    act = ACTION_INDEX
+    bh = state.user_health
+    f = state.fatigue
+    premium = state.value >= TIER_INDEX["pro"]
+    enterprise = state.value == TIER_INDEX["enterprise"]
+
+    # Check cooldown; allow rare violations to simulate operational inconsistency
+    blocked = ~(lapse_u < 0.1) & ((batch_num - state.last_action) < cooldown)
+
+    # Track presence acceleration/deceleration as a naive momentum signal
+    recent = state.recent_activity(6).astype(np.int16)
+    activity_trend = recent[:, 3:].sum(axis=1) - recent[:, :3].sum(axis=1)
+
+    # --- Core Heuristic Rules with Known Imperfections (first matching branch wins) ---
+    fatigued = f >= 4
+    healthy = ~fatigued & (bh >= 0.85)
+    moderate = ~fatigued & ~healthy & (bh >= 0.5)
+    low = ~fatigued & ~healthy & ~moderate
+
+    action = np.select(
+        [
+            fatigued & (rule_u < 0.15) & premium,
+            fatigued & (rule_u < 0.15),
+            fatigued,
+            healthy & (f < 3),
+            healthy & (rule_u > 0.1),
+            healthy,
+            moderate & (activity_trend >= 0),
+            moderate & premium,
+            moderate,
+            low & enterprise & (f < 3),
+            low & enterprise,
+            low & (f < 4),
+        ],
+        [
+            act["boost"], act["reinforce"], act["suppress"],
+            act["observe"], act["delay"], act["boost"],
+            act["reinforce"], act["boost"], act["reinforce"],
+            act["escalate"], act["delay"], act["boost"],
+        ],
+        default=act["observe"],
+    ).astype(np.int8)
+
+    # --- Chaos Factor ---
+    chaos = chaos_u < chaos_prob
+    action[chaos] = CHAOS_ACTIONS[np.minimum((pick_u[chaos] * len(CHAOS_ACTIONS)).astype(int), len(CHAOS_ACTIONS) - 1)]
+
+    action[blocked] = act["delay"]
+    state.last_action[state.alive & ~blocked] = batch_num  # Update action history
+    return action
+
+
 # Copyright 2025 Divine Comedy Labs LLC
 # Released under the Polyform Noncommercial License 1.0.0
 # See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
\ No newline at end of file
@@ -0,0 +1,156 @@
+import numpy as np
+
+from utils.constants import VALUE_TIERS
+from utils.rule_tables import ACTION_COST, ACTION_INDEX, TIER_ARR_TABLE, TIER_INDEX
+
+# ------------------------------------------------------------------------------
+# BUDGET SCHEDULER — hard per-batch intervention budget
+# ------------------------------------------------------------------------------
+# Sits between a policy's proposals and the RULES update. Every alive user with a
+# costly proposal (ACTION_COST > 0, other than the passive "observe") is a
+# candidate; the scheduler keeps
+#
+#   1. per tier, at most `tier_quotas[tier]` candidates, highest priority first
+#   2. overall, the highest-priority candidates whose summed cost fits `budget`,
+#      taken in priority order
+#
+# and turns every other proposal into the free `fallback` action ("delay").
+# Selection never sorts the population: quotas use np.argpartition, and the budget
+# cut partitions out a top-k guess (doubling k until the budget binds) and sorts
+# only those k, so the cost is O(n + k log k) for k selected users.
+#
+# Priorities come from the policy when it provides them (a `priority` column in a
+# model's output) and otherwise from `default_priority`, the ARR at risk.
+# ------------------------------------------------------------------------------
+
+
+def default_priority(state):
+    """ARR at risk per user: (1 - user_health) × the ARR of the user's tier."""
+    return (1.0 - state.user_health) * TIER_ARR_TABLE[state.value]
+
+
+def top_k(priority, k):
+    """Indices of the `k` largest priorities (unordered), via argpartition."""
+    if k >= len(priority):
+        return np.arange(len(priority))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    return np.argpartition(priority, len(priority) - k)[len(priority) - k:]
+
+
+def select_within_budget(priority, cost, budget):
+    """
+    Highest-priority prefix of the candidates whose cumulative cost fits `budget`.
+
+    Parameters:
+        priority (np.ndarray): Priority per candidate (higher first).
+        cost (np.ndarray): Cost per candidate (> 0).
+        budget (float): Spend limit.
+
+    Returns:
+        np.ndarray: Indices of the selected candidates, in priority order (every index, in
+        input order, when all candidates fit).
+    """
+    n = len(priority)
+    if n == 0 or budget <= 0:
+        return np.empty(0, dtype=np.intp)
+    if cost.sum() <= budget:
+        return np.arange(n)
+    # First guess: how many average-cost candidates the budget buys
+    k = min(n, max(64, int(2 * budget / cost.mean())))
+    while True:
+        top = top_k(priority, k)
+        order = top[np.argsort(-priority[top], kind="stable")]
+        fit = int(np.searchsorted(np.cumsum(cost[order]), budget, side="right"))
+        if fit < k or k == n:
+            return order[:fit]
+        k = min(n, 2 * k)
+
+
+class BudgetScheduler:
+    """
+    Enforces a per-batch energy budget and per-tier intervention quotas on proposed actions.
+
+    Parameters:
+        budget (float, optional): Maximum summed ACTION_COST of the scheduled actions per batch
+            (None: unlimited).
+        tier_quotas (dict, optional): Tier name → maximum number of costly actions per batch.
+        fallback (str): Action given to deferred users (must be free).
+        passive (tuple): Actions that are not interventions. They are never deferred and
+            count against neither the budget nor the quotas, even though they cost energy.
+
+    Users whose proposal is deferred keep their previous `last_action`, so cooldowns do not
+    hold them back from the next batch.
+    """
+
+    def __init__(self, budget=None, tier_quotas=None, fallback="delay", passive=("observe",)):
+        unknown = set(tier_quotas or {}) - set(VALUE_TIERS)
+        if unknown:
+            raise ValueError(f"Unknown tiers in tier_quotas: {sorted(unknown)}")
+        if ACTION_COST[ACTION_INDEX[fallback]] > 0:
+            raise ValueError(f"Fallback action '{fallback}' has a cost")
+        self.budget = budget
+        self.tier_quotas = dict(tier_quotas or {})
+        self.fallback = ACTION_INDEX[fallback]
+        self.passive = np.array([ACTION_INDEX[name] for name in passive], dtype=np.int8)
+
+    def describe(self):
+        """JSON-serializable settings (used in result cache keys)."""
+        return {"budget": self.budget, "tier_quotas": self.tier_quotas, "fallback": int(self.fallback),
+                "passive": self.passive.tolist()}
+
+    def schedule(self, actions, priority, state):
+        """
+        Applies the budget and quotas to one batch of proposals.
+
+        Parameters:
+            actions (np.ndarray): Proposed ACTIONS index per user; deferred entries are
+                overwritten with the fallback action in place.
+            priority (np.ndarray): Priority per user (higher is served first).
+            state (PopulationState): The users' state (tiers and alive flags).
+
+        Returns:
+            dict: "proposed" (candidates), "scheduled", "deferred" (bool mask per user),
+            "spent" (cost of the scheduled actions) and "utilization" (spent / budget).
+        """
+        cost = ACTION_COST[actions]
+        proposed = state.alive & (cost > 0) & ~np.isin(actions, self.passive)
+        selected = proposed.copy()
+
+        for tier, quota in self.tier_quotas.items():
+            members = np.flatnonzero(selected & (state.value == TIER_INDEX[tier]))
+            if len(members) > quota:
+                selected[members] = False
+                selected[members[top_k(priority[members], quota)]] = True
+
+        candidates = np.flatnonzero(selected)
+        if self.budget is not None:
+            candidates = candidates[select_within_budget(priority[candidates], cost[candidates], self.budget)]
+
+        deferred = proposed
+        deferred[candidates] = False
+        actions[deferred] = self.fallback
+        spent = float(cost[candidates].sum())
+        return {
+            "proposed": int(len(candidates) + np.count_nonzero(deferred)),
+            "scheduled": int(len(candidates)),
+            "deferred": deferred,
+            "spent": spent,
+            "utilization": spent / self.budget if self.budget else 0.0,
+        }
+
+
+def parse_tier_quotas(specs):
+    """Parses ["basic=1000", "pro=200"] into {"basic": 1000, "pro": 200}."""
+    quotas = {}
+    for spec in specs or []:
+        tier, _, count = spec.partition("=")
+        if not count:
+            raise ValueError(f"Tier quota must look like TIER=COUNT, got '{spec}'")
+        quotas[tier] = int(count)
+    return quotas
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
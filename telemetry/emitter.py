@@ -0,0 +1,160 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+from metrics.store import SERIES
+
+# ------------------------------------------------------------------------------
+# TELEMETRY — live per-batch metrics for long-running simulations
+# ------------------------------------------------------------------------------
+# A TelemetryEmitter is attached to a BatchLoop and, every `every` batches, builds
+# one record holding each branch's latest churn, ARR, energy, penalties, comebacks
+# and alive count plus the batch latency. Records are handed to a background
+# thread through a bounded queue, so a slow disk or an absent listener never
+# stalls the simulation: when the queue is full the record is dropped and counted.
+#
+# Sinks (chosen with `open_sink`):
+#   jsonl:PATH   append one JSON object per line (tail with `python -m telemetry.watch`)
+#   unix:PATH    send JSON datagrams to a Unix socket (watcher listens with --socket)
+#   prom:PATH    rewrite a Prometheus text-format file atomically (node-exporter textfile)
+# ------------------------------------------------------------------------------
+
+
+class JsonlSink:
+    """Appends records as JSON lines, flushing after each one so tails see them immediately."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class UnixSocketSink:
+    """Sends records as datagrams to a listening Unix socket; drops them if nobody listens."""
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def write(self, record):
+        try:
+            self.sock.sendto(json.dumps(record).encode("utf-8"), self.path)
+        except OSError:
+            pass  # No watcher or its buffer is full: telemetry is best-effort
+
+    def close(self):
+        self.sock.close()
+
+
+class PrometheusFileSink:
+    """Keeps a Prometheus text-format file holding the latest values as gauges."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+
+    def write(self, record):
+        run = record["run"]
+        lines = [
+            "# TYPE churnlab_batch gauge",
+            f'churnlab_batch{{run="{run}"}} {record["batch"]}',
+            "# TYPE churnlab_batch_latency_seconds gauge",
+            f'churnlab_batch_latency_seconds{{run="{run}"}} {record["latency_s"]}',
+        ]
+        for metric in SERIES:
+            lines.append(f"# TYPE churnlab_{metric} gauge")
+            for branch, values in record["branches"].items():
+                lines.append(f'churnlab_{metric}{{run="{run}",branch="{branch}"}} {values[metric]}')
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+    def close(self):
+        pass
+
+
+SINKS = {"jsonl": JsonlSink, "unix": UnixSocketSink, "prom": PrometheusFileSink}
+
+
+def open_sink(target):
+    """
+    Opens a sink from a "kind:path" target. Without a prefix the kind is inferred from the
+    extension: .prom → Prometheus file, .sock → Unix socket, anything else → JSONL.
+    """
+    kind, sep, path = target.partition(":")
+    if not sep or kind not in SINKS:
+        path = target
+        kind = {".prom": "prom", ".sock": "unix"}.get(os.path.splitext(target)[1], "jsonl")
+    return SINKS[kind](path)
+
+
+class TelemetryEmitter:
+    """
+    Non-blocking per-batch telemetry.
+
+    Parameters:
+        sink: Object with write(record) and close(), or a target string for `open_sink`.
+        every (int): Emit one record every `every` batches.
+        run_id (str, optional): Label identifying this run in every record.
+        max_pending (int): Records buffered before new ones are dropped.
+    """
+
+    def __init__(self, sink, every=1, run_id=None, max_pending=1024):
+        self.sink = open_sink(sink) if isinstance(sink, str) else sink
+        self.every = max(1, int(every))
+        self.run_id = run_id or f"run-{os.getpid()}-{int(time.time())}"
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._drain, name="churnlab-telemetry", daemon=True)
+        self._thread.start()
+
+    def record_batch(self, batch, branches, latency):
+        """Queues a record for `batch` if it falls on the cadence; never blocks."""
+        if batch % self.every != 0:
+            return
+        record = {
+            "run": self.run_id,
+            "batch": batch,
+            "time": time.time(),
+            "latency_s": latency,
+            "branches": {
+                branch.name: {name: float(branch.metrics_store.view(name)[-1]) for name in SERIES}
+                for branch in branches if branch.metrics_store.length
+            },
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self.sink.write(record)
+            except OSError:
+                self.dropped += 1
+
+    def close(self):
+        """Flushes queued records and closes the sink."""
+        self._queue.put(None)
+        self._thread.join()
+        self.sink.close()
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,94 @@
+import argparse
+import glob
+import json
+import os
+import socket
+import time
+
+# ------------------------------------------------------------------------------
+# TELEMETRY WATCHER — follow live runs from a terminal
+# ------------------------------------------------------------------------------
+#     python -m telemetry.watch output/telemetry/*.jsonl      # tail JSONL runs
+#     python -m telemetry.watch --socket /tmp/churnlab.sock   # receive datagrams
+#
+# Each record prints as one line: run, batch, batch latency and, per branch,
+# churn / ARR / alive users. File patterns are re-globbed while watching, so runs
+# that start later in a sweep are picked up automatically.
+# ------------------------------------------------------------------------------
+
+
+def format_record(record):
+    """One-line summary of a telemetry record."""
+    parts = [f"{record['run']:<20}", f"batch {record['batch']:>6}", f"{1000 * record['latency_s']:7.1f} ms"]
+    for branch, values in record["branches"].items():
+        parts.append(f"{branch}: churn {values['churn']:.4f} arr {values['arr']:,.0f} alive {values['alive']:.0f}")
+    return " | ".join(parts)
+
+
+def follow_files(patterns, from_start=False, interval=0.5, once=False):
+    """
+    Prints records appended to every JSONL file matching `patterns`.
+    With `once`, prints only the latest record of each file and returns.
+    """
+    offsets = {}
+    while True:
+        for path in sorted({p for pattern in patterns for p in glob.glob(pattern)}):
+            if path not in offsets:
+                offsets[path] = 0 if (from_start or once) else os.path.getsize(path)
+            with open(path, "r", encoding="utf-8") as f:
+                f.seek(offsets[path])
+                chunk = f.read()
+            # Only consume complete lines; a partially written record is read next time
+            complete = chunk[:chunk.rfind("\n") + 1]
+            offsets[path] += len(complete.encode("utf-8"))
+            lines = complete.splitlines()
+            for line in (lines[-1:] if once else lines):
+                if line.strip():
+                    print(format_record(json.loads(line)), flush=True)
+        if once:
+            return
+        time.sleep(interval)
+
+
+def listen_socket(path):
+    """Binds a datagram Unix socket at `path` and prints every record received."""
+    if os.path.exists(path):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    try:
+        while True:
+            payload = sock.recv(1 << 20)
+            print(format_record(json.loads(payload)), flush=True)
+    finally:
+        sock.close()
+        os.unlink(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch live ChurnLab telemetry")
+    parser.add_argument("files", nargs="*", help="JSONL telemetry files or glob patterns to tail")
+    parser.add_argument("--socket", help="Listen for telemetry datagrams on this Unix socket path")
+    parser.add_argument("--from-start", action="store_true", help="Print existing records before following")
+    parser.add_argument("--once", action="store_true", help="Print the latest record of each file and exit")
+    parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds (default: 0.5)")
+    args = parser.parse_args(argv)
+
+    if bool(args.files) == bool(args.socket):
+        parser.error("give either telemetry files or --socket")
+    try:
+        if args.socket:
+            listen_socket(args.socket)
+        else:
+            follow_files(args.files, from_start=args.from_start, interval=args.interval, once=args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
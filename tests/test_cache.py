@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import make_config
+from metrics.cache import ResultCache
+from simulation import Simulation
+
+# ------------------------------------------------------------------------------
+# RESULT CACHE KEYS
+# ------------------------------------------------------------------------------
+# Runs whose results differ must never share a cache entry. Run with
+# `python -m pytest tests/test_cache.py`.
+# ------------------------------------------------------------------------------
+
+
+class BoostEveryOther:
+    """Deterministic test policy: boosts even uids, observes odd ones."""
+
+    cache_key = "v1"
+
+    def run(self, df, uid_col=None, time_col=None):
+        uids = np.unique(df[uid_col].to_numpy())
+        return pd.DataFrame({"uid": uids, "action": np.where(uids % 2 == 0, "boost", "observe")})
+
+
+class Unversioned(BoostEveryOther):
+    """Same policy without a `cache_key`: the code it depends on cannot be versioned."""
+
+    cache_key = None
+
+
+START_TS = datetime(2025, 3, 1)
+
+
+def _simulation(model=None, start_ts=START_TS, **kwargs):
+    config = make_config(NUM_USERS=400, DAYS=2)
+    policies = {"model": BoostEveryOther() if model is None else model, "baseline": None}
+    return Simulation(config, seed=3, policies=policies, start_ts=start_ts, **kwargs)
+
+
+def test_chunk_size_keys_model_runs(tmp_path):
+    whole, chunked = _simulation(), _simulation(chunk_size=100)
+    assert whole.cache_key() != chunked.cache_key()
+
+    cache = ResultCache(str(tmp_path))
+    whole.run(cache=cache)
+    assert not chunked.run(cache=cache).cached
+
+
+def test_models_without_cache_key_are_not_cached(tmp_path):
+    assert _simulation(Unversioned()).cache_key() is None
+    cache = ResultCache(str(tmp_path))
+    _simulation(Unversioned()).run(cache=cache)
+    assert not _simulation(Unversioned()).run(cache=cache).cached
+
+
+def test_start_ts_keys_model_runs():
+    assert _simulation().cache_key() == _simulation().cache_key()
+    assert _simulation().cache_key() != _simulation(start_ts=datetime(2025, 3, 2)).cache_key()
+    # An unset start time resolves to the current time, which the key records
+    assert _simulation(start_ts=None).options["start_ts"] is not None
+
+
+def test_chunk_size_does_not_key_model_free_runs():
+    config = make_config(NUM_USERS=400, DAYS=2)
+    assert Simulation(config, seed=3).cache_key() == Simulation(config, seed=3, chunk_size=100).cache_key()
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
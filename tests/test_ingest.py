@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from config import BATCHES_PER_DAY
+from events.ingest import AGGREGATE_FIELDS, ingest_logs
+
+# ------------------------------------------------------------------------------
+# TRACE INGESTION
+# ------------------------------------------------------------------------------
+# Per-user aggregates of a time-ordered log must not depend on how it is read:
+# the chunk size, or how the log is split into files covering consecutive
+# periods. Run with `python -m pytest tests/test_ingest.py`.
+# ------------------------------------------------------------------------------
+
+START = 1_700_000_000
+FIELDS = ("ids",) + AGGREGATE_FIELDS
+
+
+def _write_log(path, num_rows=20_000, num_users=300, days=20, seed=0):
+    rng = np.random.default_rng(seed)
+    log = pd.DataFrame({
+        "uid": rng.integers(0, num_users, num_rows),
+        "timestamp": np.sort(rng.integers(START, START + days * 86400, num_rows)),
+        "tier": rng.choice(["basic", "pro", "enterprise", "unknown"], num_rows),
+    })
+    log.to_csv(path, index=False)
+    return log
+
+
+def _ingest(paths, chunk_rows):
+    return ingest_logs(paths, tier_col="tier", chunk_rows=chunk_rows, processes=1).aggregate
+
+
+def test_aggregates_do_not_depend_on_chunk_rows(tmp_path):
+    path = str(tmp_path / "log.csv")
+    log = _write_log(path)
+    whole = _ingest(path, chunk_rows=10**7)
+    for chunk_rows in (1_000, 997, 50):
+        chunked = _ingest(path, chunk_rows=chunk_rows)
+        for name in FIELDS:
+            assert np.array_equal(whole[name], chunked[name]), f"{name} with chunk_rows={chunk_rows}"
+
+    half = len(log) // 2 + 7
+    paths = [str(tmp_path / "a.csv"), str(tmp_path / "b.csv")]
+    log[:half].to_csv(paths[0], index=False)
+    log[half:].to_csv(paths[1], index=False)
+    split = _ingest(paths, chunk_rows=333)
+    for name in FIELDS:
+        assert np.array_equal(whole[name], split[name]), f"{name} across files"
+
+
+def test_active_batches_and_sumsq_match_the_log(tmp_path):
+    path = str(tmp_path / "log.csv")
+    log = _write_log(path)
+    aggregate = _ingest(path, chunk_rows=500)
+
+    batch = log["timestamp"] // (86400 // BATCHES_PER_DAY)
+    counts = log.groupby(["uid", batch]).size()
+    assert np.array_equal(aggregate["active"], counts.groupby(level=0).size().to_numpy())
+    assert np.array_equal(aggregate["sumsq"], (counts ** 2).groupby(level=0).sum().to_numpy())
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from population.kernels import HAVE_NUMBA, fused_baseline_step
+from population.state import FIELDS, PopulationState
+from strategy.baseline_heuristics import BASELINE_UNIFORMS
+
+# ------------------------------------------------------------------------------
+# FUSED KERNEL PARITY
+# ------------------------------------------------------------------------------
+# The fused kernel must reproduce the NumPy path bit for bit, for every state
+# array, action and outcome, whichever backend runs it. Run with
+# `python -m pytest tests/test_kernels.py`.
+# ------------------------------------------------------------------------------
+
+MAX_FATIGUE = 5
+BACKENDS = ["python", pytest.param("numba", marks=pytest.mark.skipif(not HAVE_NUMBA, reason="numba not installed"))]
+
+
+def _population(num_users, rng):
+    state = PopulationState.sample(num_users, rng)
+    # Spread users over every policy rule and activity pattern, not only fresh ones
+    state.fatigue[:] = rng.uniform(0, MAX_FATIGUE, num_users)
+    state.user_health[:] = rng.uniform(0.2, 1, num_users)
+    state.activity[:] = rng.random(state.activity.shape) < 0.5
+    state.activity_sum[:] = state.activity.sum(axis=1)
+    return state
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_fused_kernel_matches_numpy(backend):
+    rng = np.random.default_rng(7)
+    num_users = 2_000 if backend == "python" else 50_000
+    reference = _population(num_users, rng)
+    fused = reference.copy()
+
+    for batch in range(12):
+        draws = (rng.random(num_users), rng.standard_normal(num_users), rng.random((BASELINE_UNIFORMS, num_users)))
+        counts_a, actions_a, outcome_a = fused_baseline_step(reference, *draws, batch, MAX_FATIGUE, backend="numpy")
+        counts_b, actions_b, outcome_b = fused_baseline_step(fused, *draws, batch, MAX_FATIGUE, backend=backend)
+
+        for name in list(FIELDS) + ["activity", "activity_sum"]:
+            assert np.array_equal(getattr(reference, name), getattr(fused, name)), f"{name} at batch {batch}"
+        assert np.array_equal(counts_a, counts_b), f"counts at batch {batch}"
+        assert np.array_equal(actions_a, actions_b), f"actions at batch {batch}"
+        for name in outcome_a:
+            assert np.array_equal(outcome_a[name], outcome_b[name]), f"{name} at batch {batch}"
+        assert reference.cursor == fused.cursor
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
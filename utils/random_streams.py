@@ -0,0 +1,77 @@
+import numpy as np
+
+# ------------------------------------------------------------------------------
+# RANDOM STREAMS — common random numbers for branch comparisons
+# ------------------------------------------------------------------------------
+# Every random draw in the batch loop comes from a stream identified by
+# (seed, purpose, batch, branch key). Draws are indexed by user slot, so user i
+# receives the same number from a stream regardless of population size or of
+# which branch asks for it.
+#
+# With common random numbers (crn=True) every branch uses key 0: users face the
+# same presence, row-count and policy-noise draws in all branches, and
+# challenger-vs-baseline differences reflect the policies rather than luck.
+# With crn=False each branch gets its own key and the draws are independent —
+# the control used to measure how much variance CRN removes.
+#
+# Per-user draws are split into blocks of BLOCK_SIZE uids, each with its own
+# stream, so any uid range can be drawn on its own (e.g. one chunk of an
+# out-of-core population) and still match the corresponding slice of a draw over
+# the whole population. Block 0 keeps the original unblocked stream.
+# ------------------------------------------------------------------------------
+
+PURPOSES = ("presence", "row_counts", "policy", "events", "influx", "sampling")
+BLOCK_SIZE = 1 << 16
+
+
+class RandomStreams:
+    """
+    Counter-based source of per-batch random draws.
+
+    Parameters:
+        seed (int): Root seed for the run.
+        crn (bool): Share streams across branches (common random numbers).
+    """
+
+    def __init__(self, seed, crn=True):
+        self.seed = int(seed)
+        self.crn = crn
+
+    def generator(self, purpose, batch, branch=0, block=0):
+        """Fresh Generator positioned at the start of the (purpose, batch, branch, block) stream."""
+        key = 0 if self.crn else branch + 1
+        entropy = [self.seed, PURPOSES.index(purpose), int(batch), key] + ([int(block)] if block else [])
+        return np.random.default_rng(np.random.SeedSequence(entropy))
+
+    def _per_user(self, method, purpose, batch, size, branch, start):
+        shape = (size,) if np.isscalar(size) else tuple(size)
+        count, rest = shape[0], shape[1:]
+        if count == 0:
+            return np.empty(shape)
+        parts = []
+        first, last = start // BLOCK_SIZE, (start + count - 1) // BLOCK_SIZE
+        for block in range(first, last + 1):
+            base = block * BLOCK_SIZE
+            lo, hi = max(start, base), min(start + count, base + BLOCK_SIZE)
+            draws = getattr(self.generator(purpose, batch, branch, block), method)((hi - base,) + rest)
+            parts.append(draws[lo - base:])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def uniforms(self, purpose, batch, size, branch=0, start=0):
+        """
+        U(0, 1) draws of the given size (int or shape whose first axis indexes users) for
+        users `start`, `start + 1`, ...
+        """
+        return self._per_user("random", purpose, batch, size, branch, start)
+
+    def normals(self, purpose, batch, size, branch=0, start=0):
+        """
+        Standard-normal draws of the given size (int or shape whose first axis indexes users)
+        for users `start`, `start + 1`, ...
+        """
+        return self._per_user("standard_normal", purpose, batch, size, branch, start)
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -0,0 +1,72 @@
+import numpy as np
+
+from utils.constants import (
+    ARCHETYPES, RULES, STATES, STRATEGIES, STRATEGY_COSTS, VALUE_TIERS, TIER_PROBS,
+    TIER_ARR, EVENT_TYPES, EVENT_PROBS_BY_STATE, EVENT_TYPE_SCORES
+)
+
+# ------------------------------------------------------------------------------
+# RULE TABLES — array encodings of the constants in utils.constants
+# ------------------------------------------------------------------------------
+# The vectorized simulation paths index these tables with small integer codes
+# instead of looking up strings in dicts for every user. Each table is built once
+# at import from the canonical definitions, so editing utils.constants is still
+# the only place the simulation dynamics need to change.
+# ------------------------------------------------------------------------------
+
+# "delay" is emitted by the baseline heuristic but has no RULES entry: it is a no-op.
+ACTIONS = STRATEGIES + ["delay"]
+NOOP_ACTION = ACTIONS.index("delay")
+ARCHETYPE_NAMES = list(ARCHETYPES.keys())
+
+STATE_INDEX = {name: i for i, name in enumerate(STATES)}
+ACTION_INDEX = {name: i for i, name in enumerate(ACTIONS)}
+ARCHETYPE_INDEX = {name: i for i, name in enumerate(ARCHETYPE_NAMES)}
+TIER_INDEX = {name: i for i, name in enumerate(VALUE_TIERS)}
+
+# === State Transition Tables [state, action] ===
+# Missing (state, action) pairs keep the user in place with no health change,
+# mirroring the RULES.get(...) fallback used by the per-user loop.
+NEXT_STATE = np.tile(np.arange(len(STATES), dtype=np.int8)[:, None], (1, len(ACTIONS)))
+D_HEALTH = np.zeros((len(STATES), len(ACTIONS)))
+PENALTY = np.zeros((len(STATES), len(ACTIONS)))
+
+for (state, action), rule in RULES.items():
+    s, a = STATE_INDEX[state], ACTION_INDEX[action]
+    NEXT_STATE[s, a] = STATE_INDEX[rule["next"]]
+    D_HEALTH[s, a] = rule["d_health"]
+    PENALTY[s, a] = rule["penalty"]
+
+ACTION_COST = np.array([STRATEGY_COSTS.get(action, 0.0) for action in ACTIONS])
+
+# === Archetype Tables [archetype] ===
+ARCH_HEALTH_MULT = np.array([ARCHETYPES[a]["user_health_mult"] for a in ARCHETYPE_NAMES])
+ARCH_FATIGUE_MULT = np.array([ARCHETYPES[a]["fatigue_mult"] for a in ARCHETYPE_NAMES])
+ARCH_ROW_MEAN = np.array([ARCHETYPES[a]["row_mean"] for a in ARCHETYPE_NAMES], dtype=float)
+ARCH_VOLATILITY = np.array([ARCHETYPES[a]["volatility"] for a in ARCHETYPE_NAMES])
+ARCH_COOLDOWN = np.array([ARCHETYPES[a]["cooldown"] for a in ARCHETYPE_NAMES], dtype=np.int16)
+ARCH_STATE_ROW_MULT = np.array([
+    [ARCHETYPES[a]["state_row_mult"].get(state, 1.0) for state in STATES]
+    for a in ARCHETYPE_NAMES
+])
+
+# === Value Tier Tables [tier] ===
+TIER_ARR_TABLE = np.array([TIER_ARR[tier] for tier in VALUE_TIERS], dtype=float)
+TIER_PROB_TABLE = np.array(TIER_PROBS)
+
+# === Event Tables ===
+EVENT_CUMPROBS = np.cumsum([EVENT_PROBS_BY_STATE[state] for state in STATES], axis=1)
+EVENT_SCORES = np.array([EVENT_TYPE_SCORES.get(ev, 0) for ev in EVENT_TYPES], dtype=float)
+
+
+def encode_actions(names):
+    """
+    Converts an iterable of strategy names into ACTIONS indices.
+    Unknown names map to the no-op action, matching the RULES/STRATEGY_COSTS fallbacks.
+    """
+    return np.fromiter((ACTION_INDEX.get(name, NOOP_ACTION) for name in names), dtype=np.int8)
+
+
+# Copyright 2025 Divine Comedy Labs LLC
+# Released under the Polyform Noncommercial License 1.0.0
+# See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/
@@ -1,7 +1,76 @@
-import matplotlib.pyplot as plt
-from collections import Counter
+import multiprocessing
+import numpy as np
 import os
 
+# ------------------------------------------------------------------------------
+# CHARTING MODULE
+# ------------------------------------------------------------------------------
+# Charts are described as panels (title, axis labels and the series to draw) and
+# rendered straight from the metric arrays: each individual chart and the
+# composite dashboard draw the same panel specs, so nothing is copied between
+# figures. Long series are min/max decimated to at most `max_points` per line,
+# which keeps spikes visible while bounding render cost. A series may also be a
+# 2-D [replicates, batches] array, drawn as a mean line inside a min/max band.
+# Distribution sketches (metrics.sketches) are drawn as per-batch heatmaps by
+# `generate_distribution_heatmaps`.
+# ------------------------------------------------------------------------------
+
+DEFAULT_MAX_POINTS = 2000
+SERIES_ARGS = ("real_energy", "base_energy", "arr_retained_real", "arr_retained_base",
+               "real_churn", "base_churn", "penalty_tracker")
+
+
+def decimate_minmax(values, max_points=DEFAULT_MAX_POINTS):
+    """
+    Reduces a 1-D series to at most `max_points` points by keeping the minimum and maximum
+    of each bucket, so peaks and dips survive the downsampling.
+
+    Returns:
+        (x, y): Batch indices and values to plot.
+    """
+    y = np.asarray(values, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n), y
+    buckets = max(1, max_points // 2)
+    starts = np.linspace(0, n, buckets + 1).astype(int)[:-1]
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    return np.repeat(starts, 2), np.column_stack([lows, highs]).ravel()
+
+
+def _decimate_band(low, high, max_points):
+    """Bucketed lower/upper envelope for a replicate band."""
+    n = len(low)
+    if n <= max_points:
+        return np.arange(n), low, high
+    starts = np.linspace(0, n, max_points + 1).astype(int)[:-1]
+    return starts, np.minimum.reduceat(low, starts), np.maximum.reduceat(high, starts)
+
+
+def _draw_panel(ax, panel, max_points):
+    """Draws one panel spec onto an axis."""
+    for label, data, style in panel["series"]:
+        data = np.asarray(data, dtype=float)
+        if data.size == 0:
+            continue
+        if data.ndim == 2:
+            x_band, low, high = _decimate_band(np.nanmin(data, axis=0), np.nanmax(data, axis=0), max_points)
+            ax.fill_between(x_band, low, high, alpha=0.15, color=style.get("color"), linewidth=0)
+            data = np.nanmean(data, axis=0)
+        x, y = decimate_minmax(data, max_points)
+        ax.plot(x, y, label=label, **style)
+    for batch_idx, label in panel.get("annotations") or []:
+        ax.axvline(x=batch_idx, color="gray", linestyle=":", alpha=0.6)
+        ax.text(batch_idx + 1, 0.05, label, rotation=90, fontsize=8, color="gray")
+    ax.set_title(panel["title"])
+    ax.set_xlabel("Batch")
+    ax.set_ylabel(panel["ylabel"])
+    ax.grid(True)
+    if panel.get("legend", True):
+        ax.legend()
+
+
 def generate_summary_charts(
     real_energy,
     base_energy,
@@ -15,7 +84,10 @@ def generate_summary_charts(
     user_states=None,
     save=False,
     prefix="chart",
-    dashboard=True
+    dashboard=True,
+    dpi=300,
+    max_points=DEFAULT_MAX_POINTS,
+    output_dir="output"
 ):
     """
     Generates a series of metric charts comparing the challenger (adaptive system)
@@ -26,120 +98,182 @@ def generate_summary_charts(
     - ARR retention over time
     - Churn rate over time
     - Penalty intensity (optional)
-    - Churned archetype distribution (optional)
     - Composite dashboard (optional)
 
     Parameters:
-        real_energy (list[float]): Energy used by challenger per batch
-        base_energy (list[float]): Energy used by baseline per batch
-        arr_retained_real (list[float]): ARR retained by challenger per batch
-        arr_retained_base (list[float]): ARR retained by baseline per batch
-        real_churn (list[float]): Churn ratio of challenger per batch
-        base_churn (list[float]): Churn ratio of baseline per batch
-        penalty_tracker (list[float], optional): Penalty score per batch
+        real_energy (array-like): Energy used by challenger per batch
+        base_energy (array-like): Energy used by baseline per batch
+        arr_retained_real (array-like): ARR retained by challenger per batch
+        arr_retained_base (array-like): ARR retained by baseline per batch
+        real_churn (array-like): Churn ratio of challenger per batch
+        base_churn (array-like): Churn ratio of baseline per batch
+        penalty_tracker (array-like, optional): Penalty score per batch
         annotations (list[tuple], optional): List of (batch_idx, label) tuples to annotate events
         churned_users (list, optional): Unused in current logic (placeholder)
         user_states (dict, optional): Unused in current logic (placeholder)
-        save (bool): Whether to save the charts as PNGs
+        save (bool): Whether to save the individual charts as PNGs
         prefix (str): Filename prefix for saved charts
         dashboard (bool): Whether to create a composite dashboard view
+        dpi (int): Resolution of saved images
+        max_points (int): Maximum plotted points per line after min/max decimation
+        output_dir (str): Directory for the dashboard image
+
+    Any series may be 1-D [batches] or 2-D [replicates, batches].
     """
+    import matplotlib.pyplot as plt
 
-    os.makedirs("output", exist_ok=True)
-    figs = []
-
-    # --- Energy Usage Chart ---
-    fig1, ax1 = plt.subplots(figsize=(6, 3))
-    ax1.plot(real_energy, label="Challenger Energy", linewidth=2, alpha=0.4)
-    ax1.plot(base_energy, label="Baseline Energy", linestyle="--", alpha=0.4)
-    ax1.set_title("Energy Usage per Batch")
-    ax1.set_xlabel("Batch")
-    ax1.set_ylabel("kWh")
-    ax1.grid(True)
-    ax1.legend()
-    figs.append(fig1)
-    if save:
-        fig1.savefig(f"{prefix}_energy.png", dpi=300)
-    plt.close(fig1)
-
-    # --- ARR Retention Chart ---
-    fig2, ax2 = plt.subplots(figsize=(6, 3))
-    ax2.plot(arr_retained_real, label="Challenger", linewidth=2, alpha=0.6)
-    ax2.plot(arr_retained_base, label="Baseline", linestyle="--", alpha=0.6)
-    ax2.set_title("ARR Retention Over Time")
-    ax2.set_xlabel("Batch")
-    ax2.set_ylabel("ARR Retained ($)")
-    ax2.grid(True)
-    ax2.legend()
-    figs.append(fig2)
-    if save:
-        fig2.savefig(f"{prefix}_arr.png", dpi=300)
-    plt.close(fig2)
-
-    # --- Churn Rate Chart ---
-    fig3, ax3 = plt.subplots(figsize=(6, 3))
-    ax3.plot(real_churn, label="Challenger Churn", linewidth=2, color='blue', alpha=0.6)
-    ax3.plot(base_churn, label="Baseline Churn", linestyle="--", color='orange', alpha=0.6)
-    if annotations:
-        for batch_idx, label in annotations:
-            ax3.axvline(x=batch_idx, color="gray", linestyle=":", alpha=0.6)
-            ax3.text(batch_idx + 1, 0.05, label, rotation=90, fontsize=8, color="gray")
-    ax3.set_title("Churn Rate Over Time")
-    ax3.set_xlabel("Batch")
-    ax3.set_ylabel("Churn Ratio")
-    ax3.grid(True)
-    ax3.legend()
-    figs.append(fig3)
+    panels = [
+        {"name": "energy", "title": "Energy Usage per Batch", "ylabel": "kWh", "series": [
+            ("Challenger Energy", real_energy, {"linewidth": 2, "alpha": 0.4, "color": "tab:blue"}),
+            ("Baseline Energy", base_energy, {"linestyle": "--", "alpha": 0.4, "color": "tab:orange"}),
+        ]},
+        {"name": "arr", "title": "ARR Retention Over Time", "ylabel": "ARR Retained ($)", "series": [
+            ("Challenger", arr_retained_real, {"linewidth": 2, "alpha": 0.6, "color": "tab:blue"}),
+            ("Baseline", arr_retained_base, {"linestyle": "--", "alpha": 0.6, "color": "tab:orange"}),
+        ]},
+        {"name": "churn", "title": "Churn Rate Over Time", "ylabel": "Churn Ratio", "annotations": annotations,
+         "series": [
+            ("Challenger Churn", real_churn, {"linewidth": 2, "color": "blue", "alpha": 0.6}),
+            ("Baseline Churn", base_churn, {"linestyle": "--", "color": "orange", "alpha": 0.6}),
+        ]},
+    ]
+    if penalty_tracker is not None and len(penalty_tracker):
+        panels.append({"name": "penalty", "title": "Intervention Penalty Intensity", "ylabel": "Penalty",
+                       "legend": False, "series": [("Penalty Score", penalty_tracker, {"color": "darkred"})]})
+
+    # --- Individual Charts ---
     if save:
-        fig3.savefig(f"{prefix}_churn.png", dpi=300)
-    plt.close(fig3)
-
-    # --- Penalty Intensity Chart (if provided) ---
-    if penalty_tracker:
-        fig4, ax4 = plt.subplots(figsize=(6, 3))
-        ax4.plot(penalty_tracker, label="Penalty Score", color='darkred')
-        ax4.set_title("Intervention Penalty Intensity")
-        ax4.set_xlabel("Batch")
-        ax4.set_ylabel("Penalty")
-        ax4.grid(True)
-        figs.append(fig4)
-        if save:
-            fig4.savefig(f"{prefix}_penalty.png", dpi=300)
-        plt.close(fig4)
-
-    # --- (Optional) Additional chart logic could go here (e.g., churned archetypes) ---
+        for panel in panels:
+            fig, ax = plt.subplots(figsize=(6, 3))
+            _draw_panel(ax, panel, max_points)
+            fig.savefig(f"{prefix}_{panel['name']}.png", dpi=dpi)
+            plt.close(fig)
 
     # --- Composite Dashboard ---
     if dashboard:
-        total = len(figs)
-        rows = (total + 1) // 2
+        os.makedirs(output_dir, exist_ok=True)
+        rows = (len(panels) + 1) // 2
         fig_dash, axes = plt.subplots(rows, 2, figsize=(12, 3.5 * rows))
         axes = axes.flatten()
-
-        for idx, fig in enumerate(figs):
-            tmp_ax = fig.get_axes()[0]
-            new_ax = axes[idx]
-            for line in tmp_ax.lines:
-                new_ax.plot(
-                    line.get_xdata(),
-                    line.get_ydata(),
-                    label=line.get_label(),
-                    linestyle=line.get_linestyle()
-                )
-            new_ax.set_title(tmp_ax.get_title())
-            new_ax.set_xlabel(tmp_ax.get_xlabel())
-            new_ax.set_ylabel(tmp_ax.get_ylabel())
-            new_ax.grid(True)
-            new_ax.legend()
-
-        for j in range(len(figs), len(axes)):
+        for ax, panel in zip(axes, panels):
+            _draw_panel(ax, panel, max_points)
+        for j in range(len(panels), len(axes)):
             fig_dash.delaxes(axes[j])  # Hide any unused subplot space
-
         fig_dash.tight_layout()
-        fig_dash.savefig("output/dashboard.png", dpi=300)
+        fig_dash.savefig(os.path.join(output_dir, "dashboard.png"), dpi=dpi)
         plt.close(fig_dash)
 
 
+def generate_distribution_heatmaps(
+    metrics,
+    fields=("user_health", "fatigue", "rolling_activity"),
+    archetype=None,
+    ranges=None,
+    dpi=150,
+    max_points=DEFAULT_MAX_POINTS,
+    output_dir="output"
+):
+    """
+    Draws the per-batch distribution sketches of `metrics.sketches` as heatmaps: one image
+    per field, one panel per branch, batches on the x axis and the field's histogram bins
+    on the y axis, each column normalized to the batch's alive population.
+
+    Parameters:
+        metrics (dict): Branch name → metric name → array, with `<field>_hist` and
+            `<field>_quantiles` arrays (recorded with `MetricsStore.enable_sketches`).
+        fields (tuple): Sketched fields to draw.
+        archetype (int, optional): Draw only this archetype and overlay its median and
+            5%/95% quantile lines; by default all archetypes are summed.
+        ranges (dict, optional): Field → (low, high) of the histogram bins (default:
+            `metrics.sketches.SKETCH_RANGES`).
+        dpi (int): Resolution of saved images
+        max_points (int): Maximum plotted batches; longer runs are averaged in buckets
+        output_dir (str): Directory for the distributions_<field>.png images
+
+    Returns:
+        list[str]: Paths of the written images.
+    """
+    import matplotlib.pyplot as plt
+    from metrics.sketches import QUANTILES, SKETCH_RANGES
+
+    ranges = ranges or SKETCH_RANGES
+    branches = [name for name, series in metrics.items() if f"{fields[0]}_hist" in series]
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for field in fields:
+        low, high = ranges[field]
+        fig, axes = plt.subplots(len(branches), 1, figsize=(12, 3 * len(branches)), squeeze=False)
+        for ax, branch in zip(axes[:, 0], branches):
+            hist = np.asarray(metrics[branch][f"{field}_hist"], dtype=float)
+            hist = hist.sum(axis=1) if archetype is None else hist[:, archetype]
+            n = len(hist)
+            starts = np.linspace(0, n, min(n, max_points) + 1).astype(int)[:-1]
+            widths = np.diff(np.append(starts, n))
+            hist = np.add.reduceat(hist, starts, axis=0) / widths[:, None] if n else hist
+            totals = hist.sum(axis=1, keepdims=True)
+            share = np.divide(hist, totals, out=np.zeros_like(hist), where=totals > 0)
+            image = ax.imshow(share.T, origin="lower", aspect="auto", cmap="viridis",
+                              extent=(0, max(n, 1), low, high), interpolation="nearest")
+            if archetype is not None and n:
+                quantiles = np.asarray(metrics[branch][f"{field}_quantiles"])[:, archetype]
+                for q, style in ((0.05, ":"), (0.5, "-"), (0.95, ":")):
+                    j = int(np.argmin(np.abs(QUANTILES - q)))
+                    x, y = decimate_minmax(quantiles[:, j], max_points)
+                    ax.plot(x + 0.5, y, color="white", linestyle=style, linewidth=1, label=f"p{round(q * 100)}")
+                ax.legend(loc="upper right", fontsize=8)
+            ax.set_title(f"{branch}: {field}" + ("" if archetype is None else f" (archetype {archetype})"))
+            ax.set_xlabel("Batch")
+            ax.set_ylabel(field)
+            fig.colorbar(image, ax=ax, label="Share of alive users")
+        fig.tight_layout()
+        path = os.path.join(output_dir, f"distributions_{field}.png")
+        fig.savefig(path, dpi=dpi)
+        plt.close(fig)
+        paths.append(path)
+    return paths
+
+
+def _render_in_background(render, kwargs):
+    import matplotlib
+    matplotlib.use("Agg")
+    render(**kwargs)
+
+
+def _start_render(render, kwargs):
+    """Runs `render(**kwargs)` in a separate process; inline inside daemonic workers (returns None)."""
+    if multiprocessing.current_process().daemon:
+        render(**kwargs)
+        return None
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    proc = multiprocessing.get_context(method).Process(target=_render_in_background, args=(render, kwargs))
+    proc.start()
+    return proc
+
+
+def generate_summary_charts_async(**kwargs):
+    """
+    Renders `generate_summary_charts(**kwargs)` in a separate process so the caller can move on.
+
+    Returns the started Process (join it to wait for the images), or None when the charts were
+    rendered inline because the caller is itself a daemonic worker that cannot spawn children.
+    """
+    # Plain arrays keep the hand-off cheap and picklable
+    kwargs = {k: np.asarray(v, dtype=float) if k in SERIES_ARGS and v is not None else v
+              for k, v in kwargs.items() if k not in ("churned_users", "user_states")}
+    return _start_render(generate_summary_charts, kwargs)
+
+
+def generate_distribution_heatmaps_async(metrics, **kwargs):
+    """
+    Renders `generate_distribution_heatmaps(metrics, **kwargs)` in a separate process, like
+    `generate_summary_charts_async`. Only the sketch arrays are handed to the renderer.
+    """
+    sketches = {branch: {name: np.asarray(values) for name, values in series.items()
+                         if name.endswith(("_hist", "_quantiles"))}
+                for branch, series in metrics.items()}
+    return _start_render(generate_distribution_heatmaps, dict(kwargs, metrics=sketches))
+
+
 # Copyright 2025 Divine Comedy Labs LLC
 # Released under the Polyform Noncommercial License 1.0.0
 # See LICENSE or https://polyformproject.org/licenses/noncommercial/1.0.0/